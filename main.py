@@ -1,25 +1,175 @@
 ﻿import html
+import hashlib
+import json
 import mimetypes
+import mmap
 import os
+import re
 import shutil
 import sqlite3
+import struct
 import sys
+import tempfile
 import threading
+import time
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Callable, List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence
 from uuid import uuid4
 
+STARTUP_STARTED_NS = time.perf_counter_ns()
+STARTUP_TRACE_ENV_VAR = "XFY_DIARY_TRACE_STARTUP"
+STARTUP_TRACE_REPORT_NAME = "startup_trace.txt"
+STARTUP_TRACE_JSON_NAME = "startup_trace.json"
+STARTUP_TRACE_HISTORY_NAME = "startup_trace_history.jsonl"
+STARTUP_BUDGETS_MS = {
+    "import_pyqt5": 150.0,
+    "install_stderr_filter": 5.0,
+    "import_qfluentwidgets": 300.0,
+    "prepare_data_root": 50.0,
+    "create_application": 150.0,
+    "font_scan": 100.0,
+    "main_window": 400.0,
+    "main_window.open_database": 100.0,
+    "main_window.diary_page": 250.0,
+    "main_window.window_icon": 30.0,
+    "first_show": 1200.0,
+    "first_paint": 1500.0,
+    "entries_ready": 2000.0,
+}
+
+
+def is_startup_trace_enabled() -> bool:
+    raw_value = os.getenv(STARTUP_TRACE_ENV_VAR, "").strip().casefold()
+    return raw_value in {"1", "true", "yes", "on"}
+
+
+class StartupTracer:
+    # Startup phases and milestones, in ms since the process started, checked against budgets.
+    def __init__(self, started_ns: int):
+        self.started_ns = started_ns
+        # (name, start offset, duration), both in ns.
+        self.phases: list[tuple[str, int, int]] = []
+        self.marks: dict[str, int] = {}
+
+    def record(self, name: str, phase_started_ns: int) -> None:
+        now = time.perf_counter_ns()
+        self.phases.append((name, phase_started_ns - self.started_ns, now - phase_started_ns))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        phase_started_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, phase_started_ns)
+
+    def mark(self, name: str) -> None:
+        self.marks.setdefault(name, time.perf_counter_ns() - self.started_ns)
+
+    def as_dict(self) -> dict:
+        def budget_fields(name: str, elapsed_ms: float) -> dict:
+            budget = STARTUP_BUDGETS_MS.get(name)
+            return {"budget_ms": budget, "over_budget": budget is not None and elapsed_ms > budget}
+
+        phases = []
+        for name, offset_ns, duration_ns in sorted(self.phases, key=lambda phase: phase[1]):
+            duration_ms = round(duration_ns / 1_000_000, 3)
+            phases.append(
+                {
+                    "name": name,
+                    "start_ms": round(offset_ns / 1_000_000, 3),
+                    "duration_ms": duration_ms,
+                    **budget_fields(name, duration_ms),
+                }
+            )
+        marks = []
+        for name, offset_ns in sorted(self.marks.items(), key=lambda mark: mark[1]):
+            at_ms = round(offset_ns / 1_000_000, 3)
+            marks.append({"name": name, "at_ms": at_ms, **budget_fields(name, at_ms)})
+        return {
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            "build": {
+                "executable": sys.executable,
+                "frozen": bool(getattr(sys, "frozen", False)),
+                "python": sys.version.split()[0],
+                "platform": sys.platform,
+                "main_mtime": int(Path(__file__).stat().st_mtime) if Path(__file__).exists() else None,
+            },
+            "phases": phases,
+            "marks": marks,
+        }
+
+    def report(self) -> str:
+        data = self.as_dict()
+        lines = [f"{'phase':<40} {'start':>10} {'ms':>10} {'budget':>8}"]
+        for phase in data["phases"]:
+            name = "  " * phase["name"].count(".") + phase["name"]
+            budget = "" if phase["budget_ms"] is None else f"{phase['budget_ms']:.0f}"
+            flag = "  ! over budget" if phase["over_budget"] else ""
+            lines.append(
+                f"{name:<40} {phase['start_ms']:>10.1f} {phase['duration_ms']:>10.1f} {budget:>8}{flag}"
+            )
+        lines.append("")
+        lines.append(f"{'milestone':<40} {'at ms':>10} {'budget':>8}")
+        for mark in data["marks"]:
+            budget = "" if mark["budget_ms"] is None else f"{mark['budget_ms']:.0f}"
+            flag = "  ! over budget" if mark["over_budget"] else ""
+            lines.append(f"{mark['name']:<40} {mark['at_ms']:>10.1f} {budget:>8}{flag}")
+        return "\n".join(lines)
+
+    def dump(self, directory: Path) -> Path:
+        report_path = directory / STARTUP_TRACE_REPORT_NAME
+        data = self.as_dict()
+        report_path.write_text(self.report() + "\n", encoding="utf-8")
+        (directory / STARTUP_TRACE_JSON_NAME).write_text(
+            json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+        )
+        # One line per launch, so runs of different builds can be diffed later.
+        with (directory / STARTUP_TRACE_HISTORY_NAME).open("a", encoding="utf-8") as history:
+            history.write(json.dumps(data, ensure_ascii=False) + "\n")
+        return report_path
+
+
+STARTUP_TRACER = StartupTracer(STARTUP_STARTED_NS) if is_startup_trace_enabled() else None
+
+
+@contextmanager
+def startup_phase(name: str) -> Iterator[None]:
+    if STARTUP_TRACER is None:
+        yield
+        return
+    with STARTUP_TRACER.phase(name):
+        yield
+
 from PyQt5.QtCore import (
+    QAbstractListModel,
+    QBuffer,
+    QCoreApplication,
     QDate,
+    QEvent,
     QFileInfo,
+    QModelIndex,
+    QObject,
     QPoint,
+    QRectF,
+    QT_VERSION_STR,
+    QRunnable,
     QSize,
     Qt,
+    QThread,
+    QThreadPool,
     QTimer,
     QUrl,
     QtMsgType,
+    pyqtSignal,
+    pyqtSlot,
     qInstallMessageHandler,
 )
 from PyQt5.QtGui import (
@@ -27,31 +177,37 @@ from PyQt5.QtGui import (
     QDesktopServices,
     QFont,
     QFontDatabase,
+    QFontInfo,
     QIcon,
     QImage,
+    QImageReader,
     QKeySequence,
     QPainter,
     QPixmap,
+    QPixmapCache,
     QTextCharFormat,
     QTextCursor,
 )
 from PyQt5.QtWidgets import (
+    QAbstractItemDelegate,
     QAbstractItemView,
     QApplication,
     QCalendarWidget,
     QColorDialog,
+    QComboBox,
     QDateEdit,
     QDialog,
     QFileDialog,
     QFileIconProvider,
-    QFontComboBox,
     QFrame,
     QGraphicsDropShadowEffect,
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QListView,
     QListWidget,
     QListWidgetItem,
+    QProgressBar,
     QShortcut,
     QSizePolicy,
     QSpinBox,
@@ -61,11 +217,15 @@ from PyQt5.QtWidgets import (
     QTableView,
     QToolButton,
     QTextBrowser,
+    QToolTip,
     QTextEdit,
     QVBoxLayout,
     QWidget,
 )
 
+if STARTUP_TRACER is not None:
+    STARTUP_TRACER.record("import_pyqt5", STARTUP_STARTED_NS)
+
 SUPPRESSED_QT_LOG_PREFIXES = ("libpng warning: iCCP:",)
 _qt_message_handler_ref: Optional[Callable[[QtMsgType, object, str], None]] = None
 _stderr_filter_installed = False
@@ -73,10 +233,122 @@ _stderr_filter_installed = False
 SUPPRESSED_STDERR_SUBSTRINGS = (
     "libpng warning: iCCP:",
 )
+SUPPRESSED_STDERR_PATTERN = re.compile(
+    b"|".join(re.escape(token.encode("utf-8")) for token in SUPPRESSED_STDERR_SUBSTRINGS)
+)
+LOG_FILE_ENV_VAR = "XFY_DIARY_LOG_FILE"
+LOG_DIR = "logs"
+LOG_FILE_NAME = "xfy_diary.log"
+LOG_FILE_MAX_BYTES = 1024 * 1024
+LOG_FILE_BACKUPS = 3
+LOG_RING_LINES = 500
+
+
+class LineSplitter:
+    # Splits a byte stream into lines; each byte is scanned once however the chunks fall.
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scanned = 0
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        buffer = self._buffer
+        buffer += chunk
+        lines: list[bytes] = []
+        start = 0
+        end = buffer.find(b"\n", self._scanned)
+        while end >= 0:
+            lines.append(bytes(buffer[start : end + 1]))
+            start = end + 1
+            end = buffer.find(b"\n", start)
+        if start:
+            del buffer[:start]
+        self._scanned = len(buffer)
+        return lines
+
+    def flush(self) -> bytes:
+        remainder = bytes(self._buffer)
+        self._buffer.clear()
+        self._scanned = 0
+        return remainder
+
+
+class RotatingLogFile:
+    def __init__(self, path: Path, max_bytes: int = LOG_FILE_MAX_BYTES, backups: int = LOG_FILE_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = path.open("ab")
+        self._size = self._handle.tell()
+
+    def write(self, data: bytes) -> None:
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._handle.write(data)
+        self._handle.flush()
+        self._size += len(data)
+
+    def _rotate(self) -> None:
+        # xfy_diary.log -> .1 -> .2 ...; the oldest backup is dropped.
+        self._handle.close()
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                os.replace(older, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._handle = self.path.open("ab")
+        self._size = 0
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+class StderrLog:
+    # Where filtered stderr lines go: a ring of recent lines plus the console or a log file.
+    def __init__(self, console_fd: int, ring_lines: int = LOG_RING_LINES):
+        self.console_fd = console_fd
+        self._recent: deque[str] = deque(maxlen=ring_lines)
+        self._lock = threading.Lock()
+        self._log_file: Optional[RotatingLogFile] = None
+
+    def write(self, line: bytes) -> None:
+        text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+        with self._lock:
+            self._recent.append(text)
+            log_file = self._log_file
+            if log_file is not None:
+                try:
+                    log_file.write(line)
+                    return
+                except OSError:
+                    self._log_file = None
+        os.write(self.console_fd, line)
+
+    def recent_lines(self) -> list[str]:
+        with self._lock:
+            return list(self._recent)
+
+    def open_log_file(self, path: Path) -> None:
+        log_file = RotatingLogFile(path)
+        with self._lock:
+            # Lines logged before the data root was known are written first.
+            for text in self._recent:
+                log_file.write(text.encode("utf-8") + b"\n")
+            self._log_file = log_file
+
+
+STDERR_LOG: Optional[StderrLog] = None
+
+
+def recent_log_lines() -> list[str]:
+    return STDERR_LOG.recent_lines() if STDERR_LOG is not None else []
 
 
 def _qt_message_handler(message_type: QtMsgType, context, message: str) -> None:
-    if any(message.startswith(prefix) for prefix in SUPPRESSED_QT_LOG_PREFIXES):
+    if message.startswith(SUPPRESSED_QT_LOG_PREFIXES):
         return
 
     level = {
@@ -93,7 +365,7 @@ def _qt_message_handler(message_type: QtMsgType, context, message: str) -> None:
 
 
 def install_stderr_filter() -> None:
-    global _stderr_filter_installed
+    global _stderr_filter_installed, STDERR_LOG
     if _stderr_filter_installed:
         return
 
@@ -111,27 +383,23 @@ def install_stderr_filter() -> None:
         return
 
     _stderr_filter_installed = True
+    stderr_log = StderrLog(original_stderr_fd)
+    STDERR_LOG = stderr_log
 
     def _forward_filtered_stderr() -> None:
-        buffer = b""
+        splitter = LineSplitter()
         try:
             while True:
-                chunk = os.read(read_fd, 4096)
+                chunk = os.read(read_fd, 65536)
                 if not chunk:
                     break
+                for line in splitter.feed(chunk):
+                    if SUPPRESSED_STDERR_PATTERN.search(line) is None:
+                        stderr_log.write(line)
 
-                buffer += chunk
-                while b"\n" in buffer:
-                    raw_line, buffer = buffer.split(b"\n", 1)
-                    line = raw_line.decode("utf-8", errors="replace")
-                    if any(token in line for token in SUPPRESSED_STDERR_SUBSTRINGS):
-                        continue
-                    os.write(original_stderr_fd, raw_line + b"\n")
-
-            if buffer:
-                line = buffer.decode("utf-8", errors="replace")
-                if not any(token in line for token in SUPPRESSED_STDERR_SUBSTRINGS):
-                    os.write(original_stderr_fd, buffer)
+            remainder = splitter.flush()
+            if remainder and SUPPRESSED_STDERR_PATTERN.search(remainder) is None:
+                stderr_log.write(remainder)
         except OSError:
             return
         finally:
@@ -157,22 +425,25 @@ def install_qt_message_filter() -> None:
     qInstallMessageHandler(_qt_message_handler_ref)
 
 
-install_stderr_filter()
-install_qt_message_filter()
-
-from qfluentwidgets import (
-    BodyLabel,
-    FluentWindow,
-    NavigationItemPosition,
-    PrimaryPushButton,
-    PushButton,
-    SearchLineEdit,
-    SubtitleLabel,
-    Theme,
-    setFontFamilies,
-    setTheme,
-    themeColor,
-)
+with startup_phase("install_stderr_filter"):
+    install_stderr_filter()
+    install_qt_message_filter()
+
+with startup_phase("import_qfluentwidgets"):
+    from qfluentwidgets import (
+        BodyLabel,
+        ComboBox,
+        FluentWindow,
+        NavigationItemPosition,
+        PrimaryPushButton,
+        PushButton,
+        SearchLineEdit,
+        SubtitleLabel,
+        Theme,
+        setFontFamilies,
+        setTheme,
+        themeColor,
+    )
 
 
 APP_NAME = "XFY diary"
@@ -185,8 +456,22 @@ DIARY_NAV_TEXT = "日记"
 OVERVIEW_NAV_ICON_TEXT = "S"
 DIARY_NAV_ICON_TEXT = "D"
 ON_THIS_DAY_POPUP_META_KEY = "on_this_day_popup_last_checked_date"
+MEMORY_WINDOW_OPTIONS = (
+    ("当天", 0),
+    ("前后 3 天", 3),
+    ("前后 7 天", 7),
+)
 UNTITLED_ENTRY_TITLE = "未命名日记"
 DATA_DIR_ENV_VARS = ("XFY_DIARY_DATA_DIR",)
+SEARCH_DEBOUNCE_ENV_VAR = "XFY_DIARY_SEARCH_DEBOUNCE_MS"
+DEFAULT_SEARCH_DEBOUNCE_MS = 250
+DB_PROFILE_ENV_VAR = "XFY_DIARY_DB_PROFILE"
+DB_PROFILE_META_KEY = "sqlite_profile"
+HTML_COMPRESSION_ENV_VAR = "XFY_DIARY_COMPRESS_HTML"
+DB_TRACE_ENV_VAR = "XFY_DIARY_DB_TRACE"
+DB_TRACE_REPORT_NAME = "db_trace.txt"
+DB_TRACE_MAX_SAMPLES = 4096
+DB_TRACE_SQL_WIDTH = 96
 IMAGE_FILE_EXTENSIONS = {
     ".png",
     ".jpg",
@@ -236,12 +521,118 @@ FALLBACK_CJK_UI_FONTS = (
     "Noto Sans CJK SC",
     "WenQuanYi Micro Hei",
 )
+FONT_CACHE_NAME = "font_cache.json"
+DATA_ROOT_MANIFEST_NAME = "data_root_manifest.json"
+DATA_ROOT_JOURNAL_NAME = "data_root_manifest.journal"
+DATA_ROOT_DONE_NAME = "data_root_manifest.done"
+DATA_ROOT_SYNC_THREADS = 4
+DATA_ROOT_SYNC_POLL_MS = 500
 PREFERRED_EDITOR_FONTS = (
     "宋体",
     "SimSun",
 )
 DEFAULT_EDITOR_FONT_SIZE = 14
+SEARCH_SNIPPET_MARKERS = ("【", "】")
+SEARCH_SNIPPET_TOKENS = 16
+FULL_TEXT_MIN_QUERY_LENGTH = 3
+ENTRY_LIST_PAGE_SIZE = 100
 PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_SANITIZE_CACHE_BYTES = 64 * 1024 * 1024
+PNG_BENCHMARK_RUNS = 5
+PNG_BENCHMARK_SYNTHETIC_BYTES = 40 * 1024 * 1024
+JPEG_SOI = b"\xff\xd8"
+EXIF_HEADER = b"Exif\x00\x00"
+EXIF_TAG_DATETIME = 0x0132
+EXIF_TAG_EXIF_IFD = 0x8769
+EXIF_TAG_DATETIME_ORIGINAL = 0x9003
+ATTACHMENT_HASH_CHUNK_BYTES = 1024 * 1024
+ATTACHMENT_IMPORT_THREADS = 2
+THUMBNAILS_DIR = "thumbnails"
+ICON_CACHE_DIR = "icon_cache"
+THUMBNAIL_EDGE = 120
+THUMBNAIL_THREADS = 2
+THUMBNAIL_CACHE_BUDGET_BYTES = 64 * 1024 * 1024
+ATTACHMENT_PIXMAP_CACHE_KB = 32 * 1024
+ATTACHMENT_ROW_CACHE_ENTRIES = 16
+ATTACHMENT_CATALOG_RETRY_SECONDS = 7 * 24 * 3600
+ATTACHMENT_ICON_LOADED_ROLE = Qt.UserRole + 1
+ATTACHMENT_SORT_ORDERS = {
+    "newest": "id DESC",
+    "name": "file_name COLLATE NOCASE, id DESC",
+    "size": "byte_size IS NULL, byte_size DESC, id DESC",
+    "captured": "captured_at IS NULL, captured_at DESC, id DESC",
+}
+ATTACHMENT_SORT_OPTIONS = (
+    ("最新添加", "newest"),
+    ("名称", "name"),
+    ("大小", "size"),
+    ("拍摄时间", "captured"),
+)
+
+
+@dataclass(frozen=True)
+class SQLiteProfile:
+    name: str
+    journal_mode: str
+    synchronous: str
+    busy_timeout_ms: int
+    cache_size_kib: int
+    mmap_size_bytes: int
+    wal_autocheckpoint_pages: int
+    checkpoint_interval_seconds: float
+
+
+SQLITE_PROFILES = {
+    "safe": SQLiteProfile(
+        name="safe",
+        journal_mode="DELETE",
+        synchronous="FULL",
+        busy_timeout_ms=5000,
+        cache_size_kib=2048,
+        mmap_size_bytes=0,
+        wal_autocheckpoint_pages=0,
+        checkpoint_interval_seconds=0,
+    ),
+    "balanced": SQLiteProfile(
+        name="balanced",
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        busy_timeout_ms=5000,
+        cache_size_kib=8192,
+        mmap_size_bytes=0,
+        wal_autocheckpoint_pages=1000,
+        checkpoint_interval_seconds=300,
+    ),
+    "fast": SQLiteProfile(
+        name="fast",
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        busy_timeout_ms=5000,
+        cache_size_kib=65536,
+        mmap_size_bytes=256 * 1024 * 1024,
+        wal_autocheckpoint_pages=4000,
+        checkpoint_interval_seconds=300,
+    ),
+}
+DEFAULT_SQLITE_PROFILE = "balanced"
+COMPRESSED_HTML_HEADER = b"XQH1"
+# Preset zlib dictionary for format XQH1: the boilerplate QTextEdit.toHtml() repeats in every
+# entry. Changing it breaks existing rows; add a new header version instead.
+QT_HTML_ZDICT = (
+    '<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" "http://www.w3.org/TR/REC-html40/strict.dtd">\n'
+    '<html><head><meta name="qrichtext" content="1" /><style type="text/css">\n'
+    "p, li { white-space: pre-wrap; }\n"
+    "</style></head><body style=\" font-family:'宋体'; font-size:14pt; font-weight:400; "
+    'font-style:normal;">\n'
+    "<span style=\" font-family:'SimSun'; font-size:14pt; font-weight:600; font-style:italic; "
+    'text-decoration: underline; color:#000000;">'
+    '<img src="file:///" /><a href="file:///">'
+    '<p style="-qt-paragraph-type:empty; margin-top:0px; margin-bottom:0px; margin-left:0px; '
+    'margin-right:0px; -qt-block-indent:0; text-indent:0px;"><br /></p>\n'
+    '<p style=" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; '
+    '-qt-block-indent:0; text-indent:0px;">'
+    "</span></p>\n</p></body></html>"
+).encode("utf-8")
 
 
 def get_app_root() -> Path:
@@ -269,6 +660,31 @@ def get_data_root() -> Path:
     return (base / APP_NAME).resolve()
 
 
+def get_search_debounce_ms() -> int:
+    raw_value = os.getenv(SEARCH_DEBOUNCE_ENV_VAR, "").strip()
+    if not raw_value:
+        return DEFAULT_SEARCH_DEBOUNCE_MS
+    try:
+        return max(0, int(raw_value))
+    except ValueError:
+        return DEFAULT_SEARCH_DEBOUNCE_MS
+
+
+def is_html_compression_enabled() -> bool:
+    raw_value = os.getenv(HTML_COMPRESSION_ENV_VAR, "").strip().casefold()
+    return raw_value not in {"0", "false", "no", "off"}
+
+
+def is_log_file_enabled() -> bool:
+    raw_value = os.getenv(LOG_FILE_ENV_VAR, "").strip().casefold()
+    return raw_value in {"1", "true", "yes", "on"}
+
+
+def is_db_trace_enabled() -> bool:
+    raw_value = os.getenv(DB_TRACE_ENV_VAR, "").strip().casefold()
+    return raw_value in {"1", "true", "yes", "on"}
+
+
 def is_writable_directory(path: Path) -> bool:
     try:
         path.mkdir(parents=True, exist_ok=True)
@@ -284,38 +700,168 @@ def is_writable_directory(path: Path) -> bool:
     return True
 
 
-def copy_missing_tree(source_dir: Path, target_dir: Path) -> None:
-    if not source_dir.exists():
-        return
-    for path in source_dir.rglob("*"):
-        if not path.is_file():
-            continue
-        relative = path.relative_to(source_dir)
-        destination = target_dir / relative
-        destination.parent.mkdir(parents=True, exist_ok=True)
+class DataRootSync:
+    # Copies legacy attachments into the data root once, resuming from a manifest if interrupted.
+    # The manifest snapshots source sizes and mtimes, the journal lists files already copied,
+    # and the done marker makes a finished sync cost a single stat.
+    def __init__(self, source_dir: Path, target_dir: Path, data_root: Path):
+        self.source_dir = source_dir
+        self.target_dir = target_dir
+        self.data_root = data_root
+        self.manifest_path = data_root / DATA_ROOT_MANIFEST_NAME
+        self.journal_path = data_root / DATA_ROOT_JOURNAL_NAME
+        self.done_path = data_root / DATA_ROOT_DONE_NAME
+        self._finished = threading.Event()
+        # Files the sync has started copying, and files a migration read from the source instead.
+        self._files_changed = threading.Condition()
+        self._started: set[str] = set()
+        self._in_flight: set[str] = set()
+        self._claimed: set[str] = set()
+
+    def start(self) -> None:
+        if self.done_path.exists():
+            self._finished.set()
+            return
+        threading.Thread(target=self._run, name="data-root-sync", daemon=True).start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._finished.wait(timeout)
+
+    def is_finished(self) -> bool:
+        return self._finished.is_set()
+
+    def claim(self, relative: str) -> bool:
+        # True when the caller may read the source file itself and the sync will skip it;
+        # False once the sync has copied it, after waiting for a copy already in progress.
+        with self._files_changed:
+            while relative in self._in_flight:
+                self._files_changed.wait()
+            if relative in self._started:
+                return False
+            self._claimed.add(relative)
+            return True
+
+    def _build_manifest(self) -> dict[str, list[int]]:
+        files: dict[str, list[int]] = {}
+        for directory, _dirnames, filenames in os.walk(self.source_dir):
+            for filename in filenames:
+                path = Path(directory) / filename
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files[path.relative_to(self.source_dir).as_posix()] = [stat.st_size, stat.st_mtime_ns]
+        temporary = self.manifest_path.with_name(f"{self.manifest_path.name}.part")
+        temporary.write_text(
+            json.dumps({"source": str(self.source_dir), "files": files}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(temporary, self.manifest_path)
+        return files
+
+    def _load_manifest(self) -> dict[str, list[int]]:
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("source") == str(self.source_dir):
+                return dict(manifest["files"])
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+        try:
+            self.journal_path.unlink()
+        except OSError:
+            pass
+        return self._build_manifest()
+
+    def _copied_files(self) -> set[str]:
+        try:
+            return set(self.journal_path.read_text(encoding="utf-8").splitlines())
+        except OSError:
+            return set()
+
+    def _copy_file(self, item: tuple[str, list[int]]) -> Optional[str]:
+        relative, (size, mtime_ns) = item
+        with self._files_changed:
+            if relative in self._claimed:
+                return relative
+            self._started.add(relative)
+            self._in_flight.add(relative)
+        try:
+            return self._copy_claimed_file(relative, size, mtime_ns)
+        finally:
+            with self._files_changed:
+                self._in_flight.discard(relative)
+                self._files_changed.notify_all()
+
+    def _copy_claimed_file(self, relative: str, size: int, mtime_ns: int) -> Optional[str]:
+        source = self.source_dir / relative
+        destination = self.target_dir / relative
+        # Copied before the journal caught up, or already in the data root; never overwritten.
         if destination.exists():
-            continue
-        shutil.copy2(path, destination)
+            return relative
+        try:
+            stat = source.stat()
+        except FileNotFoundError:
+            # Deleted since the manifest was taken; there is nothing left to copy.
+            return relative
+        except OSError:
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            size = stat.st_size
+        # A fixed temp name means a copy cut short by exit is simply overwritten on resume.
+        temporary = destination.with_name(f".{destination.name}.part")
+        try:
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source, temporary)
+            if temporary.stat().st_size != size:
+                temporary.unlink()
+                return None
+            os.replace(temporary, destination)
+        except FileNotFoundError:
+            if source.exists():
+                return None
+            try:
+                temporary.unlink()
+            except OSError:
+                pass
+            return relative
+        except OSError:
+            return None
+        return relative
 
+    def _run(self) -> None:
+        try:
+            if not self.source_dir.is_dir():
+                self.done_path.touch()
+                return
+            files = self._load_manifest()
+            copied = self._copied_files()
+            pending = [item for item in files.items() if item[0] not in copied]
+            failed = False
+            with ThreadPoolExecutor(
+                max_workers=DATA_ROOT_SYNC_THREADS, thread_name_prefix="data-root-copy"
+            ) as pool, self.journal_path.open("a", encoding="utf-8") as journal:
+                for relative in pool.map(self._copy_file, pending):
+                    if relative is None:
+                        failed = True
+                        continue
+                    journal.write(relative + "\n")
+                    journal.flush()
+            if not failed:
+                self.done_path.touch()
+        except OSError:
+            pass
+        finally:
+            self._finished.set()
 
-def normalize_attachment_paths(db_path: Path, legacy_root: Path, data_root: Path) -> None:
-    if not db_path.exists():
-        return
 
+def normalize_attachment_paths(
+    conn: sqlite3.Connection, legacy_root: Path, data_root: Path
+) -> int:
     legacy_attachments_root = legacy_root / ATTACHMENTS_DIR
     data_attachments_root = data_root / ATTACHMENTS_DIR
 
-    try:
-        conn = sqlite3.connect(db_path)
-    except sqlite3.Error:
-        return
-
     updates: list[tuple[str, int]] = []
-    try:
-        rows = conn.execute("SELECT id, file_path FROM attachments").fetchall()
-    except sqlite3.Error:
-        conn.close()
-        return
+    rows = conn.execute("SELECT id, file_path FROM attachments").fetchall()
 
     for attachment_id, raw_path in rows:
         if not raw_path:
@@ -334,8 +880,10 @@ def normalize_attachment_paths(db_path: Path, legacy_root: Path, data_root: Path
                 break
 
             if relative is None:
-                by_name = data_attachments_root / stored_path.name
-                if by_name.exists():
+                # A legacy file the data-root sync has not copied yet will land in the same place.
+                if (data_attachments_root / stored_path.name).exists() or (
+                    legacy_attachments_root / stored_path.name
+                ).exists():
                     relative = Path(stored_path.name)
 
             if relative is not None:
@@ -344,7 +892,9 @@ def normalize_attachment_paths(db_path: Path, legacy_root: Path, data_root: Path
             as_relative = Path(original)
             if as_relative.parts and as_relative.parts[0] == ATTACHMENTS_DIR:
                 normalized = as_relative.as_posix()
-            elif (data_attachments_root / as_relative).exists():
+            elif (data_attachments_root / as_relative).exists() or (
+                legacy_attachments_root / as_relative
+            ).exists():
                 normalized = (Path(ATTACHMENTS_DIR) / as_relative).as_posix()
             else:
                 normalized = as_relative.as_posix()
@@ -354,8 +904,7 @@ def normalize_attachment_paths(db_path: Path, legacy_root: Path, data_root: Path
 
     if updates:
         conn.executemany("UPDATE attachments SET file_path = ? WHERE id = ?", updates)
-        conn.commit()
-    conn.close()
+    return len(updates)
 
 
 def prepare_data_root() -> Path:
@@ -379,18 +928,36 @@ def prepare_data_root() -> Path:
         if not same_root:
             legacy_db_path = APP_ROOT / DB_NAME
             target_db_path = data_root / DB_NAME
-            if legacy_db_path.exists() and not target_db_path.exists():
-                shutil.copy2(legacy_db_path, target_db_path)
-
-            copy_missing_tree(APP_ROOT / ATTACHMENTS_DIR, data_root / ATTACHMENTS_DIR)
-            normalize_attachment_paths(target_db_path, APP_ROOT, data_root)
+            with startup_phase("prepare_data_root.copy_database"):
+                if legacy_db_path.exists() and not target_db_path.exists():
+                    shutil.copy2(legacy_db_path, target_db_path)
 
         return data_root
 
     return APP_ROOT
 
 
-DATA_ROOT = prepare_data_root()
+def start_data_root_sync(data_root: Path) -> Optional[DataRootSync]:
+    try:
+        if data_root.resolve() == APP_ROOT.resolve():
+            return None
+    except OSError:
+        return None
+    sync = DataRootSync(APP_ROOT / ATTACHMENTS_DIR, data_root / ATTACHMENTS_DIR, data_root.resolve())
+    sync.start()
+    return sync
+
+
+with startup_phase("prepare_data_root"):
+    DATA_ROOT = prepare_data_root()
+    with startup_phase("prepare_data_root.start_attachment_sync"):
+        DATA_ROOT_SYNC = start_data_root_sync(DATA_ROOT)
+
+if STDERR_LOG is not None and is_log_file_enabled():
+    try:
+        STDERR_LOG.open_log_file(DATA_ROOT / LOG_DIR / LOG_FILE_NAME)
+    except OSError:
+        pass
 
 
 def resolve_resource_path(relative_path: str) -> Optional[Path]:
@@ -426,21 +993,52 @@ def resolve_qss_icons(style: str) -> str:
     return resolved_style
 
 
-def resolve_ui_font_family() -> str:
-    return resolve_ui_font_families()[0]
+@dataclass
+class FontResolution:
+    ui_families: List[str]
+    editor_family: str
 
 
-def resolve_editor_font_family() -> str:
-    families = QFontDatabase().families()
-    lowered = {name.casefold(): name for name in families}
-    for preferred in PREFERRED_EDITOR_FONTS:
-        matched = lowered.get(preferred.casefold())
-        if matched:
-            return matched
-    return resolve_ui_font_family()
+_font_resolution: Optional[FontResolution] = None
 
 
-def resolve_ui_font_families() -> List[str]:
+def font_directories() -> list[Path]:
+    home = Path.home()
+    if sys.platform.startswith("win"):
+        windows_dir = Path(os.environ.get("WINDIR", r"C:\Windows"))
+        local_app_data = Path(os.environ.get("LOCALAPPDATA", home / "AppData" / "Local"))
+        return [windows_dir / "Fonts", local_app_data / "Microsoft" / "Windows" / "Fonts"]
+    if sys.platform == "darwin":
+        return [Path("/System/Library/Fonts"), Path("/Library/Fonts"), home / "Library" / "Fonts"]
+    return [
+        Path("/usr/share/fonts"),
+        Path("/usr/local/share/fonts"),
+        home / ".local" / "share" / "fonts",
+        home / ".fonts",
+    ]
+
+
+def font_set_fingerprint() -> str:
+    # Installing or removing a font changes the mtime of its directory, so no font file is opened.
+    parts = [
+        QT_VERSION_STR,
+        "|".join(PREFERRED_UI_FONTS),
+        "|".join(FALLBACK_CJK_UI_FONTS),
+        "|".join(PREFERRED_EDITOR_FONTS),
+    ]
+    for directory in font_directories():
+        try:
+            parts.append(f"{directory}:{directory.stat().st_mtime_ns}")
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        parts.append(f"{entry.path}:{entry.stat().st_mtime_ns}")
+        except OSError:
+            continue
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _resolve_fonts_from_database() -> FontResolution:
     families = QFontDatabase().families()
     lowered = {name.casefold(): name for name in families}
     resolved: List[str] = []
@@ -468,47 +1066,303 @@ def resolve_ui_font_families() -> List[str]:
             add_family(matched)
 
     add_family("Segoe UI")
-    return resolved
 
+    editor_family = resolved[0]
+    for preferred in PREFERRED_EDITOR_FONTS:
+        matched = lowered.get(preferred.casefold())
+        if matched:
+            editor_family = matched
+            break
+    return FontResolution(ui_families=resolved, editor_family=editor_family)
 
-def strip_problematic_png_profile(image_bytes: bytes) -> bytes:
-    if not image_bytes.startswith(PNG_SIGNATURE):
-        return image_bytes
+
+def get_font_resolution() -> FontResolution:
+    # Enumerates installed fonts at most once per process and once per font set on disk.
+    global _font_resolution
+    if _font_resolution is not None:
+        return _font_resolution
+
+    cache_path = DATA_ROOT / FONT_CACHE_NAME
+    fingerprint = font_set_fingerprint()
+    try:
+        cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cached.get("fingerprint") == fingerprint:
+            _font_resolution = FontResolution(
+                ui_families=[str(name) for name in cached["ui_families"]],
+                editor_family=str(cached["editor_family"]),
+            )
+            return _font_resolution
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    _font_resolution = _resolve_fonts_from_database()
+    try:
+        cache_path.write_text(
+            json.dumps(
+                {
+                    "fingerprint": fingerprint,
+                    "ui_families": _font_resolution.ui_families,
+                    "editor_family": _font_resolution.editor_family,
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+    except OSError:
+        pass
+    return _font_resolution
+
+
+def resolve_ui_font_family() -> str:
+    return resolve_ui_font_families()[0]
+
+
+def resolve_editor_font_family() -> str:
+    return get_font_resolution().editor_family
+
+
+def resolve_ui_font_families() -> List[str]:
+    return list(get_font_resolution().ui_families)
+
+
+def png_spans_without_profile(data) -> Optional[list[tuple[int, int]]]:
+    # Byte ranges to keep once iCCP chunks are dropped; None when there is nothing to strip.
+    if len(data) < len(PNG_SIGNATURE) or data[: len(PNG_SIGNATURE)] != PNG_SIGNATURE:
+        return None
 
     cursor = len(PNG_SIGNATURE)
-    sanitized_chunks = [PNG_SIGNATURE]
+    spans: list[tuple[int, int]] = []
+    kept_from = 0
     removed_profile = False
 
-    while cursor + 8 <= len(image_bytes):
-        length = int.from_bytes(image_bytes[cursor : cursor + 4], "big")
+    while cursor + 8 <= len(data):
+        length, chunk_type = struct.unpack_from(">I4s", data, cursor)
         chunk_end = cursor + 12 + length
-        if chunk_end > len(image_bytes):
-            return image_bytes
+        if chunk_end > len(data):
+            return None
 
-        chunk_type = image_bytes[cursor + 4 : cursor + 8]
-        if chunk_type != b"iCCP":
-            sanitized_chunks.append(image_bytes[cursor:chunk_end])
-        else:
+        if chunk_type == b"iCCP":
             removed_profile = True
+            if cursor > kept_from:
+                spans.append((kept_from, cursor))
+            kept_from = chunk_end
 
         cursor = chunk_end
         if chunk_type == b"IEND":
             break
 
     if not removed_profile:
+        return None
+    if cursor > kept_from:
+        spans.append((kept_from, cursor))
+    return spans
+
+
+def join_spans(data, spans: Sequence[tuple[int, int]]) -> bytes:
+    # The slices are views, so join() makes the only copy.
+    with memoryview(data) as view:
+        parts = [view[start:end] for start, end in spans]
+        try:
+            return b"".join(parts)
+        finally:
+            for part in parts:
+                part.release()
+
+
+def strip_problematic_png_profile(image_bytes: bytes) -> bytes:
+    spans = png_spans_without_profile(image_bytes)
+    if spans is None:
         return image_bytes
-    return b"".join(sanitized_chunks)
+    return join_spans(image_bytes, spans)
+
+
+def read_sanitized_png(path: Path) -> Optional[bytes]:
+    # mmap lets the chunk walk touch only chunk headers; clean files are never copied.
+    with path.open("rb") as handle:
+        if os.fstat(handle.fileno()).st_size < len(PNG_SIGNATURE):
+            return None
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            spans = png_spans_without_profile(mapped)
+            if spans is None:
+                return None
+            return join_spans(mapped, spans)
+
+
+class SanitizedPngCache:
+    # Remembers which PNGs needed iCCP stripping, keyed by path, size and mtime.
+    def __init__(self, budget_bytes: int = PNG_SANITIZE_CACHE_BYTES):
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        # None records a clean file, so later loads skip the scan without holding its bytes.
+        self._entries: dict[tuple[str, int, int], Optional[bytes]] = {}
+        self._total_bytes = 0
+
+    def load(self, path: Path) -> Optional[bytes]:
+        stat = path.stat()
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if key in self._entries:
+                sanitized = self._entries.pop(key)
+                self._entries[key] = sanitized
+                return sanitized
+        sanitized = read_sanitized_png(path)
+        size = len(sanitized) if sanitized is not None else 0
+        if size > self.budget_bytes:
+            return sanitized
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            self._total_bytes -= len(previous) if previous is not None else 0
+            self._entries[key] = sanitized
+            self._total_bytes += size
+            while self._total_bytes > self.budget_bytes:
+                stale = self._entries.pop(next(iter(self._entries)))
+                self._total_bytes -= len(stale) if stale is not None else 0
+        return sanitized
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+SANITIZED_PNG_CACHE = SanitizedPngCache()
 
 
 def load_image_bytes(path: Path) -> Optional[bytes]:
+    # Sanitized PNG bytes, or None when Qt can read the file from its path unchanged.
+    if path.suffix.lower() != ".png":
+        return None
+    try:
+        return SANITIZED_PNG_CACHE.load(path)
+    except (OSError, ValueError):
+        return None
+
+
+def _parse_exif_capture_date(tiff: bytes) -> Optional[str]:
+    byte_order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if byte_order is None:
+        return None
+
+    def read_tags(offset: int) -> dict[int, tuple[int, int]]:
+        tags: dict[int, tuple[int, int]] = {}
+        (count,) = struct.unpack_from(f"{byte_order}H", tiff, offset)
+        for index in range(count):
+            tag, _type, length, value = struct.unpack_from(
+                f"{byte_order}HHII", tiff, offset + 2 + 12 * index
+            )
+            tags[tag] = (length, value)
+        return tags
+
+    def read_text(tag: Optional[tuple[int, int]]) -> Optional[str]:
+        # Date tags are 20-byte ASCII values, always stored at an offset.
+        if tag is None or tag[0] <= 4:
+            return None
+        length, offset = tag
+        text = tiff[offset : offset + length].split(b"\x00", 1)[0].decode("ascii", "ignore")
+        return text.strip() or None
+
+    try:
+        (ifd0_offset,) = struct.unpack_from(f"{byte_order}I", tiff, 4)
+        ifd0 = read_tags(ifd0_offset)
+        captured = None
+        if EXIF_TAG_EXIF_IFD in ifd0:
+            captured = read_text(read_tags(ifd0[EXIF_TAG_EXIF_IFD][1]).get(EXIF_TAG_DATETIME_ORIGINAL))
+        captured = captured or read_text(ifd0.get(EXIF_TAG_DATETIME))
+    except struct.error:
+        return None
+    try:
+        return datetime.strptime(captured or "", "%Y:%m:%d %H:%M:%S").isoformat()
+    except ValueError:
+        return None
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        while chunk := handle.read(ATTACHMENT_HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_addressed_path(digest: str, suffix: str) -> Path:
+    # Relative to the data root; the two-character fan-out keeps directories small.
+    return Path(ATTACHMENTS_DIR) / digest[:2] / f"{digest}{suffix.lower()}"
+
+
+def read_exif_capture_date(path: Path) -> Optional[str]:
+    # Walks JPEG segments up to the APP1 EXIF block without reading the image data.
     try:
-        raw = path.read_bytes()
+        with path.open("rb") as handle:
+            if handle.read(2) != JPEG_SOI:
+                return None
+            while True:
+                marker = handle.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF or marker[1] in (0xD9, 0xDA):
+                    return None
+                length = int.from_bytes(handle.read(2), "big")
+                if length < 2:
+                    return None
+                if marker[1] == 0xE1:
+                    segment = handle.read(length - 2)
+                    if segment.startswith(EXIF_HEADER):
+                        return _parse_exif_capture_date(segment[len(EXIF_HEADER) :])
+                else:
+                    handle.seek(length - 2, os.SEEK_CUR)
     except OSError:
         return None
 
-    if path.suffix.lower() == ".png":
-        return strip_problematic_png_profile(raw)
-    return raw
+
+@dataclass
+class AttachmentMetadata:
+    byte_size: int
+    mtime: float
+    mime_type: str
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    captured_at: Optional[str] = None
+
+
+def read_attachment_metadata(path: Path, is_image: bool) -> Optional[AttachmentMetadata]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    metadata = AttachmentMetadata(
+        byte_size=stat.st_size,
+        mtime=stat.st_mtime,
+        mime_type=mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+    )
+    if is_image:
+        # QImageReader.size() reads only the header, so no pixels are decoded here.
+        size = QImageReader(str(path)).size()
+        if size.isValid():
+            metadata.image_width = size.width()
+            metadata.image_height = size.height()
+        metadata.captured_at = read_exif_capture_date(path)
+    return metadata
+
+
+def format_byte_size(byte_size: int) -> str:
+    if byte_size < 1024:
+        return f"{byte_size} B"
+    size = byte_size / 1024
+    for unit in ("KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_attachment_tooltip(row: sqlite3.Row, resolved_path: str) -> str:
+    lines = [str(row["file_name"]), resolved_path]
+    if row["byte_size"] is not None:
+        details = [format_byte_size(int(row["byte_size"])), str(row["mime_type"] or "")]
+        if row["image_width"] and row["image_height"]:
+            details.append(f"{row['image_width']}×{row['image_height']}")
+        lines.append("  ·  ".join(detail for detail in details if detail))
+    if row["captured_at"]:
+        lines.append(f"拍摄于 {str(row['captured_at']).replace('T', ' ')}")
+    return "\n".join(lines)
 
 
 def load_qimage(path: Path) -> QImage:
@@ -529,6 +1383,169 @@ def load_qpixmap(path: Path) -> QPixmap:
     return QPixmap(str(path))
 
 
+def read_scaled_image(path: Path, edge: int) -> QImage:
+    # setScaledSize lets the JPEG decoder downscale while decoding instead of after.
+    buffer: Optional[QBuffer] = None
+    image_bytes = load_image_bytes(path)
+    if image_bytes is not None:
+        buffer = QBuffer()
+        buffer.setData(image_bytes)
+        buffer.open(QBuffer.ReadOnly)
+        reader = QImageReader(buffer)
+    else:
+        reader = QImageReader(str(path))
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid() and (size.width() > edge or size.height() > edge):
+        reader.setScaledSize(size.scaled(edge, edge, Qt.KeepAspectRatio))
+    image = reader.read()
+    if buffer is not None:
+        buffer.close()
+    return image
+
+
+def tint_image(image: QImage, tint: QColor) -> QImage:
+    # Keeps each pixel's HSL lightness and alpha but takes hue and saturation from tint.
+    image = image.convertToFormat(QImage.Format_ARGB32)
+    width, height = image.width(), image.height()
+    pixels = memoryview(image.constBits().asstring(image.sizeInBytes())).cast("I")
+
+    # HSL lightness of an 8-bit colour is (max + min) / 510, so 511 shades cover every pixel.
+    hue = tint.hslHueF()
+    saturation = tint.hslSaturationF()
+    shades = [QColor.fromHslF(hue, saturation, level / 510).rgb() & 0xFFFFFF for level in range(511)]
+    tinted = recolor_argb_pixels(pixels, shades).tobytes()
+    return QImage(tinted, width, height, image.bytesPerLine(), QImage.Format_ARGB32).copy()
+
+
+def recolor_argb_pixels(pixels: Sequence[int], shades: Sequence[int]) -> array:
+    # shades[max + min of the RGB channels] is the RGB that replaces a pixel; alpha is kept
+    # and fully transparent pixels are left alone.
+    recolored: dict[int, int] = {}
+    for pixel in set(pixels):
+        if pixel >> 24 == 0:
+            recolored[pixel] = pixel
+            continue
+        red, green, blue = (pixel >> 16) & 0xFF, (pixel >> 8) & 0xFF, pixel & 0xFF
+        lightness = max(red, green, blue) + min(red, green, blue)
+        recolored[pixel] = (pixel & 0xFF000000) | shades[lightness]
+
+    # Only the distinct colours go through Python; map() rewrites the pixels in C.
+    return array("I", map(recolored.__getitem__, pixels))
+
+
+class ThumbnailCache:
+    # PNG thumbnails under the data root, evicted least-recently-used past a byte budget.
+    def __init__(
+        self,
+        root: Path,
+        edge: int = THUMBNAIL_EDGE,
+        budget_bytes: int = THUMBNAIL_CACHE_BUDGET_BYTES,
+    ):
+        self.root = root
+        self.edge = edge
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    def thumbnail_path(self, path: Path) -> Optional[Path]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        key = hashlib.sha1(
+            f"{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{self.edge}".encode("utf-8")
+        ).hexdigest()
+        return self.root / key[:2] / f"{key}.png"
+
+    def lookup(self, path: Path) -> Optional[Path]:
+        thumbnail = self.thumbnail_path(path)
+        if thumbnail is None or not thumbnail.exists():
+            return None
+        try:
+            # The file mtime doubles as the last-used time for eviction.
+            os.utime(thumbnail)
+        except OSError:
+            pass
+        return thumbnail
+
+    def ensure(self, path: Path) -> Optional[Path]:
+        # Returns the cached thumbnail, decoding it first if needed. Safe off the GUI thread.
+        thumbnail = self.lookup(path)
+        if thumbnail is not None:
+            return thumbnail
+        thumbnail = self.thumbnail_path(path)
+        if thumbnail is None:
+            return None
+        image = read_scaled_image(path, self.edge)
+        if image.isNull():
+            return None
+        thumbnail.parent.mkdir(parents=True, exist_ok=True)
+        temporary = thumbnail.with_name(f".{thumbnail.name}.{uuid4().hex[:8]}.part")
+        try:
+            if not image.save(str(temporary), "PNG"):
+                return None
+            os.replace(temporary, thumbnail)
+            added_bytes = thumbnail.stat().st_size
+        except OSError:
+            return None
+        finally:
+            try:
+                temporary.unlink()
+            except OSError:
+                pass
+        self._account(added_bytes)
+        return thumbnail
+
+    def _scan(self) -> list[tuple[float, int, Path]]:
+        files: list[tuple[float, int, Path]] = []
+        for thumbnail in self.root.glob("*/*.png"):
+            try:
+                stat = thumbnail.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, thumbnail))
+        return files
+
+    def _account(self, added_bytes: int) -> None:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _mtime, size, _path in self._scan())
+            else:
+                self._total_bytes += added_bytes
+            if self._total_bytes <= self.budget_bytes:
+                return
+            # Trim to 90% so eviction does not rescan on every following write.
+            target = self.budget_bytes * 9 // 10
+            files = sorted(self._scan())
+            total = sum(size for _mtime, size, _path in files)
+            for _mtime, size, thumbnail in files:
+                if total <= target:
+                    break
+                try:
+                    thumbnail.unlink()
+                except OSError:
+                    continue
+                total -= size
+            self._total_bytes = total
+
+
+class ThumbnailSignals(QObject):
+    ready = pyqtSignal(str, str)
+
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, cache: ThumbnailCache, path: Path):
+        super().__init__()
+        self.cache = cache
+        self.path = path
+        self.signals = ThumbnailSignals()
+
+    def run(self) -> None:
+        thumbnail = self.cache.ensure(self.path)
+        self.signals.ready.emit(str(self.path), str(thumbnail) if thumbnail else "")
+
+
 LIGHT_APP_STYLE = """
 QWidget {
     background-color: #F5F6F8;
@@ -554,7 +1571,7 @@ QFrame#filteredEntriesCard, QFrame#entryEditorCard, QFrame#attachedFilesCard {
     border: 1px solid #E4E8EF;
     border-radius: 14px;
 }
-QLineEdit, QDateEdit, QFontComboBox, QSpinBox, QTextEdit, QListWidget {
+QLineEdit, QDateEdit, LazyFontComboBox, QSpinBox, QTextEdit, QListWidget {
     background: #FFFFFF;
     border: 1px solid #E4E8EF;
     border-radius: 10px;
@@ -597,14 +1614,14 @@ QSpinBox#fontSizeSpin::down-arrow {
     width: 10px;
     height: 6px;
 }
-QTextEdit#entryEditor, QListWidget#filteredEntriesList, QListWidget#attachmentFilesList {
+QTextEdit#entryEditor, QListView#filteredEntriesList, QListWidget#attachmentFilesList {
     background: transparent;
     border: none;
 }
-QComboBox, QDateEdit, QFontComboBox {
+QComboBox, QDateEdit, LazyFontComboBox {
     padding-right: 28px;
 }
-QComboBox::drop-down, QDateEdit::drop-down, QFontComboBox::drop-down {
+QComboBox::drop-down, QDateEdit::drop-down, LazyFontComboBox::drop-down {
     subcontrol-origin: padding;
     subcontrol-position: top right;
     width: 24px;
@@ -614,15 +1631,15 @@ QComboBox::drop-down, QDateEdit::drop-down, QFontComboBox::drop-down {
     border-bottom-right-radius: 10px;
     background: #F7F9FC;
 }
-QComboBox::down-arrow, QDateEdit::down-arrow, QFontComboBox::down-arrow {
+QComboBox::down-arrow, QDateEdit::down-arrow, LazyFontComboBox::down-arrow {
     image: url(icons/chevron-down-light.svg);
     width: 12px;
     height: 8px;
 }
-QComboBox::down-arrow:on, QDateEdit::down-arrow:on, QFontComboBox::down-arrow:on {
+QComboBox::down-arrow:on, QDateEdit::down-arrow:on, LazyFontComboBox::down-arrow:on {
     top: 1px;
 }
-QComboBox QAbstractItemView, QFontComboBox QAbstractItemView {
+QComboBox QAbstractItemView, LazyFontComboBox QAbstractItemView {
     background: #FFFFFF;
     border: 1px solid #E4E8EF;
     border-radius: 10px;
@@ -631,7 +1648,7 @@ QComboBox QAbstractItemView, QFontComboBox QAbstractItemView {
     selection-color: #203B74;
     outline: 0px;
 }
-QComboBox QAbstractItemView::item, QFontComboBox QAbstractItemView::item {
+QComboBox QAbstractItemView::item, LazyFontComboBox QAbstractItemView::item {
     padding: 7px 10px;
     margin: 1px 0px;
     border-radius: 7px;
@@ -659,12 +1676,12 @@ QMenu::separator {
 QTextEdit {
     padding: 10px;
 }
-QListWidget::item {
+QListWidget::item, QListView#filteredEntriesList::item {
     border-radius: 9px;
     margin: 2px 0px;
     padding: 8px 10px;
 }
-QListWidget::item:selected {
+QListWidget::item:selected, QListView#filteredEntriesList::item:selected {
     background: #E9EEFA;
     color: #203B74;
 }
@@ -753,7 +1770,7 @@ QFrame#filteredEntriesCard, QFrame#entryEditorCard, QFrame#attachedFilesCard {
     border: 1px solid #3A465C;
     border-radius: 14px;
 }
-QLineEdit, QDateEdit, QFontComboBox, QSpinBox, QTextEdit, QListWidget {
+QLineEdit, QDateEdit, LazyFontComboBox, QSpinBox, QTextEdit, QListWidget {
     background: #141B27;
     border: 1px solid #3A465C;
     border-radius: 10px;
@@ -797,14 +1814,14 @@ QSpinBox#fontSizeSpin::down-arrow {
     width: 10px;
     height: 6px;
 }
-QTextEdit#entryEditor, QListWidget#filteredEntriesList, QListWidget#attachmentFilesList {
+QTextEdit#entryEditor, QListView#filteredEntriesList, QListWidget#attachmentFilesList {
     background: transparent;
     border: none;
 }
-QComboBox, QDateEdit, QFontComboBox {
+QComboBox, QDateEdit, LazyFontComboBox {
     padding-right: 28px;
 }
-QComboBox::drop-down, QDateEdit::drop-down, QFontComboBox::drop-down {
+QComboBox::drop-down, QDateEdit::drop-down, LazyFontComboBox::drop-down {
     subcontrol-origin: padding;
     subcontrol-position: top right;
     width: 24px;
@@ -814,15 +1831,15 @@ QComboBox::drop-down, QDateEdit::drop-down, QFontComboBox::drop-down {
     border-bottom-right-radius: 10px;
     background: #1B2432;
 }
-QComboBox::down-arrow, QDateEdit::down-arrow, QFontComboBox::down-arrow {
+QComboBox::down-arrow, QDateEdit::down-arrow, LazyFontComboBox::down-arrow {
     image: url(icons/chevron-down-dark.svg);
     width: 12px;
     height: 8px;
 }
-QComboBox::down-arrow:on, QDateEdit::down-arrow:on, QFontComboBox::down-arrow:on {
+QComboBox::down-arrow:on, QDateEdit::down-arrow:on, LazyFontComboBox::down-arrow:on {
     top: 1px;
 }
-QComboBox QAbstractItemView, QFontComboBox QAbstractItemView {
+QComboBox QAbstractItemView, LazyFontComboBox QAbstractItemView {
     background: #182130;
     border: 1px solid #3A465C;
     border-radius: 10px;
@@ -831,7 +1848,7 @@ QComboBox QAbstractItemView, QFontComboBox QAbstractItemView {
     selection-color: #F4F7FF;
     outline: 0px;
 }
-QComboBox QAbstractItemView::item, QFontComboBox QAbstractItemView::item {
+QComboBox QAbstractItemView::item, LazyFontComboBox QAbstractItemView::item {
     padding: 7px 10px;
     margin: 1px 0px;
     border-radius: 7px;
@@ -860,12 +1877,12 @@ QMenu::separator {
 QTextEdit {
     padding: 10px;
 }
-QListWidget::item {
+QListWidget::item, QListView#filteredEntriesList::item {
     border-radius: 9px;
     margin: 2px 0px;
     padding: 8px 10px;
 }
-QListWidget::item:selected {
+QListWidget::item:selected, QListView#filteredEntriesList::item:selected {
     background: #3A476D;
     color: #EFF3FF;
 }
@@ -960,6 +1977,12 @@ QLabel#dialogMessage {
     background: transparent;
     color: #5E6678;
 }
+QTextBrowser#dialogDetails {
+    background: #F6F8FB;
+    border: 1px solid #E7EBF1;
+    border-radius: 8px;
+    color: #2B3446;
+}
 QToolButton#dialogCloseButton {
     background: transparent;
     border: none;
@@ -1001,6 +2024,12 @@ QLabel#dialogMessage {
     background: transparent;
     color: #A7B1C6;
 }
+QTextBrowser#dialogDetails {
+    background: #121926;
+    border: 1px solid #3A465C;
+    border-radius: 8px;
+    color: #D5DBE8;
+}
 QToolButton#dialogCloseButton {
     background: transparent;
     border: none;
@@ -1392,6 +2421,7 @@ class ElegantMessageDialog(QDialog):
         cancel_text: Optional[str] = None,
         close_result: int = QDialog.Rejected,
         bind_enter_to_confirm: bool = False,
+        details: Optional[str] = None,
     ):
         super().__init__(parent)
         self._drag_offset: Optional[QPoint] = None
@@ -1440,6 +2470,15 @@ class ElegantMessageDialog(QDialog):
         message_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
         card_layout.addWidget(message_label)
 
+        if details is not None:
+            details_view = QTextBrowser()
+            details_view.setObjectName("dialogDetails")
+            details_view.setLineWrapMode(QTextEdit.NoWrap)
+            details_view.setMinimumSize(640, 320)
+            details_view.setPlainText(details)
+            details_view.moveCursor(QTextCursor.End)
+            card_layout.addWidget(details_view)
+
         button_row = QHBoxLayout()
         button_row.addStretch(1)
         if cancel_text:
@@ -1531,6 +2570,21 @@ def show_warning_popup(parent: Optional[QWidget], title: str, message: str) -> N
     dialog.exec()
 
 
+def show_recent_log_popup(parent: Optional[QWidget]) -> None:
+    lines = recent_log_lines()
+    dialog = ElegantMessageDialog(
+        parent=parent,
+        title="最近日志",
+        message=f"最近 {len(lines)} 行标准错误输出（最多保留 {LOG_RING_LINES} 行）。"
+        if lines
+        else "暂无日志输出。",
+        is_dark=_resolve_dark_mode(parent),
+        confirm_text="知道了",
+        details="\n".join(lines) if lines else None,
+    )
+    dialog.exec()
+
+
 def ask_confirmation_popup(
     parent: Optional[QWidget],
     title: str,
@@ -1588,22 +2642,900 @@ def normalize_path_for_compare(path: Path) -> str:
     return os.path.normcase(str(resolved))
 
 
-@dataclass
-class AttachmentDraft:
-    file_name: str
-    file_path: str
-    is_image: int
+def encode_entry_html(content_html: str, compress: bool = True):
+    if not compress or not content_html:
+        return content_html
+    compressor = zlib.compressobj(level=6, zdict=QT_HTML_ZDICT)
+    return (
+        COMPRESSED_HTML_HEADER
+        + compressor.compress(content_html.encode("utf-8"))
+        + compressor.flush()
+    )
 
 
-class DiaryDatabase:
-    def __init__(self, db_path: Path):
-        self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
+def date_ordinal(value: date) -> int:
+    # Matches CAST(julianday(entry_date) AS INTEGER) on the SQLite side.
+    return value.toordinal() + 1721424
+
+
+def decode_entry_html(stored) -> str:
+    if stored is None:
+        return ""
+    if isinstance(stored, str):
+        return stored
+    raw = bytes(stored)
+    if raw.startswith(COMPRESSED_HTML_HEADER):
+        decompressor = zlib.decompressobj(zdict=QT_HTML_ZDICT)
+        raw = decompressor.decompress(raw[len(COMPRESSED_HTML_HEADER) :]) + decompressor.flush()
+    return raw.decode("utf-8", errors="replace")
+
+
+class StoredEntry:
+    # Row wrapper that inflates content_html only when a caller reads it.
+    def __init__(self, row: sqlite3.Row):
+        self._row = row
+        self._content_html: Optional[str] = None
+
+    def __getitem__(self, key: str):
+        if key == "content_html":
+            if self._content_html is None:
+                self._content_html = decode_entry_html(self._row["content_html"])
+            return self._content_html
+        return self._row[key]
+
+    def keys(self) -> list[str]:
+        return self._row.keys()
+
+
+@dataclass
+class HtmlRewriteReport:
+    rows_rewritten: int
+    size_before_bytes: int
+    size_after_bytes: int
+    load_ms_before: float
+    load_ms_after: float
+
+
+@dataclass
+class AttachmentDraft:
+    file_name: str
+    file_path: str
+    is_image: int
+    content_hash: Optional[str] = None
+
+
+@dataclass
+class AttachmentVerification:
+    checked: int
+    missing: list[str]
+    corrupted: list[str]
+
+
+@dataclass
+class EntryStatsSummary:
+    today: date
+    total_entries: int
+    total_chars: int
+    total_attachments: int
+    year_entries: int
+    year_chars: int
+    month_entries: int
+    month_chars: int
+    current_streak: int
+    longest_streak: int
+    day_entries: dict[str, int]
+
+
+@dataclass
+class EntryDeletion:
+    deleted_entry_ids: list[int]
+    attachment_paths: list[str]
+    unreferenced_paths: list[str]
+
+
+class QueryStats:
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.max_ms = 0.0
+        self.samples: deque[float] = deque(maxlen=DB_TRACE_MAX_SAMPLES)
+        self.full_scans: list[str] = []
+
+    def record(self, elapsed_ms: float, rows: int) -> None:
+        self.calls += 1
+        self.rows += rows
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class QueryProfiler:
+    # Shared by every DiaryDatabase in the process, including the search worker's connection.
+    _FULL_SCAN_PATTERN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+    _EXPLAINABLE_PREFIXES = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.methods: dict[str, QueryStats] = {}
+        self.statements: dict[str, QueryStats] = {}
+
+    def _stats(self, table: dict[str, QueryStats], key: str) -> QueryStats:
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = QueryStats()
+        return stats
+
+    def record_method(self, name: str, elapsed_ms: float, rows: int) -> None:
+        with self._lock:
+            self._stats(self.methods, name).record(elapsed_ms, rows)
+
+    def record_statement(self, sql: str, elapsed_ms: float, rows: int) -> None:
+        with self._lock:
+            self._stats(self.statements, sql).record(elapsed_ms, rows)
+
+    def extend_statement(self, sql: str, elapsed_ms: float, rows: int) -> None:
+        # Later fetches on the same cursor belong to the call that was already recorded.
+        with self._lock:
+            stats = self._stats(self.statements, sql)
+            stats.rows += rows
+            if stats.samples:
+                stats.samples[-1] += elapsed_ms
+                stats.max_ms = max(stats.max_ms, stats.samples[-1])
+
+    def needs_plan(self, sql: str) -> bool:
+        # Plans are checked once, the first time a statement text is seen.
+        with self._lock:
+            if sql in self.statements:
+                return False
+            self.statements[sql] = QueryStats()
+        return sql.upper().startswith(self._EXPLAINABLE_PREFIXES)
+
+    def record_plan(self, conn: sqlite3.Connection, sql: str, params) -> None:
+        try:
+            tables = {
+                str(row[0])
+                for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except sqlite3.Error:
+            return
+        full_scans = []
+        for row in plan:
+            detail = str(row[-1])
+            match = self._FULL_SCAN_PATTERN.match(detail)
+            if match and match.group(1) in tables and "INDEX" not in detail:
+                full_scans.append(detail)
+        if full_scans:
+            with self._lock:
+                self._stats(self.statements, sql).full_scans = full_scans
+
+    @staticmethod
+    def _format_rows(title: str, table: dict[str, QueryStats], width: int) -> list[str]:
+        lines = [
+            title,
+            f"{'calls':>7} {'rows':>8} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}  name",
+        ]
+        ranked = sorted(
+            (item for item in table.items() if item[1].calls),
+            key=lambda item: sum(item[1].samples),
+            reverse=True,
+        )
+        for name, stats in ranked:
+            label = name if len(name) <= width else name[: width - 1] + "…"
+            lines.append(
+                f"{stats.calls:>7} {stats.rows:>8} {stats.percentile(0.5):>9.3f} "
+                f"{stats.percentile(0.95):>9.3f} {stats.max_ms:>9.3f}  {label}"
+            )
+            for detail in stats.full_scans:
+                lines.append(f"{'':>47}  ! full scan: {detail}")
+        return lines
+
+    def report(self) -> str:
+        with self._lock:
+            lines = self._format_rows("DiaryDatabase methods", self.methods, DB_TRACE_SQL_WIDTH)
+            lines.append("")
+            lines.extend(self._format_rows("SQL statements", self.statements, DB_TRACE_SQL_WIDTH))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Path) -> None:
+        report = self.report()
+        try:
+            path.write_text(report, encoding="utf-8")
+        except OSError:
+            pass
+        if sys.stderr is not None:
+            print(report, file=sys.stderr)
+
+
+QUERY_PROFILER: Optional[QueryProfiler] = QueryProfiler() if is_db_trace_enabled() else None
+
+
+def count_result_rows(result) -> int:
+    if result is None or isinstance(result, bool):
+        return 0
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, (StoredEntry, sqlite3.Row, EntryDeletion)):
+        return 1
+    return 0
+
+
+class TracedCursor:
+    # Fetch time is part of a statement's latency: sqlite3 steps past the first row lazily.
+    def __init__(self, cursor: sqlite3.Cursor, profiler: QueryProfiler, sql: str):
+        self._cursor = cursor
+        self._profiler = profiler
+        self._sql = sql
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._profiler.extend_statement(
+            self._sql, (time.perf_counter() - started) * 1000, 0 if row is None else 1
+        )
+        return row
+
+    def fetchall(self) -> list:
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._profiler.extend_statement(self._sql, (time.perf_counter() - started) * 1000, len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+class TracedConnection:
+    def __init__(self, conn: sqlite3.Connection, profiler: QueryProfiler):
+        self._conn = conn
+        self._profiler = profiler
+
+    def execute(self, sql: str, params=()) -> TracedCursor:
+        key = " ".join(sql.split())
+        explain = self._profiler.needs_plan(key)
+        started = time.perf_counter()
+        cursor = self._conn.execute(sql, params)
+        self._profiler.record_statement(key, (time.perf_counter() - started) * 1000, 0)
+        if explain:
+            self._profiler.record_plan(self._conn, sql, params)
+        return TracedCursor(cursor, self._profiler, key)
+
+    def executemany(self, sql: str, seq_of_params) -> sqlite3.Cursor:
+        key = " ".join(sql.split())
+        started = time.perf_counter()
+        cursor = self._conn.executemany(sql, seq_of_params)
+        self._profiler.record_statement(
+            key, (time.perf_counter() - started) * 1000, max(cursor.rowcount, 0)
+        )
+        return cursor
+
+    def executescript(self, sql_script: str) -> sqlite3.Cursor:
+        key = " ".join(sql_script.split())
+        started = time.perf_counter()
+        cursor = self._conn.executescript(sql_script)
+        self._profiler.record_statement(key, (time.perf_counter() - started) * 1000, 0)
+        return cursor
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+
+class DiaryDatabase:
+    # Public methods timed when XFY_DIARY_DB_TRACE is on; transaction() is a context manager.
+    _UNTRACED_METHODS = {"transaction", "interrupt", "close"}
+
+    def __init__(
+        self,
+        db_path: Path,
+        read_only: bool = False,
+        profile_name: Optional[str] = None,
+    ):
+        self.db_path = db_path
+        self.read_only = read_only
+        # Read-only connections serve background workers and are interrupted from the GUI thread.
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=not read_only)
+        self.conn.row_factory = sqlite3.Row
+        if QUERY_PROFILER is not None:
+            self.conn = TracedConnection(self.conn, QUERY_PROFILER)
+            self._trace_methods(QUERY_PROFILER)
         self.conn.execute("PRAGMA foreign_keys = ON")
-        self._init_schema()
+        self.full_text_search_enabled = False
+        self.entry_date_columns_enabled = False
+        self.profile = SQLITE_PROFILES[DEFAULT_SQLITE_PROFILE]
+        self._last_checkpoint_at = time.monotonic()
+        self._transaction_depth = 0
+        self._replaced_attachment_files: list[Path] = []
+        self.compress_html = is_html_compression_enabled()
+        if read_only:
+            self.conn.execute("PRAGMA query_only = ON")
+            self.profile = self._resolve_profile(profile_name)
+            self._apply_connection_pragmas()
+            self._detect_optional_schema()
+            return
+        self.conn.execute(f"PRAGMA busy_timeout = {self.profile.busy_timeout_ms}")
+        self._run_migrations()
+        self._detect_optional_schema()
+        self.profile = self._resolve_profile(profile_name)
+        self._apply_profile()
+
+    def _trace_methods(self, profiler: QueryProfiler) -> None:
+        # Bound per instance so that an untraced run keeps plain method calls.
+        for name in dir(type(self)):
+            if name.startswith("_") or name in self._UNTRACED_METHODS:
+                continue
+            method = getattr(self, name)
+            if callable(method):
+                setattr(self, name, self._traced_method(profiler, name, method))
+
+    @staticmethod
+    def _traced_method(profiler: QueryProfiler, name: str, method: Callable) -> Callable:
+        def traced(*args, **kwargs):
+            started = time.perf_counter()
+            result = method(*args, **kwargs)
+            profiler.record_method(
+                name, (time.perf_counter() - started) * 1000, count_result_rows(result)
+            )
+            return result
+
+        return traced
+
+    def _resolve_profile(self, profile_name: Optional[str]) -> SQLiteProfile:
+        candidates = [profile_name, os.getenv(DB_PROFILE_ENV_VAR, "")]
+        try:
+            candidates.append(self.get_meta(DB_PROFILE_META_KEY))
+        except sqlite3.Error:
+            pass
+        for candidate in candidates:
+            key = (candidate or "").strip().casefold()
+            if key in SQLITE_PROFILES:
+                return SQLITE_PROFILES[key]
+        return SQLITE_PROFILES[DEFAULT_SQLITE_PROFILE]
+
+    def _apply_connection_pragmas(self) -> None:
+        self.conn.execute(f"PRAGMA busy_timeout = {self.profile.busy_timeout_ms}")
+        self.conn.execute(f"PRAGMA cache_size = {-self.profile.cache_size_kib}")
+        self.conn.execute(f"PRAGMA mmap_size = {self.profile.mmap_size_bytes}")
+
+    def _apply_profile(self) -> None:
+        self._apply_connection_pragmas()
+        try:
+            self.conn.execute(f"PRAGMA journal_mode = {self.profile.journal_mode}")
+        except sqlite3.Error:
+            # Leaving WAL needs exclusive access; keep the current journal until the next launch.
+            pass
+        self.conn.execute(f"PRAGMA synchronous = {self.profile.synchronous}")
+        if self.profile.wal_autocheckpoint_pages > 0:
+            self.conn.execute(
+                f"PRAGMA wal_autocheckpoint = {self.profile.wal_autocheckpoint_pages}"
+            )
+
+    def set_profile(self, profile_name: str) -> None:
+        key = profile_name.strip().casefold()
+        if key not in SQLITE_PROFILES:
+            raise ValueError(f"Unknown SQLite profile: {profile_name}")
+        self.set_meta(DB_PROFILE_META_KEY, key)
+        self.profile = SQLITE_PROFILES[key]
+        self._apply_profile()
+
+    def _commit(self) -> None:
+        if self._transaction_depth > 0:
+            return
+        self.conn.commit()
+        self._checkpoint_if_due()
+
+    @contextmanager
+    def transaction(self) -> Iterator["DiaryDatabase"]:
+        # Writes inside the block share one commit; nested blocks join the outer one.
+        if self._transaction_depth > 0:
+            yield self
+            return
+        self._transaction_depth = 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth = 0
+            self.conn.rollback()
+            raise
+        self._transaction_depth = 0
+        self._commit()
+
+    def _checkpoint_if_due(self) -> None:
+        interval = self.profile.checkpoint_interval_seconds
+        if interval <= 0 or self.profile.journal_mode != "WAL":
+            return
+        now = time.monotonic()
+        if now - self._last_checkpoint_at < interval:
+            return
+        self._last_checkpoint_at = now
+        self.checkpoint()
+
+    def checkpoint(self, mode: str = "PASSIVE") -> None:
+        if self.read_only or self.profile.journal_mode != "WAL":
+            return
+        try:
+            self.conn.execute(f"PRAGMA wal_checkpoint({mode})")
+        except sqlite3.Error:
+            pass
+
+    def _has_table(self, name: str) -> bool:
+        cur = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (name,),
+        )
+        return cur.fetchone() is not None
+
+    def _schema_migrations(self) -> list[tuple[int, Callable[[], None]]]:
+        # Append new steps with the next version number; never reorder or edit shipped ones.
+        return [
+            (1, self._migrate_base_schema),
+            (2, self._migrate_normalize_attachment_paths),
+            (3, self._migrate_split_entry_bodies),
+            (4, self._migrate_entry_stats),
+            (5, self._migrate_attachment_catalog),
+            (6, self._migrate_content_addressed_attachments),
+            (7, self._migrate_attachment_catalog_checks),
+            (8, self._migrate_entry_date_columns),
+            (9, self._migrate_search_index),
+        ]
+
+    @property
+    def schema_version(self) -> int:
+        row = self.conn.execute("PRAGMA user_version").fetchone()
+        return int(row[0]) if row else 0
+
+    def _run_migrations(self) -> None:
+        current_version = self.schema_version
+        # Table rebuilds must not cascade into child tables, and the pragma is ignored
+        # inside a transaction, so it is switched off around the whole run.
+        self.conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            for version, migrate in self._schema_migrations():
+                if version <= current_version:
+                    continue
+                try:
+                    if not self.conn.in_transaction:
+                        self.conn.execute("BEGIN")
+                    migrate()
+                    self.conn.execute(f"PRAGMA user_version = {version}")
+                    self.conn.commit()
+                except BaseException:
+                    self.conn.rollback()
+                    self._replaced_attachment_files.clear()
+                    raise
+        finally:
+            self.conn.execute("PRAGMA foreign_keys = ON")
+        # Files superseded by a migration are removed only once the new paths are committed.
+        for path in self._replaced_attachment_files:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self._replaced_attachment_files.clear()
+
+    def _attachment_source(self, relative: Path) -> Path:
+        # Files the data-root sync has not copied yet are read from the legacy root instead,
+        # so opening the database never waits for the whole attachment tree.
+        source = self.db_path.parent / relative
+        sync = DATA_ROOT_SYNC
+        if sync is None or source.exists() or self.db_path.parent.resolve() != sync.data_root:
+            return source
+        key = Path(*relative.parts[1:]).as_posix()
+        if not sync.claim(key) and source.exists():
+            return source
+        legacy_source = sync.source_dir / key
+        return legacy_source if legacy_source.exists() else source
+
+    def _migrate_normalize_attachment_paths(self) -> None:
+        normalize_attachment_paths(self.conn, APP_ROOT, self.db_path.parent)
+
+    def _migrate_split_entry_bodies(self) -> None:
+        # List, calendar and memory queries only need dates and titles; keeping the bodies in
+        # their own table stops those scans from paging through long overflow chains.
+        sequence_row = self.conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'entries'"
+        ).fetchone()
+        for statement in (
+            "DROP TABLE IF EXISTS entries_fts",
+            """
+            CREATE TABLE entry_bodies (
+                entry_id INTEGER PRIMARY KEY,
+                content_html TEXT NOT NULL,
+                content_text TEXT NOT NULL,
+                FOREIGN KEY(entry_id) REFERENCES entries(id) ON DELETE CASCADE
+            )
+            """,
+            """
+            INSERT INTO entry_bodies(entry_id, content_html, content_text)
+            SELECT id, content_html, content_text
+            FROM entries
+            """,
+            """
+            CREATE TABLE entries_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entry_date TEXT NOT NULL,
+                title TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """,
+            """
+            INSERT INTO entries_new(id, entry_date, title, updated_at)
+            SELECT id, entry_date, title, updated_at
+            FROM entries
+            """,
+            "DROP TABLE entries",
+            "ALTER TABLE entries_new RENAME TO entries",
+            """
+            CREATE INDEX idx_entries_list_covering
+                ON entries(entry_date DESC, updated_at DESC, id DESC, title)
+            """,
+            """
+            CREATE VIEW IF NOT EXISTS entry_search_source AS
+            SELECT e.id, e.title, b.content_text
+            FROM entries AS e
+            JOIN entry_bodies AS b ON b.entry_id = e.id
+            """,
+        ):
+            self.conn.execute(statement)
+        if sequence_row is not None:
+            # Keep AUTOINCREMENT from reusing ids of entries deleted before the rebuild.
+            self.conn.execute(
+                "UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = 'entries'",
+                (int(sequence_row["seq"]),),
+            )
+
+    @staticmethod
+    def _entry_stats_upsert(date_sql: str, entries: str, chars: str, attachments: str) -> str:
+        # One delta applied to the total, year, month and day rows of a date.
+        rows = ",\n".join(
+            f"({kind}, {period}, {entries}, {chars}, {attachments})"
+            for kind, period in (
+                ("'total'", "''"),
+                ("'year'", f"substr({date_sql}, 1, 4)"),
+                ("'month'", f"substr({date_sql}, 1, 7)"),
+                ("'day'", date_sql),
+            )
+        )
+        return f"""
+            INSERT INTO entry_stats(kind, period, entry_count, char_count, attachment_count)
+            VALUES {rows}
+            ON CONFLICT(kind, period) DO UPDATE SET
+                entry_count = entry_count + excluded.entry_count,
+                char_count = char_count + excluded.char_count,
+                attachment_count = attachment_count + excluded.attachment_count;
+        """
+
+    def _migrate_entry_stats(self) -> None:
+        # Aggregates are kept by triggers so the dashboard reads a handful of rows no matter
+        # how long the diary gets. writing_streaks holds maximal runs of consecutive days
+        # (as Julian day numbers) and is split or merged when a day gains or loses entries.
+        upsert = self._entry_stats_upsert
+        body_chars = "COALESCE((SELECT length(content_text) FROM entry_bodies WHERE entry_id = {id}), 0)"
+        attachment_total = "(SELECT COUNT(*) FROM attachments WHERE entry_id = {id})"
+        entry_date_of = "(SELECT entry_date FROM entries WHERE id = {id})"
+        day = "CAST(julianday(new.period) AS INTEGER)"
+        activate_day = f"""
+            UPDATE writing_streaks
+            SET end_day = {day}, length = {day} - start_day + 1
+            WHERE end_day = {day} - 1;
+            INSERT INTO writing_streaks(start_day, end_day, length)
+            SELECT {day}, {day}, 1
+            WHERE NOT EXISTS (SELECT 1 FROM writing_streaks WHERE end_day = {day});
+            UPDATE writing_streaks
+            SET
+                end_day = (SELECT n.end_day FROM writing_streaks AS n WHERE n.start_day = {day} + 1),
+                length = (SELECT n.end_day FROM writing_streaks AS n WHERE n.start_day = {day} + 1)
+                    - start_day + 1
+            WHERE end_day = {day}
+              AND EXISTS (SELECT 1 FROM writing_streaks WHERE start_day = {day} + 1);
+            DELETE FROM writing_streaks WHERE start_day = {day} + 1;
+        """
+        containing_run = (
+            f"start_day = (SELECT MAX(start_day) FROM writing_streaks WHERE start_day <= {day}) "
+            f"AND end_day >= {day}"
+        )
+        deactivate_day = f"""
+            INSERT INTO writing_streaks(start_day, end_day, length)
+            SELECT {day} + 1, end_day, end_day - {day}
+            FROM writing_streaks
+            WHERE {containing_run} AND end_day > {day};
+            UPDATE writing_streaks
+            SET end_day = {day} - 1, length = {day} - start_day
+            WHERE {containing_run};
+            DELETE FROM writing_streaks WHERE start_day = {day} AND end_day < start_day;
+        """
+        is_dated_day = "new.kind = 'day' AND julianday(new.period) IS NOT NULL"
+        for statement in (
+            """
+            CREATE TABLE entry_stats (
+                kind TEXT NOT NULL,
+                period TEXT NOT NULL,
+                entry_count INTEGER NOT NULL DEFAULT 0,
+                char_count INTEGER NOT NULL DEFAULT 0,
+                attachment_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY(kind, period)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE writing_streaks (
+                start_day INTEGER PRIMARY KEY,
+                end_day INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            )
+            """,
+            "CREATE INDEX idx_writing_streaks_end ON writing_streaks(end_day)",
+            "CREATE INDEX idx_writing_streaks_length ON writing_streaks(length)",
+            "CREATE INDEX IF NOT EXISTS idx_attachments_entry ON attachments(entry_id)",
+            f"""
+            CREATE TRIGGER entry_stats_streak_after_insert
+            AFTER INSERT ON entry_stats
+            WHEN {is_dated_day} AND new.entry_count > 0 BEGIN
+                {activate_day}
+            END
+            """,
+            f"""
+            CREATE TRIGGER entry_stats_streak_after_gain
+            AFTER UPDATE OF entry_count ON entry_stats
+            WHEN {is_dated_day} AND old.entry_count <= 0 AND new.entry_count > 0 BEGIN
+                {activate_day}
+            END
+            """,
+            f"""
+            CREATE TRIGGER entry_stats_streak_after_loss
+            AFTER UPDATE OF entry_count ON entry_stats
+            WHEN {is_dated_day} AND old.entry_count > 0 AND new.entry_count <= 0 BEGIN
+                {deactivate_day}
+            END
+            """,
+            f"""
+            CREATE TRIGGER entries_stats_after_insert
+            AFTER INSERT ON entries BEGIN
+                {upsert("new.entry_date", "1", "0", "0")}
+            END
+            """,
+            f"""
+            CREATE TRIGGER entries_stats_after_date_update
+            AFTER UPDATE OF entry_date ON entries
+            WHEN old.entry_date IS NOT new.entry_date BEGIN
+                {upsert(
+                    "old.entry_date",
+                    "-1",
+                    "-" + body_chars.format(id="new.id"),
+                    "-" + attachment_total.format(id="new.id"),
+                )}
+                {upsert(
+                    "new.entry_date",
+                    "1",
+                    body_chars.format(id="new.id"),
+                    attachment_total.format(id="new.id"),
+                )}
+            END
+            """,
+            # BEFORE DELETE still sees the body and attachments that the delete cascades to;
+            # the child triggers below skip rows whose entry is already gone.
+            f"""
+            CREATE TRIGGER entries_stats_before_delete
+            BEFORE DELETE ON entries BEGIN
+                {upsert(
+                    "old.entry_date",
+                    "-1",
+                    "-" + body_chars.format(id="old.id"),
+                    "-" + attachment_total.format(id="old.id"),
+                )}
+            END
+            """,
+            f"""
+            CREATE TRIGGER entry_bodies_stats_after_insert
+            AFTER INSERT ON entry_bodies
+            WHEN EXISTS (SELECT 1 FROM entries WHERE id = new.entry_id) BEGIN
+                {upsert(entry_date_of.format(id="new.entry_id"), "0", "length(new.content_text)", "0")}
+            END
+            """,
+            f"""
+            CREATE TRIGGER entry_bodies_stats_after_update
+            AFTER UPDATE OF content_text ON entry_bodies
+            WHEN EXISTS (SELECT 1 FROM entries WHERE id = new.entry_id) BEGIN
+                {upsert(
+                    entry_date_of.format(id="new.entry_id"),
+                    "0",
+                    "length(new.content_text) - length(old.content_text)",
+                    "0",
+                )}
+            END
+            """,
+            f"""
+            CREATE TRIGGER entry_bodies_stats_after_delete
+            AFTER DELETE ON entry_bodies
+            WHEN EXISTS (SELECT 1 FROM entries WHERE id = old.entry_id) BEGIN
+                {upsert(entry_date_of.format(id="old.entry_id"), "0", "-length(old.content_text)", "0")}
+            END
+            """,
+            f"""
+            CREATE TRIGGER attachments_stats_after_insert
+            AFTER INSERT ON attachments
+            WHEN EXISTS (SELECT 1 FROM entries WHERE id = new.entry_id) BEGIN
+                {upsert(entry_date_of.format(id="new.entry_id"), "0", "0", "1")}
+            END
+            """,
+            f"""
+            CREATE TRIGGER attachments_stats_after_delete
+            AFTER DELETE ON attachments
+            WHEN EXISTS (SELECT 1 FROM entries WHERE id = old.entry_id) BEGIN
+                {upsert(entry_date_of.format(id="old.entry_id"), "0", "0", "-1")}
+            END
+            """,
+            """
+            INSERT INTO entry_stats(kind, period, entry_count, char_count, attachment_count)
+            WITH per_entry AS (
+                SELECT
+                    e.entry_date,
+                    length(COALESCE(b.content_text, '')) AS chars,
+                    (SELECT COUNT(*) FROM attachments AS a WHERE a.entry_id = e.id) AS attachments
+                FROM entries AS e
+                LEFT JOIN entry_bodies AS b ON b.entry_id = e.id
+            )
+            SELECT 'total', '', COUNT(*), COALESCE(SUM(chars), 0), COALESCE(SUM(attachments), 0)
+            FROM per_entry
+            UNION ALL
+            SELECT 'year', substr(entry_date, 1, 4), COUNT(*), SUM(chars), SUM(attachments)
+            FROM per_entry
+            GROUP BY substr(entry_date, 1, 4)
+            UNION ALL
+            SELECT 'month', substr(entry_date, 1, 7), COUNT(*), SUM(chars), SUM(attachments)
+            FROM per_entry
+            GROUP BY substr(entry_date, 1, 7)
+            UNION ALL
+            SELECT 'day', entry_date, COUNT(*), SUM(chars), SUM(attachments)
+            FROM per_entry
+            GROUP BY entry_date
+            """,
+        ):
+            self.conn.execute(statement)
+
+    def _migrate_attachment_catalog(self) -> None:
+        # Catalog columns stay NULL until the background catalog worker has read the file.
+        columns = self._table_columns("attachments")
+        for name, column_type in (
+            ("byte_size", "INTEGER"),
+            ("mtime", "REAL"),
+            ("mime_type", "TEXT"),
+            ("image_width", "INTEGER"),
+            ("image_height", "INTEGER"),
+            ("captured_at", "TEXT"),
+        ):
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE attachments ADD COLUMN {name} {column_type}")
+        for statement in (
+            "CREATE INDEX IF NOT EXISTS idx_attachments_entry ON attachments(entry_id)",
+            "CREATE INDEX IF NOT EXISTS idx_attachments_path ON attachments(file_path)",
+            """
+            CREATE INDEX IF NOT EXISTS idx_attachments_uncatalogued
+                ON attachments(entry_id) WHERE byte_size IS NULL
+            """,
+        ):
+            self.conn.execute(statement)
+
+    def _migrate_content_addressed_attachments(self) -> None:
+        # Managed files move to attachments/<xx>/<sha256><suffix>; identical files collapse into
+        # one blob whose ref_count the triggers keep equal to the number of attachment rows.
+        data_root = self.db_path.parent
+        if "content_hash" not in self._table_columns("attachments"):
+            self.conn.execute("ALTER TABLE attachments ADD COLUMN content_hash TEXT")
+        for statement in (
+            """
+            CREATE TABLE attachment_blobs (
+                sha256 TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                byte_size INTEGER NOT NULL,
+                ref_count INTEGER NOT NULL DEFAULT 0,
+                verified_at TEXT
+            )
+            """,
+            "CREATE INDEX idx_attachments_content_hash ON attachments(content_hash)",
+        ):
+            self.conn.execute(statement)
+
+        now = datetime.now().isoformat(timespec="seconds")
+        blobs: dict[str, tuple[str, int]] = {}
+        digests_by_path: dict[str, Optional[str]] = {}
+        updates: list[tuple[str, str, int]] = []
+        for row in self.conn.execute("SELECT id, file_path FROM attachments").fetchall():
+            stored_path = str(row["file_path"])
+            relative = Path(stored_path)
+            if relative.is_absolute() or not relative.parts or relative.parts[0] != ATTACHMENTS_DIR:
+                continue
+            source = self._attachment_source(relative)
+            if stored_path not in digests_by_path:
+                try:
+                    digests_by_path[stored_path] = hash_file(source)
+                except OSError:
+                    digests_by_path[stored_path] = None
+            digest = digests_by_path[stored_path]
+            if digest is None:
+                continue
+            if digest not in blobs:
+                target = content_addressed_path(digest, source.suffix)
+                if not (data_root / target).exists():
+                    (data_root / target).parent.mkdir(parents=True, exist_ok=True)
+                    try:
+                        os.link(source, data_root / target)
+                    except OSError:
+                        shutil.copy2(source, data_root / target)
+                blobs[digest] = (target.as_posix(), source.stat().st_size)
+            blob_path = blobs[digest][0]
+            if blob_path != stored_path and source == data_root / relative:
+                self._replaced_attachment_files.append(source)
+            updates.append((blob_path, digest, int(row["id"])))
+
+        self.conn.executemany(
+            "UPDATE attachments SET file_path = ?, content_hash = ? WHERE id = ?", updates
+        )
+        ref_counts = {
+            str(row["content_hash"]): int(row["count"])
+            for row in self.conn.execute(
+                """
+                SELECT content_hash, COUNT(*) AS count
+                FROM attachments
+                WHERE content_hash IS NOT NULL
+                GROUP BY content_hash
+                """
+            ).fetchall()
+        }
+        self.conn.executemany(
+            """
+            INSERT INTO attachment_blobs(sha256, file_path, byte_size, ref_count, verified_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (digest, blob_path, byte_size, ref_counts.get(digest, 0), now)
+                for digest, (blob_path, byte_size) in blobs.items()
+            ],
+        )
+        self._replaced_attachment_files = list(dict.fromkeys(self._replaced_attachment_files))
+        for statement in (
+            """
+            CREATE TRIGGER attachments_blob_after_insert
+            AFTER INSERT ON attachments
+            WHEN new.content_hash IS NOT NULL BEGIN
+                INSERT INTO attachment_blobs(sha256, file_path, byte_size, ref_count)
+                VALUES (new.content_hash, new.file_path, COALESCE(new.byte_size, 0), 1)
+                ON CONFLICT(sha256) DO UPDATE SET ref_count = ref_count + 1;
+            END
+            """,
+            """
+            CREATE TRIGGER attachments_blob_after_delete
+            AFTER DELETE ON attachments
+            WHEN old.content_hash IS NOT NULL BEGIN
+                UPDATE attachment_blobs SET ref_count = ref_count - 1 WHERE sha256 = old.content_hash;
+                DELETE FROM attachment_blobs WHERE sha256 = old.content_hash AND ref_count <= 0;
+            END
+            """,
+            """
+            CREATE TRIGGER attachments_blob_after_size_update
+            AFTER UPDATE OF byte_size ON attachments
+            WHEN new.content_hash IS NOT NULL AND new.byte_size IS NOT NULL BEGIN
+                UPDATE attachment_blobs SET byte_size = new.byte_size
+                WHERE sha256 = new.content_hash AND byte_size = 0;
+            END
+            """,
+        ):
+            self.conn.execute(statement)
+
+    def _migrate_attachment_catalog_checks(self) -> None:
+        # When the catalog last found a row's file missing; such rows are retried only after a week.
+        if "catalog_checked_at" not in self._table_columns("attachments"):
+            self.conn.execute("ALTER TABLE attachments ADD COLUMN catalog_checked_at REAL")
 
-    def _init_schema(self) -> None:
+    def _migrate_base_schema(self) -> None:
         self.conn.executescript(
             """
             CREATE TABLE IF NOT EXISTS entries (
@@ -1632,44 +3564,335 @@ class DiaryDatabase:
 
             CREATE INDEX IF NOT EXISTS idx_entries_date ON entries(entry_date);
             CREATE INDEX IF NOT EXISTS idx_entries_updated ON entries(updated_at);
+            CREATE INDEX IF NOT EXISTS idx_entries_list
+                ON entries(entry_date DESC, updated_at DESC, id DESC);
             """
         )
-        self.conn.commit()
+
+    def _table_columns(self, table: str) -> set[str]:
+        return {str(row["name"]) for row in self.conn.execute(f"PRAGMA table_xinfo({table})")}
+
+    def _detect_optional_schema(self) -> None:
+        # Migrations 8 and 9 leave their objects out on SQLite builds that cannot create them.
+        self.entry_date_columns_enabled = "entry_month_day" in self._table_columns("entries")
+        self.full_text_search_enabled = self._has_table("entries_fts")
+
+    def _apply_optional_schema(self, statements: Sequence[str]) -> None:
+        # All or nothing inside the migration's transaction; an unsupported feature is skipped
+        # and the version is still recorded.
+        self.conn.execute("SAVEPOINT optional_schema")
+        try:
+            for statement in statements:
+                self.conn.execute(statement)
+        except sqlite3.Error:
+            self.conn.execute("ROLLBACK TO optional_schema")
+        self.conn.execute("RELEASE optional_schema")
+
+    def _migrate_entry_date_columns(self) -> None:
+        # Virtual generated columns can be added to existing tables and indexed, so
+        # month-day and day-range lookups become index seeks instead of strftime() scans.
+        # SQLite before 3.31 has no generated columns and keeps the strftime() filters.
+        columns = self._table_columns("entries")
+        statements = []
+        if "entry_month_day" not in columns:
+            statements.append(
+                """
+                ALTER TABLE entries ADD COLUMN entry_month_day TEXT
+                GENERATED ALWAYS AS (substr(entry_date, 6, 5)) VIRTUAL
+                """
+            )
+        if "entry_day_ordinal" not in columns:
+            statements.append(
+                """
+                ALTER TABLE entries ADD COLUMN entry_day_ordinal INTEGER
+                GENERATED ALWAYS AS (CAST(julianday(entry_date) AS INTEGER)) VIRTUAL
+                """
+            )
+        statements += [
+            """
+            CREATE INDEX IF NOT EXISTS idx_entries_month_day
+                ON entries(entry_month_day, entry_date)
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_entries_day_ordinal ON entries(entry_day_ordinal)",
+        ]
+        self._apply_optional_schema(statements)
+
+    def _migrate_search_index(self) -> None:
+        # Trigram tokenization lets Chinese text match by substring without word segmentation.
+        # Builds of SQLite without FTS5 or the trigram tokenizer keep the LIKE search.
+        statements = [
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+                title,
+                content_text,
+                content = 'entry_search_source',
+                content_rowid = 'id',
+                tokenize = 'trigram'
+            )
+            """,
+            # An entry is indexed once its body row exists; title and body changes
+            # re-index it from whichever side changed.
+            """
+            CREATE TRIGGER IF NOT EXISTS entry_bodies_fts_after_insert
+            AFTER INSERT ON entry_bodies BEGIN
+                INSERT INTO entries_fts(rowid, title, content_text)
+                SELECT e.id, e.title, new.content_text
+                FROM entries AS e
+                WHERE e.id = new.entry_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS entry_bodies_fts_after_update
+            AFTER UPDATE OF content_text ON entry_bodies BEGIN
+                INSERT INTO entries_fts(entries_fts, rowid, title, content_text)
+                SELECT 'delete', e.id, e.title, old.content_text
+                FROM entries AS e
+                WHERE e.id = old.entry_id;
+                INSERT INTO entries_fts(rowid, title, content_text)
+                SELECT e.id, e.title, new.content_text
+                FROM entries AS e
+                WHERE e.id = new.entry_id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS entries_fts_after_title_update
+            AFTER UPDATE OF title ON entries BEGIN
+                INSERT INTO entries_fts(entries_fts, rowid, title, content_text)
+                SELECT 'delete', old.id, old.title, b.content_text
+                FROM entry_bodies AS b
+                WHERE b.entry_id = old.id;
+                INSERT INTO entries_fts(rowid, title, content_text)
+                SELECT new.id, new.title, b.content_text
+                FROM entry_bodies AS b
+                WHERE b.entry_id = new.id;
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS entries_fts_before_delete
+            BEFORE DELETE ON entries BEGIN
+                INSERT INTO entries_fts(entries_fts, rowid, title, content_text)
+                SELECT 'delete', old.id, old.title, b.content_text
+                FROM entry_bodies AS b
+                WHERE b.entry_id = old.id;
+            END
+            """,
+            # Databases that built the index before this migration existed are rebuilt too,
+            # which is harmless and repairs any drift.
+            "INSERT INTO entries_fts(entries_fts) VALUES ('rebuild')",
+        ]
+        self._apply_optional_schema(statements)
+
+    def _uses_full_text_search(self, query: str) -> bool:
+        return (
+            bool(query)
+            and self.full_text_search_enabled
+            and len(query) >= FULL_TEXT_MIN_QUERY_LENGTH
+        )
+
+    def is_ranked_search(self, search_text: str) -> bool:
+        return self._uses_full_text_search(search_text.strip())
 
     def list_entries(self, search_text: str = "") -> list[sqlite3.Row]:
         query = search_text.strip()
+        if self._uses_full_text_search(query):
+            return self._search_entries(query)
+
         like = f"%{query}%"
         cur = self.conn.execute(
             """
-            SELECT id, entry_date, title, updated_at
+            SELECT id, entry_date, title, updated_at, NULL AS snippet
             FROM entries
-            WHERE (? = '' OR entry_date LIKE ? OR title LIKE ? OR content_text LIKE ?)
-            ORDER BY entry_date DESC, updated_at DESC
+            WHERE (
+                ? = ''
+                OR entry_date LIKE ?
+                OR title LIKE ?
+                OR EXISTS (
+                    SELECT 1
+                    FROM entry_bodies AS b
+                    WHERE b.entry_id = entries.id AND b.content_text LIKE ?
+                )
+            )
+            ORDER BY entry_date DESC, updated_at DESC, id DESC
             """,
             (query, like, like, like),
         )
         return cur.fetchall()
 
-    def list_entry_dates(self) -> list[str]:
+    def list_entries_page(
+        self,
+        search_text: str = "",
+        cursor: Optional[tuple] = None,
+        limit: int = ENTRY_LIST_PAGE_SIZE,
+    ) -> tuple[list[sqlite3.Row], Optional[tuple]]:
+        # Ranked search pages by offset; everything else seeks on (entry_date, updated_at, id).
+        query = search_text.strip()
+        if self._uses_full_text_search(query):
+            offset = int(cursor[0]) if cursor else 0
+            rows = self._search_entries(query, limit=limit, offset=offset)
+            next_cursor = (offset + len(rows),) if len(rows) >= limit else None
+            return rows, next_cursor
+
+        conditions, params = self._entry_list_filter(query)
+        if cursor:
+            conditions.append("(entry_date, updated_at, id) < (?, ?, ?)")
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cur = self.conn.execute(
+            f"""
+            SELECT id, entry_date, title, updated_at, NULL AS snippet
+            FROM entries
+            {where}
+            ORDER BY entry_date DESC, updated_at DESC, id DESC
+            LIMIT ?
+            """,
+            (*params, limit),
+        )
+        rows = cur.fetchall()
+        if len(rows) < limit:
+            return rows, None
+        last = rows[-1]
+        return rows, (last["entry_date"], last["updated_at"], int(last["id"]))
+
+    def get_entry_list_row(self, entry_id: int, search_text: str = "") -> Optional[sqlite3.Row]:
+        # The entry as a keyset page returns it, or None when the filter leaves it out.
+        conditions, params = self._entry_list_filter(search_text.strip())
+        conditions.append("id = ?")
+        params.append(entry_id)
+        cur = self.conn.execute(
+            f"""
+            SELECT id, entry_date, title, updated_at, NULL AS snippet
+            FROM entries
+            WHERE {' AND '.join(conditions)}
+            """,
+            params,
+        )
+        return cur.fetchone()
+
+    def _entry_list_filter(self, query: str) -> tuple[list[str], list[object]]:
+        conditions: list[str] = []
+        params: list[object] = []
+        if query:
+            like = f"%{query}%"
+            conditions.append(
+                """
+                (
+                    entry_date LIKE ?
+                    OR title LIKE ?
+                    OR EXISTS (
+                        SELECT 1
+                        FROM entry_bodies AS b
+                        WHERE b.entry_id = entries.id AND b.content_text LIKE ?
+                    )
+                )
+                """
+            )
+            params.extend((like, like, like))
+        return conditions, params
+
+    def _search_entries(self, query: str, limit: int = -1, offset: int = 0) -> list[sqlite3.Row]:
+        match_phrase = '"' + query.replace('"', '""') + '"'
+        open_marker, close_marker = SEARCH_SNIPPET_MARKERS
+        # Snippets are built only for the requested page; building them for every hit
+        # dominated search latency on long entries.
+        cur = self.conn.execute(
+            """
+            WITH hits AS (
+                SELECT rowid AS id, rank
+                FROM entries_fts
+                WHERE entries_fts MATCH :match
+            ),
+            matched AS (
+                SELECT id, rank
+                FROM hits
+                UNION ALL
+                SELECT id, NULL
+                FROM entries
+                WHERE entry_date LIKE :date_like
+                  AND id NOT IN (SELECT id FROM hits)
+            ),
+            page AS (
+                SELECT e.id, e.entry_date, e.title, e.updated_at, m.rank
+                FROM matched AS m
+                JOIN entries AS e ON e.id = m.id
+                ORDER BY m.rank IS NULL, m.rank, e.entry_date DESC, e.updated_at DESC, e.id DESC
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT
+                p.id,
+                p.entry_date,
+                p.title,
+                p.updated_at,
+                CASE
+                    WHEN p.rank IS NULL THEN NULL
+                    ELSE (
+                        SELECT snippet(entries_fts, -1, :open_marker, :close_marker, '…', :tokens)
+                        FROM entries_fts
+                        WHERE entries_fts MATCH :match AND rowid = p.id
+                    )
+                END AS snippet
+            FROM page AS p
+            ORDER BY p.rank IS NULL, p.rank, p.entry_date DESC, p.updated_at DESC, p.id DESC
+            """,
+            {
+                "match": match_phrase,
+                "date_like": f"%{query}%",
+                "limit": limit,
+                "offset": offset,
+                "open_marker": open_marker,
+                "close_marker": close_marker,
+                "tokens": SEARCH_SNIPPET_TOKENS,
+            },
+        )
+        return cur.fetchall()
+
+    def list_entry_dates(
+        self, start: Optional[date] = None, end: Optional[date] = None
+    ) -> list[str]:
+        # Bounded calls seek on the entry_date prefix of the list index.
         cur = self.conn.execute(
             """
             SELECT DISTINCT entry_date
             FROM entries
+            WHERE entry_date >= ? AND entry_date <= ?
             ORDER BY entry_date
-            """
+            """,
+            (
+                start.isoformat() if start else "",
+                end.isoformat() if end else "9999-12-31",
+            ),
         )
         return [str(row["entry_date"]) for row in cur.fetchall()]
 
-    def get_entry(self, entry_id: int) -> Optional[sqlite3.Row]:
+    def has_entry_on(self, entry_date: str) -> bool:
         cur = self.conn.execute(
             """
-            SELECT id, entry_date, title, content_html, content_text, updated_at
+            SELECT 1
             FROM entries
-            WHERE id = ?
+            WHERE entry_date = ?
+            LIMIT 1
+            """,
+            (entry_date,),
+        )
+        return cur.fetchone() is not None
+
+    def get_entry(self, entry_id: int) -> Optional[StoredEntry]:
+        cur = self.conn.execute(
+            """
+            SELECT
+                e.id,
+                e.entry_date,
+                e.title,
+                b.content_html,
+                COALESCE(b.content_text, '') AS content_text,
+                e.updated_at
+            FROM entries AS e
+            LEFT JOIN entry_bodies AS b ON b.entry_id = e.id
+            WHERE e.id = ?
             """,
             (entry_id,),
         )
-        return cur.fetchone()
+        row = cur.fetchone()
+        return StoredEntry(row) if row else None
 
     def title_exists(self, title: str) -> bool:
         cur = self.conn.execute(
@@ -1692,65 +3915,306 @@ class DiaryDatabase:
         content_text: str,
     ) -> int:
         now = datetime.now().isoformat(timespec="seconds")
+        stored_html = encode_entry_html(content_html, self.compress_html)
         if entry_id is None:
             cur = self.conn.execute(
                 """
-                INSERT INTO entries(entry_date, title, content_html, content_text, updated_at)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO entries(entry_date, title, updated_at)
+                VALUES (?, ?, ?)
                 """,
-                (entry_date, title, content_html, content_text, now),
+                (entry_date, title, now),
+            )
+            entry_id = int(cur.lastrowid)
+        else:
+            self.conn.execute(
+                """
+                UPDATE entries
+                SET entry_date = ?, title = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (entry_date, title, now, entry_id),
             )
-            self.conn.commit()
-            return int(cur.lastrowid)
-
         self.conn.execute(
             """
-            UPDATE entries
-            SET entry_date = ?, title = ?, content_html = ?, content_text = ?, updated_at = ?
-            WHERE id = ?
+            INSERT INTO entry_bodies(entry_id, content_html, content_text)
+            VALUES (?, ?, ?)
+            ON CONFLICT(entry_id) DO UPDATE SET
+                content_html = excluded.content_html,
+                content_text = excluded.content_text
             """,
-            (entry_date, title, content_html, content_text, now, entry_id),
+            (entry_id, stored_html, content_text),
         )
-        self.conn.commit()
+        self._commit()
         return entry_id
 
+    def _database_size_bytes(self) -> int:
+        page_count = int(self.conn.execute("PRAGMA page_count").fetchone()[0])
+        page_size = int(self.conn.execute("PRAGMA page_size").fetchone()[0])
+        return page_count * page_size
+
+    def _measure_entry_load_ms(self, sample_size: int = 200) -> float:
+        entry_ids = [
+            int(row["id"])
+            for row in self.conn.execute(
+                "SELECT id FROM entries ORDER BY id DESC LIMIT ?", (sample_size,)
+            )
+        ]
+        if not entry_ids:
+            return 0.0
+        started = time.perf_counter()
+        for entry_id in entry_ids:
+            entry = self.get_entry(entry_id)
+            if entry is not None:
+                entry["content_html"]
+        return (time.perf_counter() - started) * 1000 / len(entry_ids)
+
+    def rewrite_entry_html(self, compress: bool, batch_size: int = 200) -> HtmlRewriteReport:
+        size_before = self._database_size_bytes()
+        load_before = self._measure_entry_load_ms()
+        rewritten = 0
+        last_id = 0
+        while True:
+            rows = self.conn.execute(
+                """
+                SELECT entry_id AS id, content_html
+                FROM entry_bodies
+                WHERE entry_id > ?
+                ORDER BY entry_id
+                LIMIT ?
+                """,
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                stored = row["content_html"]
+                rewritten_html = encode_entry_html(decode_entry_html(stored), compress)
+                if rewritten_html != stored:
+                    updates.append((rewritten_html, int(row["id"])))
+            with self.transaction():
+                self.conn.executemany(
+                    "UPDATE entry_bodies SET content_html = ? WHERE entry_id = ?", updates
+                )
+            rewritten += len(updates)
+            last_id = int(rows[-1]["id"])
+
+        self.compress_html = compress
+        self.checkpoint("TRUNCATE")
+        self.conn.execute("VACUUM")
+        return HtmlRewriteReport(
+            rows_rewritten=rewritten,
+            size_before_bytes=size_before,
+            size_after_bytes=self._database_size_bytes(),
+            load_ms_before=load_before,
+            load_ms_after=self._measure_entry_load_ms(),
+        )
+
     def delete_entry(self, entry_id: int) -> list[str]:
+        return self.delete_entries([entry_id]).attachment_paths
+
+    def list_entry_summaries(self, entry_ids: Sequence[int]) -> list[sqlite3.Row]:
         cur = self.conn.execute(
             """
-            SELECT file_path
-            FROM attachments
-            WHERE entry_id = ?
+            SELECT e.id, e.entry_date, e.title
+            FROM json_each(?) AS selected
+            JOIN entries AS e ON e.id = selected.value
+            ORDER BY selected.key
             """,
-            (entry_id,),
+            (json.dumps([int(entry_id) for entry_id in entry_ids]),),
         )
-        attachment_paths = [str(row["file_path"]) for row in cur.fetchall()]
-        self.conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
-        self.conn.commit()
-        return attachment_paths
+        return cur.fetchall()
 
-    def add_attachment(self, entry_id: int, file_name: str, file_path: str, is_image: int) -> None:
+    def delete_entries(self, entry_ids: Sequence[int]) -> EntryDeletion:
+        ids_json = json.dumps(sorted({int(entry_id) for entry_id in entry_ids}))
+        with self.transaction():
+            deleted_entry_ids = [
+                int(row["id"])
+                for row in self.conn.execute(
+                    "SELECT id FROM entries WHERE id IN (SELECT value FROM json_each(?))",
+                    (ids_json,),
+                )
+            ]
+            attachment_paths = [
+                str(row["file_path"])
+                for row in self.conn.execute(
+                    """
+                    SELECT DISTINCT file_path
+                    FROM attachments
+                    WHERE entry_id IN (SELECT value FROM json_each(?))
+                    """,
+                    (ids_json,),
+                )
+            ]
+            self.conn.execute(
+                "DELETE FROM entries WHERE id IN (SELECT value FROM json_each(?))",
+                (ids_json,),
+            )
+            still_referenced = {
+                str(row["file_path"])
+                for row in self.conn.execute(
+                    """
+                    SELECT DISTINCT file_path
+                    FROM attachments
+                    WHERE file_path IN (SELECT value FROM json_each(?))
+                    """,
+                    (json.dumps(attachment_paths),),
+                )
+            }
+        return EntryDeletion(
+            deleted_entry_ids=deleted_entry_ids,
+            attachment_paths=attachment_paths,
+            unreferenced_paths=[path for path in attachment_paths if path not in still_referenced],
+        )
+
+    def add_attachment(
+        self,
+        entry_id: int,
+        file_name: str,
+        file_path: str,
+        is_image: int,
+        content_hash: Optional[str] = None,
+    ) -> None:
         now = datetime.now().isoformat(timespec="seconds")
         self.conn.execute(
             """
-            INSERT INTO attachments(entry_id, file_name, file_path, is_image, created_at)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO attachments(entry_id, file_name, file_path, is_image, created_at, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
             """,
-            (entry_id, file_name, file_path, is_image, now),
+            (entry_id, file_name, file_path, is_image, now, content_hash),
         )
-        self.conn.commit()
+        self._commit()
 
-    def list_attachments(self, entry_id: int) -> list[sqlite3.Row]:
-        cur = self.conn.execute(
+    def add_attachments(self, entry_id: int, attachments: Sequence[AttachmentDraft]) -> None:
+        if not attachments:
+            return
+        now = datetime.now().isoformat(timespec="seconds")
+        self.conn.executemany(
             """
-            SELECT id, file_name, file_path, is_image
+            INSERT INTO attachments(entry_id, file_name, file_path, is_image, created_at, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    entry_id,
+                    attachment.file_name,
+                    attachment.file_path,
+                    attachment.is_image,
+                    now,
+                    attachment.content_hash,
+                )
+                for attachment in attachments
+            ],
+        )
+        self._commit()
+
+    def list_attachments(self, entry_id: int, order: str = "newest") -> list[sqlite3.Row]:
+        order_by = ATTACHMENT_SORT_ORDERS.get(order, ATTACHMENT_SORT_ORDERS["newest"])
+        cur = self.conn.execute(
+            f"""
+            SELECT
+                id,
+                file_name,
+                file_path,
+                is_image,
+                byte_size,
+                mtime,
+                mime_type,
+                image_width,
+                image_height,
+                captured_at
             FROM attachments
             WHERE entry_id = ?
-            ORDER BY id DESC
+            ORDER BY {order_by}
             """,
             (entry_id,),
         )
         return cur.fetchall()
 
+    def list_uncatalogued_attachments(self, entry_id: Optional[int] = None) -> list[sqlite3.Row]:
+        cur = self.conn.execute(
+            """
+            SELECT id, file_path, is_image
+            FROM attachments
+            WHERE byte_size IS NULL
+              AND (? IS NULL OR entry_id = ?)
+              AND (catalog_checked_at IS NULL OR catalog_checked_at < ?)
+            """,
+            (entry_id, entry_id, time.time() - ATTACHMENT_CATALOG_RETRY_SECONDS),
+        )
+        return cur.fetchall()
+
+    def mark_attachments_missing(self, attachment_ids: Sequence[int]) -> None:
+        if not attachment_ids:
+            return
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE attachments SET catalog_checked_at = ? WHERE id = ?",
+            [(now, attachment_id) for attachment_id in attachment_ids],
+        )
+        self._commit()
+
+    def update_attachment_catalog(
+        self, catalog: Sequence[tuple[int, AttachmentMetadata]]
+    ) -> None:
+        if not catalog:
+            return
+        self.conn.executemany(
+            """
+            UPDATE attachments
+            SET
+                byte_size = ?,
+                mtime = ?,
+                mime_type = ?,
+                image_width = ?,
+                image_height = ?,
+                captured_at = ?
+            WHERE id = ?
+            """,
+            [
+                (
+                    metadata.byte_size,
+                    metadata.mtime,
+                    metadata.mime_type,
+                    metadata.image_width,
+                    metadata.image_height,
+                    metadata.captured_at,
+                    attachment_id,
+                )
+                for attachment_id, metadata in catalog
+            ],
+        )
+        self._commit()
+
+    def attachment_storage_usage(self) -> list[sqlite3.Row]:
+        # Grouped by the MIME major type; attachments not yet catalogued count as 'unknown'.
+        # A deduplicated blob is one file on disk, so it is counted once under the type of
+        # any of its attachment rows; rows without a hash are their own files.
+        cur = self.conn.execute(
+            """
+            WITH stored_files AS (
+                SELECT
+                    MAX(a.mime_type) AS mime_type,
+                    COALESCE(NULLIF(b.byte_size, 0), MAX(a.byte_size)) AS byte_size
+                FROM attachment_blobs AS b
+                JOIN attachments AS a ON a.content_hash = b.sha256
+                GROUP BY b.sha256
+                UNION ALL
+                SELECT mime_type, byte_size
+                FROM attachments
+                WHERE content_hash IS NULL
+            )
+            SELECT
+                COALESCE(substr(mime_type, 1, instr(mime_type, '/') - 1), 'unknown') AS category,
+                COUNT(*) AS file_count,
+                COALESCE(SUM(byte_size), 0) AS byte_size
+            FROM stored_files
+            GROUP BY category
+            ORDER BY byte_size DESC
+            """
+        )
+        return cur.fetchall()
+
     def delete_attachment(self, attachment_id: int) -> Optional[str]:
         cur = self.conn.execute(
             """
@@ -1764,7 +4228,7 @@ class DiaryDatabase:
         if not row:
             return None
         self.conn.execute("DELETE FROM attachments WHERE id = ?", (attachment_id,))
-        self.conn.commit()
+        self._commit()
         return str(row["file_path"])
 
     def has_attachment_path(self, file_path: str) -> bool:
@@ -1779,10 +4243,143 @@ class DiaryDatabase:
         )
         return cur.fetchone() is not None
 
+    def find_attachment_blob(self, digest: str) -> Optional[str]:
+        cur = self.conn.execute(
+            "SELECT file_path FROM attachment_blobs WHERE sha256 = ?",
+            (digest,),
+        )
+        row = cur.fetchone()
+        return str(row["file_path"]) if row else None
+
+    def verify_attachment_blobs(self) -> AttachmentVerification:
+        # Re-hashes every stored blob; a mismatch means the file changed on disk (bit rot).
+        data_root = self.db_path.parent
+        rows = self.conn.execute("SELECT sha256, file_path FROM attachment_blobs").fetchall()
+        missing: list[str] = []
+        corrupted: list[str] = []
+        verified: list[tuple[str, str]] = []
+        for row in rows:
+            stored_path = str(row["file_path"])
+            path = Path(stored_path)
+            path = path if path.is_absolute() else data_root / path
+            try:
+                digest = hash_file(path)
+            except OSError:
+                missing.append(stored_path)
+                continue
+            if digest != row["sha256"]:
+                corrupted.append(stored_path)
+                continue
+            verified.append((datetime.now().isoformat(timespec="seconds"), str(row["sha256"])))
+        self.conn.executemany(
+            "UPDATE attachment_blobs SET verified_at = ? WHERE sha256 = ?", verified
+        )
+        self._commit()
+        return AttachmentVerification(checked=len(rows), missing=missing, corrupted=corrupted)
+
     def total_entries(self) -> int:
-        cur = self.conn.execute("SELECT COUNT(*) AS count FROM entries")
+        cur = self.conn.execute(
+            "SELECT entry_count FROM entry_stats WHERE kind = 'total' AND period = ''"
+        )
         row = cur.fetchone()
-        return int(row["count"]) if row else 0
+        return int(row["entry_count"]) if row else 0
+
+    def list_entry_stats(
+        self, kind: str, start: str = "", end: str = "\uffff"
+    ) -> list[sqlite3.Row]:
+        # kind is 'total', 'year', 'month' or 'day'; start/end bound the period text.
+        cur = self.conn.execute(
+            """
+            SELECT period, entry_count, char_count, attachment_count
+            FROM entry_stats
+            WHERE kind = ? AND period >= ? AND period <= ? AND entry_count > 0
+            ORDER BY period
+            """,
+            (kind, start, end),
+        )
+        return cur.fetchall()
+
+    def _period_stats(self, kind: str, period: str) -> tuple[int, int, int]:
+        row = self.conn.execute(
+            """
+            SELECT entry_count, char_count, attachment_count
+            FROM entry_stats
+            WHERE kind = ? AND period = ?
+            """,
+            (kind, period),
+        ).fetchone()
+        if row is None:
+            return 0, 0, 0
+        return int(row["entry_count"]), int(row["char_count"]), int(row["attachment_count"])
+
+    def writing_streaks(self, today: date) -> tuple[int, int]:
+        # The current streak may end yesterday: today's entry just has not been written yet.
+        current_row = self.conn.execute(
+            """
+            SELECT min(end_day, :today) - start_day + 1 AS length
+            FROM writing_streaks
+            WHERE end_day >= :today - 1 AND start_day <= :today
+            ORDER BY end_day
+            LIMIT 1
+            """,
+            {"today": date_ordinal(today)},
+        ).fetchone()
+        longest_row = self.conn.execute(
+            "SELECT MAX(length) AS length FROM writing_streaks"
+        ).fetchone()
+        current = int(current_row["length"]) if current_row else 0
+        longest = int(longest_row["length"] or 0) if longest_row else 0
+        return current, longest
+
+    def get_stats_summary(self, today: date) -> EntryStatsSummary:
+        year = f"{today.year:04d}"
+        month = f"{year}-{today.month:02d}"
+        total_entries, total_chars, total_attachments = self._period_stats("total", "")
+        year_entries, year_chars, _ = self._period_stats("year", year)
+        month_entries, month_chars, _ = self._period_stats("month", month)
+        current_streak, longest_streak = self.writing_streaks(today)
+        return EntryStatsSummary(
+            today=today,
+            total_entries=total_entries,
+            total_chars=total_chars,
+            total_attachments=total_attachments,
+            year_entries=year_entries,
+            year_chars=year_chars,
+            month_entries=month_entries,
+            month_chars=month_chars,
+            current_streak=current_streak,
+            longest_streak=longest_streak,
+            day_entries={
+                str(row["period"]): int(row["entry_count"])
+                for row in self.list_entry_stats("day", f"{year}-01-01", f"{year}-12-31")
+            },
+        )
+
+    def export_stats(self, today: date) -> dict:
+        current_streak, longest_streak = self.writing_streaks(today)
+        report: dict = {
+            "generated_for": today.isoformat(),
+            "streaks": {"current": current_streak, "longest": longest_streak},
+        }
+        for kind in ("total", "year", "month", "day"):
+            report[kind] = [
+                {
+                    "period": row["period"],
+                    "entries": int(row["entry_count"]),
+                    "characters": int(row["char_count"]),
+                    "attachments": int(row["attachment_count"]),
+                }
+                for row in self.list_entry_stats(kind)
+            ]
+        report["attachment_storage"] = [
+            {
+                "category": row["category"],
+                "files": int(row["file_count"]),
+                "bytes": int(row["byte_size"]),
+            }
+            for row in self.attachment_storage_usage()
+        ]
+        return report
 
     def get_meta(self, key: str) -> Optional[str]:
         cur = self.conn.execute(
@@ -1805,32 +4402,559 @@ class DiaryDatabase:
             """,
             (key, value),
         )
-        self.conn.commit()
+        self._commit()
+
+    def get_on_this_day_memories(self, today: date, window_days: int = 0) -> list[sqlite3.Row]:
+        window_days = max(0, window_days)
+        month_days = sorted(
+            {
+                (today + timedelta(days=offset)).strftime("%m-%d")
+                for offset in range(-window_days, window_days + 1)
+            }
+        )
+        placeholders = ", ".join("?" for _ in month_days)
+        # Only entries from last year's window or earlier count; a year boundary inside the
+        # window (Jan 2 with ±3 days reaches Dec 30) must not turn recent days into memories.
+        try:
+            anniversary = today.replace(year=today.year - 1)
+        except ValueError:
+            anniversary = today.replace(year=today.year - 1, day=28)
+        cutoff = (anniversary + timedelta(days=window_days + 1)).isoformat()
+        if self.entry_date_columns_enabled:
+            cur = self.conn.execute(
+                f"""
+                SELECT e.id, e.entry_date, e.title, b.content_text
+                FROM entries AS e
+                LEFT JOIN entry_bodies AS b ON b.entry_id = e.id
+                WHERE e.entry_month_day IN ({placeholders})
+                  AND e.entry_date < ?
+                ORDER BY e.entry_date DESC
+                """,
+                (*month_days, cutoff),
+            )
+            return cur.fetchall()
+
+        cur = self.conn.execute(
+            f"""
+            SELECT e.id, e.entry_date, e.title, b.content_text
+            FROM entries AS e
+            LEFT JOIN entry_bodies AS b ON b.entry_id = e.id
+            WHERE strftime('%m-%d', e.entry_date) IN ({placeholders})
+              AND e.entry_date < ?
+            ORDER BY e.entry_date DESC
+            """,
+            (*month_days, cutoff),
+        )
+        return cur.fetchall()
+
+    def list_entries_between(self, start: date, end: date) -> list[sqlite3.Row]:
+        if self.entry_date_columns_enabled:
+            cur = self.conn.execute(
+                """
+                SELECT id, entry_date, title, updated_at
+                FROM entries
+                WHERE entry_day_ordinal BETWEEN CAST(julianday(?) AS INTEGER)
+                                            AND CAST(julianday(?) AS INTEGER)
+                ORDER BY entry_date DESC, updated_at DESC, id DESC
+                """,
+                (start.isoformat(), end.isoformat()),
+            )
+            return cur.fetchall()
+
+        cur = self.conn.execute(
+            """
+            SELECT id, entry_date, title, updated_at
+            FROM entries
+            WHERE entry_date BETWEEN ? AND ?
+            ORDER BY entry_date DESC, updated_at DESC, id DESC
+            """,
+            (start.isoformat(), end.isoformat()),
+        )
+        return cur.fetchall()
+
+    def interrupt(self) -> None:
+        self.conn.interrupt()
+
+    def close(self) -> None:
+        self.checkpoint("TRUNCATE")
+        self.conn.close()
+
+
+class EntrySearchWorker(QObject):
+    results_ready = pyqtSignal(int, str, object, object)
+    search_failed = pyqtSignal(int, str)
+
+    def __init__(self, db_path: Path):
+        super().__init__()
+        self.db_path = db_path
+        self._db: Optional[DiaryDatabase] = None
+        self._latest_generation = 0
+        self._running_generation: Optional[int] = None
+
+    def supersede(self, generation: int) -> None:
+        # Called from the GUI thread; aborts a query that is already running for an older request.
+        self._latest_generation = generation
+        running = self._running_generation
+        if self._db is not None and running is not None and running != generation:
+            self._db.interrupt()
+
+    @pyqtSlot(int, str)
+    def search(self, generation: int, search_text: str) -> None:
+        if generation != self._latest_generation:
+            return
+
+        self._running_generation = generation
+        try:
+            if self._db is None:
+                self._db = DiaryDatabase(self.db_path, read_only=True)
+            rows, cursor = self._db.list_entries_page(search_text)
+        except (OSError, sqlite3.Error) as exc:
+            # Interrupted older requests are dropped by the GUI's generation check.
+            self.search_failed.emit(generation, str(exc))
+            return
+        finally:
+            self._running_generation = None
+
+        if generation != self._latest_generation:
+            return
+        self.results_ready.emit(generation, search_text, rows, cursor)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class AttachmentCatalogWorker(QObject):
+    catalogued = pyqtSignal(object, object)
+
+    @pyqtSlot(object)
+    def catalog(self, jobs) -> None:
+        # jobs: (attachment_id, absolute path, is_image); the GUI thread writes the results.
+        results: list[tuple[int, AttachmentMetadata]] = []
+        missing: list[int] = []
+        for attachment_id, file_path, is_image in jobs:
+            metadata = read_attachment_metadata(Path(file_path), bool(is_image))
+            if metadata is None:
+                missing.append(int(attachment_id))
+            else:
+                results.append((int(attachment_id), metadata))
+        if results or missing:
+            self.catalogued.emit(results, missing)
+
+
+class AttachmentImportCancelled(Exception):
+    pass
+
+
+class AttachmentImportClaims:
+    # Blob paths picked by in-flight imports; deletes hold the lock and leave them alone.
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._paths: dict[int, str] = {}
+        self._lookup_db: Optional[DiaryDatabase] = None
+
+    def find_blob(self, db_path: Path, digest: str) -> Optional[str]:
+        # One read-only connection serves every import; the lock serialises its use.
+        with self.lock:
+            if self._lookup_db is None or self._lookup_db.db_path != db_path:
+                self.close()
+                self._lookup_db = DiaryDatabase(db_path, read_only=True)
+            return self._lookup_db.find_attachment_blob(digest)
+
+    def close(self) -> None:
+        with self.lock:
+            if self._lookup_db is not None:
+                self._lookup_db.close()
+                self._lookup_db = None
+
+    def claim(self, task_id: int, path: Path) -> None:
+        with self.lock:
+            self._paths[task_id] = normalize_path_for_compare(path)
+
+    def release(self, task_id: int) -> Optional[str]:
+        with self.lock:
+            return self._paths.pop(task_id, None)
+
+    def is_claimed(self, path: Path) -> bool:
+        with self.lock:
+            return normalize_path_for_compare(path) in self._paths.values()
+
+
+class AttachmentImportSignals(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+
+class AttachmentImportTask(QRunnable):
+    # Copies the source to a .part file while hashing it, then keeps it only when no blob
+    # with that hash exists yet.
+    def __init__(
+        self,
+        task_id: int,
+        source: Path,
+        data_root: Path,
+        db_path: Path,
+        cancel_event: threading.Event,
+        claims: AttachmentImportClaims,
+        thumbnail_cache: Optional[ThumbnailCache] = None,
+    ):
+        super().__init__()
+        self.task_id = task_id
+        self.source = source
+        self.data_root = data_root
+        self.db_path = db_path
+        self.cancel_event = cancel_event
+        self.claims = claims
+        self.thumbnail_cache = thumbnail_cache
+        self.signals = AttachmentImportSignals()
+        self._total_bytes = 1
+        self._done_bytes = 0
+        self._reported_percent = -1
+
+    def _advance(self, byte_count: int) -> None:
+        if self.cancel_event.is_set():
+            raise AttachmentImportCancelled()
+        self._done_bytes += byte_count
+        percent = min(100, self._done_bytes * 100 // self._total_bytes)
+        if percent != self._reported_percent:
+            self._reported_percent = percent
+            self.signals.progress.emit(self.task_id, percent)
+
+    def _copy_and_hash_source(self, temporary: Path) -> str:
+        # One pass over the source: each chunk is hashed as it is written to the .part file.
+        digest = hashlib.sha256()
+        temporary.parent.mkdir(parents=True, exist_ok=True)
+        with self.source.open("rb") as reader, temporary.open("wb") as writer:
+            while chunk := reader.read(ATTACHMENT_HASH_CHUNK_BYTES):
+                digest.update(chunk)
+                writer.write(chunk)
+                self._advance(len(chunk))
+        shutil.copystat(self.source, temporary)
+        return digest.hexdigest()
+
+    def _existing_blob(self, digest: str) -> Optional[Path]:
+        try:
+            stored_path = self.claims.find_blob(self.db_path, digest)
+        except sqlite3.Error:
+            stored_path = None
+        if not stored_path:
+            return None
+        path = Path(stored_path)
+        path = path if path.is_absolute() else self.data_root / path
+        return path.resolve() if path.exists() else None
+
+    def run(self) -> None:
+        temporary = self.data_root / ATTACHMENTS_DIR / f".import-{uuid4().hex}.part"
+        try:
+            if self.cancel_event.is_set():
+                raise AttachmentImportCancelled()
+            self._total_bytes = max(1, self.source.stat().st_size)
+            digest = self._copy_and_hash_source(temporary)
+            # Choosing and claiming the blob is atomic with respect to deletes.
+            with self.claims.lock:
+                destination = self._existing_blob(digest)
+                if destination is None:
+                    destination = (
+                        self.data_root / content_addressed_path(digest, self.source.suffix)
+                    ).resolve()
+                self.claims.claim(self.task_id, destination)
+                if not destination.exists():
+                    destination.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(temporary, destination)
+        except AttachmentImportCancelled:
+            self.signals.cancelled.emit(self.task_id)
+            return
+        except (OSError, sqlite3.Error) as exc:
+            self.signals.failed.emit(self.task_id, str(exc))
+            return
+        finally:
+            # Left over when the blob already existed, or when the import stopped part way.
+            try:
+                temporary.unlink()
+            except OSError:
+                pass
+        is_image = is_image_file(destination)
+        if is_image and self.thumbnail_cache is not None:
+            self.thumbnail_cache.ensure(destination)
+        self.signals.progress.emit(self.task_id, 100)
+        self.signals.finished.emit(
+            self.task_id,
+            AttachmentDraft(
+                file_name=self.source.name,
+                file_path=str(destination),
+                is_image=1 if is_image else 0,
+                content_hash=digest,
+            ),
+        )
+
+
+class AttachmentImportPanel(QFrame):
+    cancel_requested = pyqtSignal()
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.setObjectName("attachmentImportPanel")
+        self._file_bars: dict[int, QProgressBar] = {}
+        self._file_rows: dict[int, QWidget] = {}
+        self._percents: dict[int, int] = {}
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(6)
+        header = QHBoxLayout()
+        self.summary_label = QLabel("")
+        self.summary_label.setObjectName("subheading")
+        self.cancel_button = PushButton("取消导入")
+        self.cancel_button.clicked.connect(self.cancel_requested.emit)
+        header.addWidget(self.summary_label, 1)
+        header.addWidget(self.cancel_button)
+        layout.addLayout(header)
+        self.overall_bar = QProgressBar()
+        self.overall_bar.setRange(0, 100)
+        self.overall_bar.setTextVisible(False)
+        self.overall_bar.setFixedHeight(6)
+        layout.addWidget(self.overall_bar)
+        self.file_rows_layout = QVBoxLayout()
+        self.file_rows_layout.setContentsMargins(0, 0, 0, 0)
+        self.file_rows_layout.setSpacing(4)
+        layout.addLayout(self.file_rows_layout)
+        self.hide()
+
+    def add_file(self, task_id: int, file_name: str) -> None:
+        row = QWidget()
+        row_layout = QHBoxLayout(row)
+        row_layout.setContentsMargins(0, 0, 0, 0)
+        name_label = QLabel(file_name)
+        name_label.setObjectName("subheading")
+        bar = QProgressBar()
+        bar.setRange(0, 100)
+        bar.setFixedWidth(160)
+        row_layout.addWidget(name_label, 1)
+        row_layout.addWidget(bar)
+        self.file_rows_layout.addWidget(row)
+        self._file_rows[task_id] = row
+        self._file_bars[task_id] = bar
+        self._percents[task_id] = 0
+        self._update_summary()
+        self.show()
+
+    def set_progress(self, task_id: int, percent: int) -> None:
+        bar = self._file_bars.get(task_id)
+        if bar is None:
+            return
+        bar.setValue(percent)
+        self._percents[task_id] = percent
+        self._update_summary()
+
+    def remove_file(self, task_id: int) -> None:
+        # Finished rows count as 100% until the whole import is over.
+        row = self._file_rows.pop(task_id, None)
+        self._file_bars.pop(task_id, None)
+        if row is not None:
+            row.deleteLater()
+        if task_id in self._percents:
+            self._percents[task_id] = 100
+        if not self._file_rows:
+            self._percents.clear()
+            self.hide()
+            return
+        self._update_summary()
+
+    def _update_summary(self) -> None:
+        if not self._percents:
+            return
+        total = len(self._percents)
+        finished = total - len(self._file_rows)
+        self.overall_bar.setValue(sum(self._percents.values()) // total)
+        self.summary_label.setText(f"正在导入附件 {finished}/{total}")
+
+
+def entry_list_key(row: sqlite3.Row) -> tuple[str, str, int]:
+    # The list's sort key; keyset pages are descending on it.
+    return (str(row["entry_date"]), str(row["updated_at"]), int(row["id"]))
+
+
+class EntryListModel(QAbstractListModel):
+    def __init__(self, db: DiaryDatabase, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.db = db
+        self.search_text = ""
+        self._rows: list[sqlite3.Row] = []
+        self._cursor: Optional[tuple] = None
+        self._has_more = False
+
+    def reset(self, search_text: str) -> None:
+        rows, cursor = self.db.list_entries_page(search_text)
+        self.apply_first_page(search_text, rows, cursor)
+
+    def apply_first_page(
+        self, search_text: str, rows: list[sqlite3.Row], cursor: Optional[tuple]
+    ) -> None:
+        self.beginResetModel()
+        self.search_text = search_text
+        self._rows = list(rows)
+        self._cursor = cursor
+        self._has_more = cursor is not None
+        self.endResetModel()
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:  # type: ignore[override]
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):  # type: ignore[override]
+        if not index.isValid() or not 0 <= index.row() < len(self._rows):
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.UserRole:
+            return int(row["id"])
+        snippet = " ".join(str(row["snippet"] or "").split())
+        if role == Qt.DisplayRole:
+            title = str(row["title"]).strip() or UNTITLED_ENTRY_TITLE
+            text = f"{row['entry_date']}  |  {title}"
+            return f"{text}\n{snippet}" if snippet else text
+        if role == Qt.ToolTipRole:
+            return snippet or None
+        return None
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:  # type: ignore[override]
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:  # type: ignore[override]
+        if parent.isValid() or not self._has_more:
+            return
+        rows, self._cursor = self.db.list_entries_page(self.search_text, self._cursor)
+        self._has_more = self._cursor is not None
+        if not rows:
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def entry_id_at(self, row: int) -> Optional[int]:
+        if not 0 <= row < len(self._rows):
+            return None
+        return int(self._rows[row]["id"])
+
+    def refresh_entry(self, entry_id: int) -> None:
+        # Moves one saved or deleted entry to its keyset position without reloading any page.
+        if self.db.is_ranked_search(self.search_text):
+            # Ranked results have no keyset order to slot the entry into.
+            self.reset(self.search_text)
+            return
+        old_row = self.row_for_entry_id(entry_id, fetch=False)
+        if old_row is not None:
+            self.beginRemoveRows(QModelIndex(), old_row, old_row)
+            del self._rows[old_row]
+            self.endRemoveRows()
+        row = self.db.get_entry_list_row(entry_id, self.search_text)
+        if row is None:
+            return
+        key = entry_list_key(row)
+        # Past the loaded window the entry arrives with a later fetchMore instead.
+        if self._has_more and key < tuple(self._cursor):
+            return
+        position = next(
+            (index for index, loaded in enumerate(self._rows) if entry_list_key(loaded) < key),
+            len(self._rows),
+        )
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._rows.insert(position, row)
+        self.endInsertRows()
+
+    def row_for_entry_id(self, entry_id: int, fetch: bool = True) -> Optional[int]:
+        checked = 0
+        while True:
+            for row in range(checked, len(self._rows)):
+                if int(self._rows[row]["id"]) == entry_id:
+                    return row
+            checked = len(self._rows)
+            if not fetch or not self._has_more:
+                return None
+            self.fetchMore()
+
+
+class YearHeatmapWidget(QWidget):
+    # GitHub-style grid: one column per week, Monday on top, shaded by entries per day.
+    CELL = 11
+    GAP = 3
 
-    def get_on_this_day_memories(self, today: date) -> list[sqlite3.Row]:
-        month_day = today.strftime("%m-%d")
-        cur = self.conn.execute(
-            """
-            SELECT id, entry_date, title, content_text
-            FROM entries
-            WHERE strftime('%m-%d', entry_date) = ?
-              AND CAST(strftime('%Y', entry_date) AS INTEGER) < ?
-            ORDER BY entry_date DESC
-            """,
-            (month_day, today.year),
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.is_dark = False
+        self.year = date.today().year
+        self.day_entries: dict[str, int] = {}
+        self.setMouseTracking(True)
+        self.setMinimumHeight(7 * (self.CELL + self.GAP))
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+    def set_dark_mode(self, is_dark: bool) -> None:
+        self.is_dark = is_dark
+        self.update()
+
+    def set_data(self, year: int, day_entries: dict[str, int]) -> None:
+        self.year = year
+        self.day_entries = day_entries
+        self.update()
+
+    def _cell_step(self) -> float:
+        return max(4.0, min(self.CELL + self.GAP, self.width() / 54))
+
+    def _cell_date(self, column: int, row: int) -> Optional[date]:
+        first = date(self.year, 1, 1)
+        cell_date = first + timedelta(days=column * 7 + row - first.weekday())
+        return cell_date if cell_date.year == self.year else None
+
+    def _shade(self, count: int) -> QColor:
+        if count <= 0:
+            return QColor("#2A3348" if self.is_dark else "#EBEEF5")
+        palette = (
+            ("#35508A", "#4A6FC0", "#6E93E6", "#A5C3FF")
+            if self.is_dark
+            else ("#C6D6FA", "#8FADF0", "#5479D6", "#2A4FA8")
         )
-        return cur.fetchall()
+        return QColor(palette[min(count, len(palette)) - 1])
 
-    def close(self) -> None:
-        self.conn.close()
+    def paintEvent(self, event) -> None:  # type: ignore[override]
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        step = self._cell_step()
+        size = step * self.CELL / (self.CELL + self.GAP)
+        for column in range(54):
+            for row in range(7):
+                cell_date = self._cell_date(column, row)
+                if cell_date is None:
+                    continue
+                painter.setBrush(self._shade(self.day_entries.get(cell_date.isoformat(), 0)))
+                painter.drawRoundedRect(QRectF(column * step, row * step, size, size), 2, 2)
+        painter.end()
+
+    def mouseMoveEvent(self, event) -> None:  # type: ignore[override]
+        step = self._cell_step()
+        column, row = int(event.x() // step), int(event.y() // step)
+        cell_date = self._cell_date(column, row) if 0 <= column < 54 and 0 <= row < 7 else None
+        if cell_date is None:
+            QToolTip.hideText()
+            return
+        count = self.day_entries.get(cell_date.isoformat(), 0)
+        QToolTip.showText(event.globalPos(), f"{cell_date.isoformat()}：{count} 篇", self)
 
 
 class DashboardPage(QWidget):
-    def __init__(self, on_entry_open_requested: Optional[Callable[[int], None]] = None):
+    def __init__(
+        self,
+        on_entry_open_requested: Optional[Callable[[int], None]] = None,
+        on_memory_window_changed: Optional[Callable[[], None]] = None,
+    ):
         super().__init__()
         self.setObjectName("dashboardPage")
         self.is_dark = False
         self.on_entry_open_requested = on_entry_open_requested
+        self.on_memory_window_changed = on_memory_window_changed
+        self.memory_window_days = MEMORY_WINDOW_OPTIONS[0][1]
 
         root = QVBoxLayout(self)
         root.setContentsMargins(24, 24, 24, 24)
@@ -1852,8 +4976,18 @@ class DashboardPage(QWidget):
         stats_layout.setSpacing(6)
         stats_title = SubtitleLabel("记录统计")
         self.stats_value = BodyLabel("本地 SQLite 已保存 0 条记录。")
+        self.stats_period_value = BodyLabel("")
+        self.stats_streak_value = BodyLabel("")
+        self.heatmap_title = BodyLabel("")
+        self.heatmap_title.setObjectName("subheading")
+        self.heatmap = YearHeatmapWidget()
         stats_layout.addWidget(stats_title)
         stats_layout.addWidget(self.stats_value)
+        stats_layout.addWidget(self.stats_period_value)
+        stats_layout.addWidget(self.stats_streak_value)
+        stats_layout.addSpacing(6)
+        stats_layout.addWidget(self.heatmap_title)
+        stats_layout.addWidget(self.heatmap)
         root.addWidget(self.stats_card)
 
         self.memory_card = QFrame()
@@ -1863,6 +4997,15 @@ class DashboardPage(QWidget):
         memory_layout.setContentsMargins(18, 16, 18, 16)
         memory_layout.setSpacing(10)
         memory_title = SubtitleLabel("今日回忆")
+        self.memory_window_combo = ComboBox()
+        for label, window_days in MEMORY_WINDOW_OPTIONS:
+            self.memory_window_combo.addItem(label, userData=window_days)
+        self.memory_window_combo.currentIndexChanged.connect(self.handle_memory_window_changed)
+        memory_header = QHBoxLayout()
+        memory_header.setContentsMargins(0, 0, 0, 0)
+        memory_header.addWidget(memory_title)
+        memory_header.addStretch(1)
+        memory_header.addWidget(self.memory_window_combo)
         self.memory_browser = QTextBrowser()
         self.memory_browser.setReadOnly(True)
         self.memory_browser.setOpenExternalLinks(False)
@@ -1870,32 +5013,56 @@ class DashboardPage(QWidget):
         self.memory_browser.anchorClicked.connect(self.handle_memory_link_clicked)
         self.memory_browser.setMinimumHeight(280)
         self.memory_browser.setStyleSheet(MEMORY_BROWSER_LIGHT_STYLE)
-        memory_layout.addWidget(memory_title)
+        memory_layout.addLayout(memory_header)
         memory_layout.addWidget(self.memory_browser)
         root.addWidget(self.memory_card, 1)
 
     def apply_theme(self, is_dark: bool) -> None:
         self.is_dark = is_dark
+        self.heatmap.set_dark_mode(is_dark)
         self.memory_browser.setStyleSheet(
             MEMORY_BROWSER_DARK_STYLE if is_dark else MEMORY_BROWSER_LIGHT_STYLE
         )
 
-    def update_content(self, total_entries: int, memories: list[sqlite3.Row]) -> None:
-        self.stats_value.setText(f"本地 SQLite（{DB_NAME}）已保存 {total_entries} 条记录。")
+    def handle_memory_window_changed(self, index: int) -> None:
+        window_days = self.memory_window_combo.itemData(index)
+        self.memory_window_days = int(window_days) if window_days is not None else 0
+        if self.on_memory_window_changed:
+            self.on_memory_window_changed()
+
+    def update_content(self, stats: EntryStatsSummary, memories: list[sqlite3.Row]) -> None:
+        self.stats_value.setText(
+            f"本地 SQLite（{DB_NAME}）已保存 {stats.total_entries} 条记录，"
+            f"共 {stats.total_chars} 字、{stats.total_attachments} 个附件。"
+        )
+        self.stats_period_value.setText(
+            f"本月 {stats.month_entries} 篇 / {stats.month_chars} 字，"
+            f"{stats.today.year} 年 {stats.year_entries} 篇 / {stats.year_chars} 字。"
+        )
+        self.stats_streak_value.setText(
+            f"当前连续记录 {stats.current_streak} 天，最长连续 {stats.longest_streak} 天。"
+        )
+        self.heatmap_title.setText(
+            f"{stats.today.year} 年共有 {len(stats.day_entries)} 天写了日记"
+        )
+        self.heatmap.set_data(stats.today.year, stats.day_entries)
         empty_color = "#AAB4C8" if self.is_dark else "#5F6778"
         heading_color = "#EEF2FF" if self.is_dark else "#1D2534"
         snippet_color = "#C4CDE0" if self.is_dark else "#5D6575"
         border_color = "#3B4660" if self.is_dark else "#E8ECF3"
         link_color = "#8CB8FF" if self.is_dark else "#2457C5"
 
+        period_text = (
+            "这一天" if self.memory_window_days <= 0 else f"前后 {self.memory_window_days} 天"
+        )
         if not memories:
             self.memory_browser.setHtml(
-                f"<p style='color:{empty_color};'>这一天还没有往年回忆。</p>"
+                f"<p style='color:{empty_color};'>{period_text}还没有往年回忆。</p>"
             )
             return
 
         chunks: List[str] = [
-            f"<h3 style='margin-top:0px; color:{heading_color};'>这一天的往年回忆</h3>"
+            f"<h3 style='margin-top:0px; color:{heading_color};'>{period_text}的往年回忆</h3>"
         ]
         for row in memories:
             snippet = html.escape((row["content_text"] or "").strip())
@@ -1926,9 +5093,15 @@ class DashboardPage(QWidget):
 
 
 class CalendarWeekendHeaderDelegate(QStyledItemDelegate):
-    def __init__(self, parent: Optional[QWidget] = None):
+    def __init__(
+        self,
+        parent: Optional[QWidget] = None,
+        date_cell_delegate: Optional[QAbstractItemDelegate] = None,
+    ):
         super().__init__(parent)
         self.is_dark = False
+        # Qt's own calendar delegate; it routes date cells through QCalendarWidget.paintCell.
+        self.date_cell_delegate = date_cell_delegate
 
     def set_dark_mode(self, is_dark: bool) -> None:
         self.is_dark = is_dark
@@ -1953,10 +5126,130 @@ class CalendarWeekendHeaderDelegate(QStyledItemDelegate):
             painter.restore()
             return
 
+        if index.row() > 0 and self.date_cell_delegate is not None:
+            self.date_cell_delegate.paint(painter, styled_option, index)
+            return
         super().paint(painter, styled_option, index)
 
 
+class LazyFontComboBox(QComboBox):
+    # Font picker that lists installed families only when its popup is first opened.
+    currentFontChanged = pyqtSignal(QFont)
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self._populated = False
+        self.setSizeAdjustPolicy(QComboBox.AdjustToMinimumContentsLengthWithIcon)
+        self.setMinimumContentsLength(12)
+        self.currentIndexChanged.connect(self._emit_current_font)
+
+    def _emit_current_font(self, index: int) -> None:
+        if index >= 0:
+            self.currentFontChanged.emit(QFont(self.itemText(index)))
+
+    def currentFont(self) -> QFont:
+        return QFont(self.currentText())
+
+    def setCurrentFont(self, font: QFont) -> None:
+        family = font.family()
+        index = self.findText(family, Qt.MatchFixedString)
+        if index < 0 and self._populated:
+            # Like QFontComboBox, show the family Qt actually resolved for an unknown one.
+            index = self.findText(QFontInfo(font).family(), Qt.MatchFixedString)
+            if index < 0:
+                return
+        if index < 0:
+            # Until the popup opens the only item is the family being shown.
+            self.clear()
+            self.addItem(family)
+            index = 0
+        self.setCurrentIndex(index)
+
+    def showPopup(self) -> None:
+        if not self._populated:
+            self._populated = True
+            current = self.currentText()
+            was_blocked = self.blockSignals(True)
+            self.clear()
+            self.addItems(QFontDatabase().families())
+            index = self.findText(current, Qt.MatchFixedString)
+            if index < 0 and current:
+                self.insertItem(0, current)
+                index = 0
+            self.setCurrentIndex(index)
+            self.blockSignals(was_blocked)
+        super().showPopup()
+
+
+class EntryCalendarWidget(QCalendarWidget):
+    # Marks hold only the dates of the shown page, as Julian day numbers.
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.is_dark = False
+        self.marked_days: set[int] = set()
+
+    def set_dark_mode(self, is_dark: bool) -> None:
+        self.is_dark = is_dark
+        self.updateCells()
+
+    def shown_date_range(self) -> tuple[date, date]:
+        # Covers the leading and trailing days of the neighbouring months in the 6-week grid.
+        first_of_month = date(self.yearShown(), self.monthShown(), 1)
+        return first_of_month - timedelta(days=7), first_of_month + timedelta(days=42)
+
+    def set_marked_dates(self, date_texts: Sequence[str]) -> None:
+        marked_days: set[int] = set()
+        for date_text in date_texts:
+            marked_date = QDate.fromString(date_text, "yyyy-MM-dd")
+            if marked_date.isValid():
+                marked_days.add(marked_date.toJulianDay())
+        self.marked_days = marked_days
+        self.updateCells()
+
+    def set_date_marked(self, date_text: str, marked: bool) -> None:
+        marked_date = QDate.fromString(date_text, "yyyy-MM-dd")
+        if not marked_date.isValid():
+            return
+        day = marked_date.toJulianDay()
+        if marked == (day in self.marked_days):
+            return
+        if marked:
+            self.marked_days.add(day)
+        else:
+            self.marked_days.discard(day)
+        self.updateCell(marked_date)
+
+    def paintCell(self, painter, rect, cell_date) -> None:  # type: ignore[override]
+        if cell_date.toJulianDay() not in self.marked_days:
+            super().paintCell(painter, rect, cell_date)
+            return
+        if cell_date == self.selectedDate():
+            # Keep the selection highlight and draw the entry mark as a dot on top of it.
+            super().paintCell(painter, rect, cell_date)
+            radius = max(2, min(rect.width(), rect.height()) // 12)
+            painter.save()
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#F2F5FF" if self.is_dark else "#1E3A78"))
+            painter.drawEllipse(
+                QPoint(rect.center().x(), rect.bottom() - radius * 2), radius, radius
+            )
+            painter.restore()
+            return
+        painter.save()
+        painter.fillRect(rect, QColor("#43557E" if self.is_dark else "#D9E6FF"))
+        painter.setPen(QColor("#F2F5FF" if self.is_dark else "#1E3A78"))
+        font = QFont(painter.font())
+        font.setWeight(QFont.DemiBold)
+        painter.setFont(font)
+        painter.drawText(rect, int(Qt.AlignCenter), str(cell_date.day()))
+        painter.restore()
+
+
 class DiaryPage(QWidget):
+    search_requested = pyqtSignal(int, str)
+    catalog_requested = pyqtSignal(object)
+
     def __init__(
         self,
         db: DiaryDatabase,
@@ -1964,6 +5257,8 @@ class DiaryPage(QWidget):
         attachments_dir: Path,
         on_saved: Optional[Callable[[], None]] = None,
         on_toggle_theme: Optional[Callable[[], None]] = None,
+        search_debounce_ms: Optional[int] = None,
+        on_initial_load_finished: Optional[Callable[[], None]] = None,
     ):
         super().__init__()
         self.setObjectName("diaryPage")
@@ -1973,20 +5268,68 @@ class DiaryPage(QWidget):
         self.file_icon_provider = QFileIconProvider()
         self.on_saved = on_saved
         self.on_toggle_theme = on_toggle_theme
+        self.on_initial_load_finished = on_initial_load_finished
+        self._initial_load_pending = True
         self.current_entry_id: Optional[int] = None
-        self.pending_attachments: list[AttachmentDraft] = []
         self._saved_entry_date = QDate.currentDate().toString("yyyy-MM-dd")
         self._saved_title = ""
         self._saved_content_html = ""
         self.is_dark = False
-        self.marked_date_strings: set[str] = set()
-        self.default_editor_font_family = resolve_editor_font_family()
+        self._suppress_entry_selection = False
+        self._search_generation = 0
+        self.search_debounce_timer = QTimer(self)
+        self.search_debounce_timer.setSingleShot(True)
+        self.search_debounce_timer.setInterval(
+            get_search_debounce_ms() if search_debounce_ms is None else max(0, search_debounce_ms)
+        )
+        self.search_debounce_timer.timeout.connect(self.start_background_search)
+        self.search_thread = QThread(self)
+        self.search_thread.setObjectName("entry-search")
+        self.search_worker = EntrySearchWorker(self.db.db_path)
+        self.search_worker.moveToThread(self.search_thread)
+        self.search_requested.connect(self.search_worker.search)
+        self.search_worker.results_ready.connect(self.apply_search_results)
+        self.search_worker.search_failed.connect(self.handle_search_failed)
+        self.search_thread.start()
+        self.attachment_sort_order = ATTACHMENT_SORT_OPTIONS[0][1]
+        self.catalog_thread = QThread(self)
+        self.catalog_thread.setObjectName("attachment-catalog")
+        self.catalog_worker = AttachmentCatalogWorker()
+        self.catalog_worker.moveToThread(self.catalog_thread)
+        self.catalog_requested.connect(self.catalog_worker.catalog)
+        self.catalog_worker.catalogued.connect(self.apply_attachment_catalog)
+        self.catalog_thread.start()
+        self.import_pool = QThreadPool(self)
+        self.import_pool.setMaxThreadCount(ATTACHMENT_IMPORT_THREADS)
+        self.import_cancel_event = threading.Event()
+        self.import_claims = AttachmentImportClaims()
+        self._import_task_entries: dict[int, int] = {}
+        self._import_task_names: dict[int, str] = {}
+        self._import_failures: list[str] = []
+        self._import_shutting_down = False
+        self._next_import_task_id = 0
+        self.thumbnail_cache = ThumbnailCache(self.data_root / THUMBNAILS_DIR)
+        self.thumbnail_pool = QThreadPool(self)
+        self.thumbnail_pool.setMaxThreadCount(THUMBNAIL_THREADS)
+        self._thumbnail_requests: set[str] = set()
+        QPixmapCache.setCacheLimit(ATTACHMENT_PIXMAP_CACHE_KB)
+        # (entry id, sort order) -> [(row, resolved path, tooltip)], oldest first.
+        self._attachment_row_cache: dict[tuple[int, str], list[tuple[sqlite3.Row, str, str]]] = {}
+        self._file_type_icons: dict[str, QIcon] = {}
+        self.attachment_placeholder_icon = QApplication.style().standardIcon(QStyle.SP_FileIcon)
+        self.attachment_icon_timer = QTimer(self)
+        self.attachment_icon_timer.setSingleShot(True)
+        self.attachment_icon_timer.setInterval(0)
+        self.attachment_icon_timer.timeout.connect(self.load_visible_attachment_icons)
+        with startup_phase("main_window.diary_page.editor_font"):
+            self.default_editor_font_family = resolve_editor_font_family()
         self.default_editor_font_size = DEFAULT_EDITOR_FONT_SIZE
         self.weekend_header_delegates: dict[str, CalendarWeekendHeaderDelegate] = {}
         self.weekend_header_delegate_view_ids: dict[str, int] = {}
+        # Entries and calendar marks are loaded by start_initial_load once the window has painted.
         self._build_ui()
-        self.refresh_entry_list()
-        self.ensure_unsaved_draft_if_no_entries()
+        # Attachments saved before the catalog existed are filled in once, off the GUI thread.
+        QTimer.singleShot(0, self.queue_startup_attachment_catalog)
 
     def to_stored_attachment_path(self, path: Path) -> str:
         resolved = path.resolve()
@@ -2060,24 +5403,28 @@ class DiaryPage(QWidget):
         calendar_header.addStretch(1)
         calendar_header.addWidget(self.clear_date_filter_button)
 
-        self.calendar_widget = QCalendarWidget()
+        self.calendar_widget = EntryCalendarWidget()
         self.calendar_widget.setObjectName("entryCalendar")
         self.calendar_widget.setAttribute(Qt.WA_StyledBackground, True)
         self.calendar_widget.setGridVisible(True)
         self.calendar_widget.setVerticalHeaderFormat(QCalendarWidget.NoVerticalHeader)
         self.calendar_widget.setMaximumHeight(260)
         self.calendar_widget.clicked.connect(self.show_entries_for_calendar_date)
+        self.calendar_widget.currentPageChanged.connect(self.refresh_calendar_marks)
 
         self.calendar_tip = QLabel("点击日期可快速筛选当天记录。")
         self.calendar_tip.setObjectName("subheading")
         self.calendar_tip.setWordWrap(True)
 
-        self.entry_list = QListWidget()
+        self.entry_list_model = EntryListModel(self.db, self)
+        self.entry_list = QListView()
         self.entry_list.setObjectName("filteredEntriesList")
+        self.entry_list.setModel(self.entry_list_model)
+        self.entry_list.setUniformItemSizes(False)
         self.entry_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.entry_list.setSelectionRectVisible(True)
         self.entry_list.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
-        self.entry_list.itemSelectionChanged.connect(self.load_selected_entry)
+        self.entry_list.selectionModel().selectionChanged.connect(self.on_entry_selection_changed)
         filtered_entries_card = QFrame()
         filtered_entries_card.setObjectName("filteredEntriesCard")
         filtered_entries_layout = QVBoxLayout(filtered_entries_card)
@@ -2138,7 +5485,7 @@ class DiaryPage(QWidget):
 
         toolbar = QHBoxLayout()
         toolbar.setSpacing(8)
-        self.font_combo = QFontComboBox()
+        self.font_combo = LazyFontComboBox()
         self.font_combo.currentFontChanged.connect(
             lambda font: self.apply_font_family(font.family())
         )
@@ -2178,9 +5525,15 @@ class DiaryPage(QWidget):
         self.delete_attachment_button = PushButton("删除所选附件")
         self.delete_attachment_button.clicked.connect(self.delete_selected_attachment)
 
+        self.attachment_sort_combo = ComboBox()
+        for label, order in ATTACHMENT_SORT_OPTIONS:
+            self.attachment_sort_combo.addItem(label, userData=order)
+        self.attachment_sort_combo.currentIndexChanged.connect(self.handle_attachment_sort_changed)
+
         attachment_row = QHBoxLayout()
         attachment_row.addWidget(attachment_heading)
         attachment_row.addStretch(1)
+        attachment_row.addWidget(self.attachment_sort_combo)
         attachment_row.addWidget(self.delete_attachment_button)
 
         self.attachment_list = QListWidget()
@@ -2194,12 +5547,18 @@ class DiaryPage(QWidget):
         self.attachment_list.setSpacing(8)
         self.attachment_list.setMaximumHeight(280)
         self.attachment_list.itemDoubleClicked.connect(self.open_attachment)
+        attachment_scroll_bar = self.attachment_list.verticalScrollBar()
+        attachment_scroll_bar.valueChanged.connect(self.schedule_visible_attachment_icons)
+        attachment_scroll_bar.rangeChanged.connect(self.schedule_visible_attachment_icons)
         attachments_card = QFrame()
         attachments_card.setObjectName("attachedFilesCard")
         attachments_layout = QVBoxLayout(attachments_card)
         attachments_layout.setContentsMargins(10, 10, 10, 10)
         attachments_layout.setSpacing(8)
+        self.attachment_import_panel = AttachmentImportPanel()
+        self.attachment_import_panel.cancel_requested.connect(self.cancel_attachment_imports)
         attachments_layout.addLayout(attachment_row)
+        attachments_layout.addWidget(self.attachment_import_panel)
         attachments_layout.addWidget(self.attachment_list)
         editor_layout.addWidget(attachments_card)
 
@@ -2256,11 +5615,110 @@ class DiaryPage(QWidget):
         self.theme_button.setText("浅色模式" if is_dark else "深色模式")
         self.apply_calendar_style()
         self.update_calendar_filter_state()
-        self.refresh_calendar_marks()
+        self.calendar_widget.set_dark_mode(is_dark)
 
     def on_search_changed(self, _text: str) -> None:
-        self.refresh_entry_list()
         self.update_calendar_filter_state()
+        self.search_debounce_timer.start()
+
+    def _supersede_pending_search(self) -> int:
+        self.search_debounce_timer.stop()
+        self._search_generation += 1
+        self.search_worker.supersede(self._search_generation)
+        return self._search_generation
+
+    def start_background_search(self) -> None:
+        generation = self._supersede_pending_search()
+        self.search_requested.emit(generation, self.search_bar.text())
+
+    def start_initial_load(self) -> None:
+        # The first page comes from the search worker, so the GUI thread never waits on it.
+        self.refresh_calendar_marks()
+        self.start_background_search()
+
+    def _finish_initial_load(self) -> None:
+        if not self._initial_load_pending:
+            return
+        self._initial_load_pending = False
+        self.ensure_unsaved_draft_if_no_entries()
+        if self.on_initial_load_finished:
+            self.on_initial_load_finished()
+
+    def apply_search_results(
+        self,
+        generation: int,
+        search_text: str,
+        rows: list[sqlite3.Row],
+        cursor: Optional[tuple],
+    ) -> None:
+        if generation != self._search_generation or search_text != self.search_bar.text():
+            return
+        self._suppress_entry_selection = True
+        try:
+            self.entry_list_model.apply_first_page(search_text, rows, cursor)
+            self._restore_current_entry_selection()
+        finally:
+            self._suppress_entry_selection = False
+        self._finish_initial_load()
+
+    def handle_search_failed(self, generation: int, _message: str) -> None:
+        if generation != self._search_generation:
+            return
+        # Fall back to reading the page on the GUI thread; the initial load finishes either way.
+        try:
+            self.refresh_entry_list()
+        except sqlite3.Error as exc:
+            self._finish_initial_load()
+            show_warning_popup(self, "读取失败", f"日记列表未能读取：\n{exc}")
+
+    def shutdown_background_search(self) -> None:
+        self._supersede_pending_search()
+        self.search_thread.quit()
+        self.search_thread.wait()
+        self.search_worker.close()
+
+    def shutdown_attachment_catalog(self) -> None:
+        self.catalog_thread.quit()
+        self.catalog_thread.wait()
+
+    def queue_startup_attachment_catalog(self) -> None:
+        # Files still being copied into the data root would otherwise be catalogued as missing.
+        if DATA_ROOT_SYNC is not None and not DATA_ROOT_SYNC.is_finished():
+            QTimer.singleShot(DATA_ROOT_SYNC_POLL_MS, self.queue_startup_attachment_catalog)
+            return
+        self.queue_attachment_catalog()
+
+    def queue_attachment_catalog(self, entry_id: Optional[int] = None) -> None:
+        jobs = [
+            (
+                int(row["id"]),
+                str(self.resolve_attachment_path(str(row["file_path"]))),
+                int(row["is_image"]),
+            )
+            for row in self.db.list_uncatalogued_attachments(entry_id)
+        ]
+        if jobs:
+            self.catalog_requested.emit(jobs)
+
+    def apply_attachment_catalog(self, catalog, missing_ids) -> None:
+        try:
+            self.db.update_attachment_catalog(catalog)
+            self.db.mark_attachments_missing(missing_ids)
+        except sqlite3.Error:
+            return
+        self.invalidate_attachment_rows()
+        shown_ids = {
+            (self.attachment_list.item(row).data(Qt.UserRole) or {}).get("attachment_id")
+            for row in range(self.attachment_list.count())
+        }
+        if any(attachment_id in shown_ids for attachment_id, _metadata in catalog):
+            self.refresh_attachment_list()
+
+    def handle_attachment_sort_changed(self, index: int) -> None:
+        self.attachment_sort_order = str(
+            self.attachment_sort_combo.itemData(index) or ATTACHMENT_SORT_OPTIONS[0][1]
+        )
+        self.refresh_attachment_list()
 
     def clear_date_filter(self) -> None:
         self.search_bar.clear()
@@ -2268,9 +5726,13 @@ class DiaryPage(QWidget):
 
     def show_entries_for_calendar_date(self, selected_date: QDate) -> None:
         self.date_edit.setDate(selected_date)
+        self.search_bar.blockSignals(True)
         self.search_bar.setText(selected_date.toString("yyyy-MM-dd"))
-        if self.entry_list.count() > 0:
-            self.entry_list.setCurrentRow(0)
+        self.search_bar.blockSignals(False)
+        self.update_calendar_filter_state()
+        self.refresh_entry_list()
+        if self.entry_list_model.rowCount() > 0:
+            self.entry_list.setCurrentIndex(self.entry_list_model.index(0))
 
     def apply_calendar_style(self) -> None:
         self.calendar_widget.setStyleSheet(CALENDAR_DARK_STYLE if self.is_dark else CALENDAR_LIGHT_STYLE)
@@ -2318,7 +5780,10 @@ class DiaryPage(QWidget):
             delegate is None
             or self.weekend_header_delegate_view_ids.get(calendar_key) != current_view_id
         ):
-            delegate = CalendarWeekendHeaderDelegate(calendar_view)
+            current_delegate = calendar_view.itemDelegate()
+            if isinstance(current_delegate, CalendarWeekendHeaderDelegate):
+                current_delegate = current_delegate.date_cell_delegate
+            delegate = CalendarWeekendHeaderDelegate(calendar_view, current_delegate)
             self.weekend_header_delegates[calendar_key] = delegate
             self.weekend_header_delegate_view_ids[calendar_key] = current_view_id
 
@@ -2355,48 +5820,67 @@ class DiaryPage(QWidget):
             return
         self.calendar_tip.setText("点击日期可快速筛选当天记录。")
 
-    def calendar_mark_format(self) -> QTextCharFormat:
-        fmt = QTextCharFormat()
-        if self.is_dark:
-            fmt.setBackground(QColor("#43557E"))
-            fmt.setForeground(QColor("#F2F5FF"))
-        else:
-            fmt.setBackground(QColor("#D9E6FF"))
-            fmt.setForeground(QColor("#1E3A78"))
-        fmt.setFontWeight(600)
-        return fmt
-
-    def refresh_calendar_marks(self) -> None:
-        for date_text in self.marked_date_strings:
-            marked_date = QDate.fromString(date_text, "yyyy-MM-dd")
-            if marked_date.isValid():
-                self.calendar_widget.setDateTextFormat(marked_date, QTextCharFormat())
+    def refresh_calendar_marks(self, *_args) -> None:
+        start, end = self.calendar_widget.shown_date_range()
+        self.calendar_widget.set_marked_dates(self.db.list_entry_dates(start, end))
 
-        self.marked_date_strings.clear()
-        marked_format = self.calendar_mark_format()
-        for date_text in self.db.list_entry_dates():
-            marked_date = QDate.fromString(date_text, "yyyy-MM-dd")
-            if not marked_date.isValid():
-                continue
-            self.calendar_widget.setDateTextFormat(marked_date, marked_format)
-            self.marked_date_strings.add(date_text)
+    def update_calendar_mark(self, date_text: str) -> None:
+        self.calendar_widget.set_date_marked(date_text, self.db.has_entry_on(date_text))
 
     def refresh_entry_list(self) -> None:
-        rows = self.db.list_entries(self.search_bar.text())
-        self.entry_list.blockSignals(True)
-        self.entry_list.clear()
-        selected_item: Optional[QListWidgetItem] = None
+        self._supersede_pending_search()
+        self._suppress_entry_selection = True
+        try:
+            self.entry_list_model.reset(self.search_bar.text())
+            self._restore_current_entry_selection()
+        finally:
+            self._suppress_entry_selection = False
+        self._finish_initial_load()
+
+    def refresh_entry_row(self, entry_id: int) -> None:
+        # A save only moves its own row; reloading would re-fetch every page above it.
+        self._suppress_entry_selection = True
+        try:
+            self.entry_list_model.refresh_entry(entry_id)
+            self._restore_current_entry_selection()
+        finally:
+            self._suppress_entry_selection = False
+        self._finish_initial_load()
+
+    def _restore_current_entry_selection(self) -> None:
+        # Only rows already loaded are searched; the list is not paged through to find it.
+        if self.current_entry_id is None:
+            return
+        row = self.entry_list_model.row_for_entry_id(self.current_entry_id, fetch=False)
+        if row is not None:
+            self.entry_list.setCurrentIndex(self.entry_list_model.index(row))
+
+    def on_entry_selection_changed(self, *_args) -> None:
+        if self._suppress_entry_selection:
+            return
+        self.load_selected_entry()
+
+    def _set_entry_list_current_row(self, row: int) -> None:
+        self._suppress_entry_selection = True
+        try:
+            self.entry_list.setCurrentIndex(self.entry_list_model.index(row))
+        finally:
+            self._suppress_entry_selection = False
+
+    def selected_entry_ids(self) -> list[int]:
+        rows = sorted(index.row() for index in self.entry_list.selectionModel().selectedRows())
+        entry_ids: list[int] = []
         for row in rows:
-            title = str(row["title"]).strip() or UNTITLED_ENTRY_TITLE
-            item = QListWidgetItem(f"{row['entry_date']}  |  {title}")
-            item.setData(Qt.UserRole, row["id"])
-            self.entry_list.addItem(item)
-            if row["id"] == self.current_entry_id:
-                selected_item = item
-        if selected_item:
-            self.entry_list.setCurrentItem(selected_item)
-        self.entry_list.blockSignals(False)
-        self.refresh_calendar_marks()
+            entry_id = self.entry_list_model.entry_id_at(row)
+            if entry_id is not None:
+                entry_ids.append(entry_id)
+        return entry_ids
+
+    def current_list_entry_id(self) -> Optional[int]:
+        index = self.entry_list.currentIndex()
+        if not index.isValid():
+            return None
+        return self.entry_list_model.entry_id_at(index.row())
 
     def ensure_unsaved_draft_if_no_entries(self) -> None:
         if self.db.total_entries() > 0:
@@ -2404,11 +5888,9 @@ class DiaryPage(QWidget):
         self.new_entry(auto_save_unsaved=False)
 
     def select_first_entry_if_available(self) -> bool:
-        if self.entry_list.count() <= 0:
+        if self.entry_list_model.rowCount() <= 0:
             return False
-        self.entry_list.blockSignals(True)
-        self.entry_list.setCurrentRow(0)
-        self.entry_list.blockSignals(False)
+        self._set_entry_list_current_row(0)
         self.load_selected_entry()
         return True
 
@@ -2419,8 +5901,6 @@ class DiaryPage(QWidget):
         self.editor.document().setModified(False)
 
     def _has_meaningful_draft(self) -> bool:
-        if self.pending_attachments:
-            return True
         if self.title_edit.text().strip():
             return True
         if self.editor.toPlainText().strip():
@@ -2430,8 +5910,6 @@ class DiaryPage(QWidget):
     def has_unsaved_changes(self) -> bool:
         if self.current_entry_id is None:
             return self._has_meaningful_draft()
-        if self.pending_attachments:
-            return True
         if self.editor.document().isModified():
             return True
         if self.date_edit.date().toString("yyyy-MM-dd") != self._saved_entry_date:
@@ -2443,15 +5921,11 @@ class DiaryPage(QWidget):
             self.save_current_entry(show_notice=False)
 
     def _select_entry_item_by_id(self, entry_id: int) -> bool:
-        for index in range(self.entry_list.count()):
-            item = self.entry_list.item(index)
-            if int(item.data(Qt.UserRole)) != entry_id:
-                continue
-            self.entry_list.blockSignals(True)
-            self.entry_list.setCurrentItem(item)
-            self.entry_list.blockSignals(False)
-            return True
-        return False
+        row = self.entry_list_model.row_for_entry_id(entry_id)
+        if row is None:
+            return False
+        self._set_entry_list_current_row(row)
+        return True
 
     def is_managed_attachment_path(self, path: Path) -> bool:
         try:
@@ -2488,7 +5962,6 @@ class DiaryPage(QWidget):
             return
 
         self.current_entry_id = None
-        self.pending_attachments.clear()
         today = QDate.currentDate()
         self.date_edit.setDate(today)
         self.calendar_widget.setSelectedDate(today)
@@ -2508,6 +5981,7 @@ class DiaryPage(QWidget):
             "",
             "",
         )
+        self.calendar_widget.set_date_marked(entry_date, True)
         if keep_editor_unchanged:
             self.refresh_entry_list()
             if self.on_saved:
@@ -2525,12 +5999,9 @@ class DiaryPage(QWidget):
             self.on_saved()
 
     def load_selected_entry(self) -> None:
-        if len(self.entry_list.selectedItems()) > 1:
-            return
-        item = self.entry_list.currentItem()
-        if not item:
+        if len(self.entry_list.selectionModel().selectedRows()) > 1:
             return
-        entry_id = item.data(Qt.UserRole)
+        entry_id = self.current_list_entry_id()
         if entry_id is None:
             return
         target_entry_id = int(entry_id)
@@ -2538,12 +6009,8 @@ class DiaryPage(QWidget):
         if target_entry_id != self.current_entry_id and self.has_unsaved_changes():
             if self.current_entry_id is not None:
                 self.save_current_entry(show_notice=False)
-                self.refresh_entry_list()
                 if not self._select_entry_item_by_id(target_entry_id):
                     return
-            else:
-                # Avoid creating a new entry when switching from an unsaved draft.
-                self.pending_attachments.clear()
 
         row = self.db.get_entry(target_entry_id)
         if not row:
@@ -2557,18 +6024,17 @@ class DiaryPage(QWidget):
         self.title_edit.setText(row["title"])
         self.editor.setHtml(row["content_html"])
         self.sync_format_controls()
-        self.pending_attachments.clear()
         self.refresh_attachment_list()
         self._reset_change_tracking()
 
     def save_current_entry(self, show_notice: bool = True, force_new: bool = False) -> None:
         if self.current_entry_id is None and not force_new:
-            selected_items = self.entry_list.selectedItems()
-            if len(selected_items) == 1:
-                selected_id = selected_items[0].data(Qt.UserRole)
-                if selected_id is not None and self.db.get_entry(int(selected_id)):
-                    self.current_entry_id = int(selected_id)
-            elif len(selected_items) > 1:
+            selected_ids = self.selected_entry_ids()
+            if len(selected_ids) == 1:
+                selected_id = selected_ids[0]
+                if self.db.get_entry(selected_id):
+                    self.current_entry_id = selected_id
+            elif len(selected_ids) > 1:
                 show_warning_popup(self, "保存失败", "当前选中了多条记录，请先只选择一条再保存。")
                 return
 
@@ -2577,7 +6043,7 @@ class DiaryPage(QWidget):
         title = self.title_edit.text().strip()
 
         if self.current_entry_id is None and not force_new:
-            if not title and not content_text and not self.pending_attachments:
+            if not title and not content_text:
                 show_info_popup(self, "无需保存", "当前没有可保存内容。")
                 return
 
@@ -2587,27 +6053,25 @@ class DiaryPage(QWidget):
             title = title or UNTITLED_ENTRY_TITLE
 
         entry_date = self.date_edit.date().toString("yyyy-MM-dd")
-        saved_id = self.db.save_entry(
-            None if force_new else self.current_entry_id,
-            entry_date,
-            title,
-            content_html,
-            content_text,
-        )
-
-        for attachment in self.pending_attachments:
-            stored_path = self.to_stored_attachment_path(Path(attachment.file_path))
-            self.db.add_attachment(
-                saved_id,
-                attachment.file_name,
-                stored_path,
-                attachment.is_image,
+        previous_entry_date = None if force_new else self._saved_entry_date
+        try:
+            saved_id = self.db.save_entry(
+                None if force_new else self.current_entry_id,
+                entry_date,
+                title,
+                content_html,
+                content_text,
             )
+        except sqlite3.Error as exc:
+            show_warning_popup(self, "保存失败", f"日记未能写入数据库：\n{exc}")
+            return
 
-        self.pending_attachments.clear()
         self.current_entry_id = saved_id
         self.title_edit.setText(title)
-        self.refresh_entry_list()
+        self.refresh_entry_row(saved_id)
+        self.calendar_widget.set_date_marked(entry_date, True)
+        if previous_entry_date and previous_entry_date != entry_date:
+            self.update_calendar_mark(previous_entry_date)
         self.refresh_attachment_list()
         self._reset_change_tracking()
 
@@ -2620,11 +6084,7 @@ class DiaryPage(QWidget):
     def delete_current_entry(self) -> None:
         selected_entry_ids: list[int] = []
         seen_entry_ids: set[int] = set()
-        for item in self.entry_list.selectedItems():
-            raw_entry_id = item.data(Qt.UserRole)
-            if raw_entry_id is None:
-                continue
-            entry_id = int(raw_entry_id)
+        for entry_id in self.selected_entry_ids():
             if entry_id in seen_entry_ids:
                 continue
             seen_entry_ids.add(entry_id)
@@ -2633,9 +6093,7 @@ class DiaryPage(QWidget):
         if not selected_entry_ids:
             entry_id = self.current_entry_id
             if entry_id is None:
-                item = self.entry_list.currentItem()
-                if item is not None and item.data(Qt.UserRole) is not None:
-                    entry_id = int(item.data(Qt.UserRole))
+                entry_id = self.current_list_entry_id()
             if entry_id is not None:
                 selected_entry_ids.append(entry_id)
 
@@ -2643,16 +6101,13 @@ class DiaryPage(QWidget):
             show_info_popup(self, "未选择记录", "请先选择一条要删除的记录。")
             return
 
-        rows_to_delete: list[sqlite3.Row] = []
-        for entry_id in selected_entry_ids:
-            row = self.db.get_entry(entry_id)
-            if row:
-                rows_to_delete.append(row)
+        rows_to_delete = self.db.list_entry_summaries(selected_entry_ids)
 
         if not rows_to_delete:
             show_warning_popup(self, "记录不存在", "这条记录已经不存在。")
             self.current_entry_id = None
             self.refresh_entry_list()
+            self.refresh_calendar_marks()
             if not self.select_first_entry_if_available():
                 self.ensure_unsaved_draft_if_no_entries()
             return
@@ -2688,23 +6143,17 @@ class DiaryPage(QWidget):
             ):
                 return
 
-        deleted_entry_ids = {int(row["id"]) for row in rows_to_delete}
-        attachment_paths: list[str] = []
-        for row in rows_to_delete:
-            attachment_paths.extend(self.db.delete_entry(int(row["id"])))
-
-        for file_path in set(attachment_paths):
-            if self.db.has_attachment_path(file_path):
-                continue
-            path = self.resolve_attachment_path(file_path)
-            if not self.is_managed_attachment_path(path):
-                continue
-            self.delete_file_safely(path)
+        deletion = self.db.delete_entries([int(row["id"]) for row in rows_to_delete])
+        deleted_entry_ids = set(deletion.deleted_entry_ids)
+        self.invalidate_attachment_rows(deleted_entry_ids)
+        self.delete_attachment_files_in_background(deletion.unreferenced_paths)
 
         current_deleted = self.current_entry_id is not None and self.current_entry_id in deleted_entry_ids
         if current_deleted:
             self.current_entry_id = None
         self.refresh_entry_list()
+        for deleted_date in {str(row["entry_date"]) for row in rows_to_delete}:
+            self.update_calendar_mark(deleted_date)
         if current_deleted and not self.select_first_entry_if_available():
             self.ensure_unsaved_draft_if_no_entries()
         if self.on_saved:
@@ -2718,10 +6167,8 @@ class DiaryPage(QWidget):
         self.attachment_list.clear()
 
         if self.current_entry_id is not None:
-            for row in self.db.list_attachments(self.current_entry_id):
-                resolved_path = str(self.resolve_attachment_path(str(row["file_path"])))
+            for row, resolved_path, tooltip in self.cached_attachment_rows(self.current_entry_id):
                 metadata = {
-                    "pending": False,
                     "attachment_id": int(row["id"]),
                     "file_name": row["file_name"],
                     "file_path": resolved_path,
@@ -2733,23 +6180,31 @@ class DiaryPage(QWidget):
                     int(row["is_image"]),
                     metadata,
                 )
+                item.setToolTip(tooltip)
                 self.attachment_list.addItem(item)
 
-        for attachment in self.pending_attachments:
-            metadata = {
-                "pending": True,
-                "attachment_id": None,
-                "file_name": attachment.file_name,
-                "file_path": attachment.file_path,
-                "is_image": int(attachment.is_image),
-            }
-            item = self.create_attachment_item(
-                f"{attachment.file_name}（待保存）",
-                attachment.file_path,
-                int(attachment.is_image),
-                metadata,
-            )
-            self.attachment_list.addItem(item)
+        self.schedule_visible_attachment_icons()
+
+    def cached_attachment_rows(self, entry_id: int) -> list[tuple[sqlite3.Row, str, str]]:
+        key = (entry_id, self.attachment_sort_order)
+        rows = self._attachment_row_cache.pop(key, None)
+        if rows is None:
+            rows = []
+            for row in self.db.list_attachments(entry_id, self.attachment_sort_order):
+                resolved_path = str(self.resolve_attachment_path(str(row["file_path"])))
+                rows.append((row, resolved_path, format_attachment_tooltip(row, resolved_path)))
+        self._attachment_row_cache[key] = rows
+        while len(self._attachment_row_cache) > ATTACHMENT_ROW_CACHE_ENTRIES:
+            self._attachment_row_cache.pop(next(iter(self._attachment_row_cache)))
+        return rows
+
+    def invalidate_attachment_rows(self, entry_ids: Optional[Iterable[int]] = None) -> None:
+        if entry_ids is None:
+            self._attachment_row_cache.clear()
+            return
+        stale_ids = set(entry_ids)
+        for key in [key for key in self._attachment_row_cache if key[0] in stale_ids]:
+            del self._attachment_row_cache[key]
 
     def create_attachment_item(
         self,
@@ -2758,29 +6213,91 @@ class DiaryPage(QWidget):
         is_image: int,
         metadata: dict,
     ) -> QListWidgetItem:
+        # The real icon is loaded once the item is scrolled into view.
         item = QListWidgetItem(display_name)
-        item.setIcon(self.create_attachment_icon(file_path, bool(is_image)))
+        item.setIcon(self.attachment_placeholder_icon)
         item.setData(Qt.UserRole, metadata)
         item.setTextAlignment(Qt.AlignHCenter)
         item.setToolTip(file_path)
         return item
 
+    def schedule_visible_attachment_icons(self, *_args) -> None:
+        self.attachment_icon_timer.start()
+
+    def load_visible_attachment_icons(self) -> None:
+        viewport_rect = self.attachment_list.viewport().rect()
+        for row in range(self.attachment_list.count()):
+            item = self.attachment_list.item(row)
+            if item.data(ATTACHMENT_ICON_LOADED_ROLE):
+                continue
+            if not self.attachment_list.visualItemRect(item).intersects(viewport_rect):
+                continue
+            metadata = item.data(Qt.UserRole) or {}
+            file_path = metadata.get("file_path")
+            if not file_path:
+                continue
+            item.setIcon(self.create_attachment_icon(file_path, bool(metadata.get("is_image"))))
+            item.setData(ATTACHMENT_ICON_LOADED_ROLE, True)
+
     def create_attachment_icon(self, file_path: str, is_image: bool) -> QIcon:
         path = Path(file_path)
-        if is_image and path.exists():
-            pixmap = load_qpixmap(path)
-            if not pixmap.isNull():
-                thumbnail = pixmap.scaled(120, 120, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                return QIcon(thumbnail)
-
+        if is_image:
+            pixmap = QPixmapCache.find(f"attachment-icon:{file_path}")
+            if pixmap is not None and not pixmap.isNull():
+                return QIcon(pixmap)
+            if path.exists():
+                thumbnail = self.thumbnail_cache.lookup(path)
+                if thumbnail is not None:
+                    pixmap = QPixmap(str(thumbnail))
+                    if not pixmap.isNull():
+                        QPixmapCache.insert(f"attachment-icon:{file_path}", pixmap)
+                        return QIcon(pixmap)
+                # The file-type icon stands in until the worker has decoded the thumbnail.
+                self.request_thumbnail(path)
+
+        suffix = path.suffix.lower()
+        icon = self._file_type_icons.get(suffix)
+        if icon is not None:
+            return icon
         if path.exists():
             icon = self.file_icon_provider.icon(QFileInfo(str(path)))
         else:
             icon = self.file_icon_provider.icon(QFileIconProvider.File)
         if icon.isNull():
             icon = QApplication.style().standardIcon(QStyle.SP_FileIcon)
+        else:
+            self._file_type_icons[suffix] = icon
         return icon
 
+    def request_thumbnail(self, path: Path) -> None:
+        key = str(path)
+        if key in self._thumbnail_requests:
+            return
+        self._thumbnail_requests.add(key)
+        task = ThumbnailTask(self.thumbnail_cache, path)
+        task.signals.ready.connect(self.apply_thumbnail)
+        self.thumbnail_pool.start(task)
+
+    def apply_thumbnail(self, file_path: str, thumbnail_path: str) -> None:
+        self._thumbnail_requests.discard(file_path)
+        if not thumbnail_path:
+            return
+        pixmap = QPixmap(thumbnail_path)
+        if pixmap.isNull():
+            return
+        QPixmapCache.insert(f"attachment-icon:{file_path}", pixmap)
+        icon = QIcon(pixmap)
+        for row in range(self.attachment_list.count()):
+            item = self.attachment_list.item(row)
+            if not item.data(ATTACHMENT_ICON_LOADED_ROLE):
+                continue
+            if (item.data(Qt.UserRole) or {}).get("file_path") == file_path:
+                item.setIcon(icon)
+
+    def shutdown_thumbnails(self) -> None:
+        self.thumbnail_pool.clear()
+        self.thumbnail_pool.waitForDone()
+
     def attach_file(self) -> None:
         file_dialog = QFileDialog(self, "选择附件")
         file_dialog.setFileMode(QFileDialog.ExistingFiles)
@@ -2794,42 +6311,124 @@ class DiaryPage(QWidget):
         if not selected_paths:
             return
 
+        # Imports are committed to an existing entry, so an unsaved draft is saved first.
+        if self.current_entry_id is None:
+            self.save_current_entry(show_notice=False, force_new=True)
+        if self.current_entry_id is None:
+            return
         self.attachments_dir.mkdir(parents=True, exist_ok=True)
-        failed_files: list[str] = []
-        added_any = False
+        self.start_attachment_import(self.current_entry_id, [Path(path) for path in selected_paths])
 
-        for selected_path in selected_paths:
-            source = Path(selected_path)
+    def start_attachment_import(self, entry_id: int, sources: Sequence[Path]) -> None:
+        if not self._import_task_entries:
+            self.import_cancel_event = threading.Event()
+        for source in sources:
             if not source.is_file():
-                failed_files.append(source.name or selected_path)
+                self._import_failures.append(source.name or str(source))
                 continue
-
-            unique_name = (
-                f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid4().hex[:8]}{source.suffix.lower()}"
+            self._next_import_task_id += 1
+            task_id = self._next_import_task_id
+            task = AttachmentImportTask(
+                task_id,
+                source,
+                self.data_root,
+                self.db.db_path,
+                self.import_cancel_event,
+                self.import_claims,
+                self.thumbnail_cache,
             )
-            destination = self.attachments_dir / unique_name
-            try:
-                shutil.copy2(source, destination)
-            except OSError:
-                failed_files.append(source.name)
-                continue
+            task.signals.progress.connect(self.attachment_import_panel.set_progress)
+            task.signals.finished.connect(self.handle_attachment_imported)
+            task.signals.failed.connect(self.handle_attachment_import_failed)
+            task.signals.cancelled.connect(self._finish_attachment_import_task)
+            self._import_task_entries[task_id] = entry_id
+            self._import_task_names[task_id] = source.name
+            self.attachment_import_panel.add_file(task_id, source.name)
+            self.import_pool.start(task)
+        if not self._import_task_entries:
+            self._report_attachment_import_failures()
+
+    def cancel_attachment_imports(self) -> None:
+        self.import_cancel_event.set()
+
+    def shutdown_attachment_imports(self) -> None:
+        self.cancel_attachment_imports()
+        self.import_pool.waitForDone()
+        # Record imports whose result is still queued so their copied files are not orphaned.
+        self._import_shutting_down = True
+        QCoreApplication.sendPostedEvents(None, QEvent.MetaCall)
+        for task_id in list(self._import_task_entries):
+            self._release_import_claim(task_id)
+            self._import_task_entries.pop(task_id, None)
+        self.import_claims.close()
+
+    def _release_import_claim(self, task_id: int) -> None:
+        # Drop the claim and unlink the blob when nothing references it.
+        with self.import_claims.lock:
+            claimed_path = self.import_claims.release(task_id)
+            if claimed_path is None:
+                return
+            path = Path(claimed_path)
+            if not self.import_claims.is_claimed(path) and not self.db.has_attachment_path(
+                self.to_stored_attachment_path(path)
+            ):
+                self.delete_file_safely(path)
 
-            resolved_destination = destination.resolve()
-            is_image = 1 if is_image_file(resolved_destination) else 0
-            self.pending_attachments.append(
-                AttachmentDraft(
-                    file_name=source.name,
-                    file_path=str(resolved_destination),
-                    is_image=is_image,
-                )
+    def handle_attachment_imported(self, task_id: int, draft: AttachmentDraft) -> None:
+        entry_id = self._import_task_entries.get(task_id)
+        if entry_id is None:
+            return
+        stored_path = self.to_stored_attachment_path(Path(draft.file_path))
+        if not Path(draft.file_path).exists():
+            # Removed from disk by something outside the app while the import ran.
+            self._import_failures.append(draft.file_name)
+            self._finish_attachment_import_task(task_id)
+            return
+        try:
+            self.db.add_attachments(
+                entry_id,
+                [
+                    AttachmentDraft(
+                        file_name=draft.file_name,
+                        file_path=stored_path,
+                        is_image=draft.is_image,
+                        content_hash=draft.content_hash,
+                    )
+                ],
             )
-            added_any = True
-
-        if added_any:
-            self.save_current_entry(show_notice=False)
+        except sqlite3.Error:
+            # The entry was deleted while its file was copying.
+            self._import_failures.append(draft.file_name)
         else:
-            self.refresh_attachment_list()
+            if self._import_shutting_down:
+                self._finish_attachment_import_task(task_id)
+                return
+            self.invalidate_attachment_rows([entry_id])
+            self.queue_attachment_catalog(entry_id)
+            if entry_id == self.current_entry_id:
+                self.refresh_attachment_list()
+        self._finish_attachment_import_task(task_id)
+
+    def handle_attachment_import_failed(self, task_id: int, _message: str) -> None:
+        self._import_failures.append(self._import_task_names.get(task_id, ""))
+        self._finish_attachment_import_task(task_id)
+
+    def _finish_attachment_import_task(self, task_id: int) -> None:
+        self._release_import_claim(task_id)
+        self._import_task_entries.pop(task_id, None)
+        self._import_task_names.pop(task_id, None)
+        if self._import_shutting_down:
+            return
+        self.attachment_import_panel.remove_file(task_id)
+        if self._import_task_entries:
+            return
+        if self.on_saved:
+            self.on_saved()
+        self._report_attachment_import_failures()
 
+    def _report_attachment_import_failures(self) -> None:
+        failed_files = [name for name in self._import_failures if name]
+        self._import_failures.clear()
         if failed_files:
             show_warning_popup(
                 self,
@@ -2871,22 +6470,40 @@ class DiaryPage(QWidget):
         ):
             return
 
-        if isinstance(metadata, dict) and metadata.get("pending"):
-            normalized_path = normalize_path_for_compare(path)
-            self.pending_attachments = [
-                draft
-                for draft in self.pending_attachments
-                if normalize_path_for_compare(Path(draft.file_path)) != normalized_path
-            ]
-        else:
-            attachment_id = metadata.get("attachment_id") if isinstance(metadata, dict) else None
-            if attachment_id is not None:
-                self.db.delete_attachment(int(attachment_id))
+        attachment_id = metadata.get("attachment_id") if isinstance(metadata, dict) else None
+        if attachment_id is not None:
+            self.db.delete_attachment(int(attachment_id))
+            if self.current_entry_id is not None:
+                self.invalidate_attachment_rows([self.current_entry_id])
 
         self.remove_attachment_from_editor(str(path.resolve()))
-        self.delete_file_safely(path)
+        # Content-addressed files can be shared; unlink only after the last reference is gone.
+        with self.import_claims.lock:
+            if not self.import_claims.is_claimed(path) and not self.db.has_attachment_path(
+                self.to_stored_attachment_path(path)
+            ):
+                self.delete_file_safely(path)
         self.refresh_attachment_list()
 
+    def delete_attachment_files_in_background(self, stored_paths: list[str]) -> None:
+        if not stored_paths:
+            return
+        thread = threading.Thread(
+            target=self._delete_managed_attachment_files,
+            args=(list(stored_paths),),
+            name="attachment-cleanup",
+        )
+        thread.start()
+
+    def _delete_managed_attachment_files(self, stored_paths: list[str]) -> None:
+        for file_path in stored_paths:
+            path = self.resolve_attachment_path(file_path)
+            if not self.is_managed_attachment_path(path):
+                continue
+            with self.import_claims.lock:
+                if not self.import_claims.is_claimed(path):
+                    self.delete_file_safely(path)
+
     def delete_file_safely(self, path: Path) -> None:
         if not path.exists():
             return
@@ -2971,6 +6588,7 @@ class DiaryPage(QWidget):
             self.title_edit.setText(title)
 
         entry_date = self.date_edit.date().toString("yyyy-MM-dd")
+        previous_entry_date = self._saved_entry_date
         self.current_entry_id = self.db.save_entry(
             self.current_entry_id,
             entry_date,
@@ -2979,6 +6597,9 @@ class DiaryPage(QWidget):
             content_text,
         )
         self.refresh_entry_list()
+        self.calendar_widget.set_date_marked(entry_date, True)
+        if previous_entry_date != entry_date:
+            self.update_calendar_mark(previous_entry_date)
         self._reset_change_tracking()
 
     def pick_text_color(self) -> None:
@@ -3048,31 +6669,37 @@ class DiaryPage(QWidget):
 class MainWindow(FluentWindow):
     def __init__(self):
         super().__init__()
-        self.db = DiaryDatabase(DATA_ROOT / DB_NAME)
+        # Opening the database runs pending migrations, including attachment path normalizing.
+        with startup_phase("main_window.open_database"):
+            self.db = DiaryDatabase(DATA_ROOT / DB_NAME)
         self.attachments_dir = DATA_ROOT / ATTACHMENTS_DIR
         self.is_dark = False
-        self._theme_synced_after_show = False
-        self._on_this_day_popup_checked_after_show = False
+        self._first_shown = False
+        self.startup_timings: dict[str, float] = {}
 
         self.setWindowTitle(WINDOW_TITLE)
         self.resize(1320, 820)
 
-        self.dashboard_page = DashboardPage(
-            on_entry_open_requested=self.open_entry_from_memory,
-        )
-        self.diary_page = DiaryPage(
-            self.db,
-            DATA_ROOT,
-            self.attachments_dir,
-            on_saved=self.refresh_dashboard,
-            on_toggle_theme=self.toggle_theme,
-        )
+        # The dashboard runs its statistics queries when built, so it is built on first visit.
+        self.dashboard_page: Optional[DashboardPage] = None
+        self.dashboard_host = QWidget()
+        dashboard_layout = QVBoxLayout(self.dashboard_host)
+        dashboard_layout.setContentsMargins(0, 0, 0, 0)
+        with startup_phase("main_window.diary_page"):
+            self.diary_page = DiaryPage(
+                self.db,
+                DATA_ROOT,
+                self.attachments_dir,
+                on_saved=self.refresh_dashboard,
+                on_toggle_theme=self.toggle_theme,
+                on_initial_load_finished=self.handle_entries_ready,
+            )
 
-        self.dashboard_page.setObjectName("dashboardPage")
+        self.dashboard_host.setObjectName("dashboardHost")
         self.diary_page.setObjectName("diaryPage")
 
         self.dashboard_navigation_item = self.addSubInterface(
-            self.dashboard_page,
+            self.dashboard_host,
             QIcon(),
             OVERVIEW_NAV_TEXT,
             NavigationItemPosition.TOP,
@@ -3085,38 +6712,104 @@ class MainWindow(FluentWindow):
         )
         self._update_navigation_icons()
 
-        self._apply_window_icon()
-        self.apply_theme(False)
+        with startup_phase("main_window.window_icon"):
+            self._apply_window_icon()
+        with startup_phase("main_window.apply_theme"):
+            self.apply_theme(False)
         self.switchTo(self.diary_page)
+        self.stackedWidget.currentChanged.connect(self._handle_interface_changed)
+        self.recent_log_shortcut = QShortcut(QKeySequence("Ctrl+Shift+F11"), self)
+        self.recent_log_shortcut.setContext(Qt.ApplicationShortcut)
+        self.recent_log_shortcut.activated.connect(lambda: show_recent_log_popup(self))
+        if QUERY_PROFILER is not None:
+            self.db_trace_shortcut = QShortcut(QKeySequence("Ctrl+Shift+F12"), self)
+            self.db_trace_shortcut.setContext(Qt.ApplicationShortcut)
+            self.db_trace_shortcut.activated.connect(self.dump_db_trace)
+
+    def dump_db_trace(self) -> None:
+        if QUERY_PROFILER is not None:
+            QUERY_PROFILER.dump(DATA_ROOT / DB_TRACE_REPORT_NAME)
 
     def showEvent(self, event) -> None:  # type: ignore[override]
         super().showEvent(event)
-        if not self._theme_synced_after_show:
-            self._theme_synced_after_show = True
+        if not self._first_shown:
+            self._first_shown = True
+            self._record_startup_timing("first_show")
             QTimer.singleShot(0, self._sync_theme_after_show)
-        if not self._on_this_day_popup_checked_after_show:
-            self._on_this_day_popup_checked_after_show = True
-            QTimer.singleShot(0, self.show_on_this_day_popup_if_needed)
+            QTimer.singleShot(0, self.diary_page.start_initial_load)
+
+    def paintEvent(self, event) -> None:  # type: ignore[override]
+        super().paintEvent(event)
+        if "first_paint" not in self.startup_timings:
+            self._record_startup_timing("first_paint")
+
+    def _record_startup_timing(self, name: str) -> None:
+        self.startup_timings[name] = (time.perf_counter_ns() - STARTUP_STARTED_NS) / 1_000_000
+        if STARTUP_TRACER is not None:
+            STARTUP_TRACER.mark(name)
+
+    def handle_entries_ready(self) -> None:
+        self._record_startup_timing("entries_ready")
+        if STARTUP_TRACER is not None:
+            try:
+                report_path = STARTUP_TRACER.dump(DATA_ROOT)
+            except OSError:
+                report_path = None
+            print(STARTUP_TRACER.report(), file=sys.stderr)
+            if report_path is not None:
+                print(f"startup trace written to {report_path}", file=sys.stderr)
+        QTimer.singleShot(0, self.show_on_this_day_popup_if_needed)
+
+    def _handle_interface_changed(self, _index: int) -> None:
+        if self.stackedWidget.currentWidget() is self.dashboard_host:
+            self.ensure_dashboard_page()
+
+    def ensure_dashboard_page(self) -> DashboardPage:
+        if self.dashboard_page is None:
+            self.dashboard_page = DashboardPage(
+                on_entry_open_requested=self.open_entry_from_memory,
+                on_memory_window_changed=self.refresh_dashboard,
+            )
+            self.dashboard_host.layout().addWidget(self.dashboard_page)
+            self.dashboard_page.apply_theme(self.is_dark)
+            self.refresh_dashboard()
+        return self.dashboard_page
 
     @staticmethod
     def _create_tinted_icon(icon_path: Path, tint: QColor) -> Optional[QIcon]:
+        try:
+            stat = icon_path.stat()
+        except OSError:
+            return None
+        source_key = f"{icon_path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+        key = hashlib.sha1(f"{source_key}|{tint.name(QColor.HexArgb)}".encode("utf-8")).hexdigest()
+        cached_path = DATA_ROOT / ICON_CACHE_DIR / f"tinted_{key}.png"
+        if cached_path.exists():
+            cached = QPixmap(str(cached_path))
+            if not cached.isNull():
+                return QIcon(cached)
+
         image = load_qimage(icon_path)
         if image.isNull():
             return None
-        image = image.convertToFormat(QImage.Format_ARGB32)
-
-        hue = tint.hslHueF()
-        saturation = tint.hslSaturationF()
-        for y in range(image.height()):
-            for x in range(image.width()):
-                original = image.pixelColor(x, y)
-                alpha = original.alpha()
-                if alpha == 0:
-                    continue
-                recolored = QColor.fromHslF(hue, saturation, original.lightnessF())
-                recolored.setAlpha(alpha)
-                image.setPixelColor(x, y, recolored)
-
+        image = tint_image(image, tint)
+        # Later launches load the cached PNG instead of recolouring again.
+        temporary = cached_path.with_name(f".{cached_path.name}.{uuid4().hex[:8]}.part")
+        try:
+            cached_path.parent.mkdir(parents=True, exist_ok=True)
+            if image.save(str(temporary), "PNG"):
+                os.replace(temporary, cached_path)
+                # Only one tint is in use; earlier source or colour versions are dead weight.
+                for stale_path in cached_path.parent.glob("tinted_*.png"):
+                    if stale_path != cached_path:
+                        stale_path.unlink(missing_ok=True)
+        except OSError:
+            pass
+        finally:
+            try:
+                temporary.unlink()
+            except OSError:
+                pass
         return QIcon(QPixmap.fromImage(image))
 
     def _apply_window_icon(self) -> None:
@@ -3174,7 +6867,8 @@ class MainWindow(FluentWindow):
         setTheme(Theme.DARK if dark else Theme.LIGHT)
         self._update_navigation_icons()
         self.setStyleSheet(DARK_APP_STYLE if dark else LIGHT_APP_STYLE)
-        self.dashboard_page.apply_theme(dark)
+        if self.dashboard_page is not None:
+            self.dashboard_page.apply_theme(dark)
         self.diary_page.set_theme_state(dark)
         self.refresh_dashboard()
 
@@ -3182,11 +6876,18 @@ class MainWindow(FluentWindow):
         self.apply_theme(not self.is_dark)
 
     def _sync_theme_after_show(self) -> None:
-        self.apply_theme(self.is_dark)
+        # __init__ already ran the full apply_theme pass; only the Fluent theme and the
+        # navigation icons need re-syncing once the native window exists.
+        setTheme(Theme.DARK if self.is_dark else Theme.LIGHT)
+        self._update_navigation_icons()
 
     def refresh_dashboard(self) -> None:
-        memories = self.db.get_on_this_day_memories(date.today())
-        self.dashboard_page.update_content(self.db.total_entries(), memories)
+        if self.dashboard_page is None:
+            return
+        memories = self.db.get_on_this_day_memories(
+            date.today(), self.dashboard_page.memory_window_days
+        )
+        self.dashboard_page.update_content(self.db.get_stats_summary(date.today()), memories)
 
     def open_entry_from_memory(self, entry_id: int) -> None:
         if not self.diary_page.open_entry_by_id(entry_id):
@@ -3234,24 +6935,153 @@ class MainWindow(FluentWindow):
             elif close_action == close_only_result:
                 event.ignore()
                 return
+        self.diary_page.shutdown_background_search()
+        self.diary_page.shutdown_attachment_imports()
+        self.diary_page.shutdown_thumbnails()
+        self.diary_page.shutdown_attachment_catalog()
         self.db.close()
+        self.dump_db_trace()
         super().closeEvent(event)
 
 
+def export_stats_command(argv: Sequence[str]) -> int:
+    db = DiaryDatabase(DATA_ROOT / DB_NAME)
+    try:
+        report = json.dumps(db.export_stats(date.today()), ensure_ascii=False, indent=2)
+    finally:
+        db.close()
+    if argv:
+        Path(argv[0]).write_text(report + "\n", encoding="utf-8")
+    else:
+        print(report)
+    return 0
+
+
+def verify_attachments_command() -> int:
+    db = DiaryDatabase(DATA_ROOT / DB_NAME)
+    try:
+        report = db.verify_attachment_blobs()
+    finally:
+        db.close()
+    for stored_path in report.missing:
+        print(f"missing: {stored_path}")
+    for stored_path in report.corrupted:
+        print(f"hash mismatch: {stored_path}")
+    print(
+        f"checked {report.checked} attachment files; "
+        f"{len(report.missing)} missing, {len(report.corrupted)} corrupted"
+    )
+    return 1 if report.missing or report.corrupted else 0
+
+
+def write_synthetic_png(path: Path, payload_bytes: int) -> None:
+    # A grayscale PNG with an iCCP chunk, so the benchmark exercises the stripping path.
+    def chunk(chunk_type: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + chunk_type
+            + data
+            + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+        )
+
+    width = 4096
+    height = max(1, payload_bytes // (width + 1))
+    row = b"\x00" + os.urandom(width)
+    profile = b"sRGB\x00\x00" + zlib.compress(os.urandom(3144))
+    with path.open("wb") as handle:
+        handle.write(PNG_SIGNATURE)
+        handle.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)))
+        handle.write(chunk(b"iCCP", profile))
+        handle.write(chunk(b"IDAT", zlib.compress(row * height, 0)))
+        handle.write(chunk(b"IEND", b""))
+
+
+def benchmark_png_command(argv: Sequence[str]) -> int:
+    paths = [Path(arg) for arg in argv]
+    temporary_dir: Optional[Path] = None
+    if not paths:
+        temporary_dir = Path(tempfile.mkdtemp(prefix="xfy_png_bench_"))
+        paths = [temporary_dir / "synthetic.png"]
+        write_synthetic_png(paths[0], PNG_BENCHMARK_SYNTHETIC_BYTES)
+
+    def median_ms(load: Callable[[], object]) -> float:
+        samples = []
+        for _ in range(PNG_BENCHMARK_RUNS):
+            started = time.perf_counter()
+            load()
+            samples.append((time.perf_counter() - started) * 1000)
+        return sorted(samples)[len(samples) // 2]
+
+    def cold_load(path: Path) -> Optional[bytes]:
+        SANITIZED_PNG_CACHE.clear()
+        return SANITIZED_PNG_CACHE.load(path)
+
+    try:
+        for path in paths:
+            read_then_strip = median_ms(lambda: strip_problematic_png_profile(path.read_bytes()))
+            mapped = median_ms(lambda: cold_load(path))
+            SANITIZED_PNG_CACHE.load(path)
+            cached = median_ms(lambda: SANITIZED_PNG_CACHE.load(path))
+            stripped = SANITIZED_PNG_CACHE.load(path) is not None
+            print(
+                f"{path.name}: {path.stat().st_size / 1024 / 1024:.1f} MiB, "
+                f"iCCP {'stripped' if stripped else 'absent'}; "
+                f"read+strip {read_then_strip:.2f} ms, mmap {mapped:.2f} ms, cached {cached:.3f} ms"
+            )
+    finally:
+        SANITIZED_PNG_CACHE.clear()
+        if temporary_dir is not None:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+    return 0
+
+
+def run_maintenance_command(argv: Sequence[str]) -> Optional[int]:
+    if argv and DATA_ROOT_SYNC is not None:
+        DATA_ROOT_SYNC.wait()
+    if argv and argv[0] == "--export-stats":
+        return export_stats_command(argv[1:])
+    if argv and argv[0] == "--verify-attachments":
+        return verify_attachments_command()
+    if argv and argv[0] == "--benchmark-png":
+        return benchmark_png_command(argv[1:])
+    commands = {"--compress-html": True, "--decompress-html": False}
+    if not argv or argv[0] not in commands:
+        return None
+
+    db = DiaryDatabase(DATA_ROOT / DB_NAME)
+    try:
+        report = db.rewrite_entry_html(compress=commands[argv[0]])
+    finally:
+        db.close()
+    print(
+        f"rewrote {report.rows_rewritten} entries; "
+        f"database {report.size_before_bytes / 1024:.1f} KiB -> {report.size_after_bytes / 1024:.1f} KiB; "
+        f"entry load {report.load_ms_before:.3f} ms -> {report.load_ms_after:.3f} ms"
+    )
+    return 0
+
+
 def main() -> int:
-    app = QApplication(sys.argv)
-    resolved_ui_font = resolve_ui_font_family()
-    ui_font_families: List[str] = []
-    seen: set[str] = set()
-    for family in ("汉仪中黑", resolved_ui_font, *resolve_ui_font_families()):
-        key = family.casefold()
-        if key in seen:
-            continue
-        seen.add(key)
-        ui_font_families.append(family)
-    setFontFamilies(ui_font_families)
-    app.setFont(QFont(resolved_ui_font, 10))
-    window = MainWindow()
+    command_result = run_maintenance_command(sys.argv[1:])
+    if command_result is not None:
+        return command_result
+
+    with startup_phase("create_application"):
+        app = QApplication(sys.argv)
+    with startup_phase("font_scan"):
+        resolved_ui_font = resolve_ui_font_family()
+        ui_font_families: List[str] = []
+        seen: set[str] = set()
+        for family in ("汉仪中黑", resolved_ui_font, *resolve_ui_font_families()):
+            key = family.casefold()
+            if key in seen:
+                continue
+            seen.add(key)
+            ui_font_families.append(family)
+        setFontFamilies(ui_font_families)
+        app.setFont(QFont(resolved_ui_font, 10))
+    with startup_phase("main_window"):
+        window = MainWindow()
     window.show()
     return app.exec()
 
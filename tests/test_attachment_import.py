@@ -0,0 +1,98 @@
+import hashlib
+import threading
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def emit(self, *args):
+        self.calls.append(args)
+
+
+class Signals:
+    def __init__(self):
+        self.progress = Recorder()
+        self.finished = Recorder()
+        self.failed = Recorder()
+        self.cancelled = Recorder()
+
+
+@pytest.fixture
+def data_root(tmp_path):
+    root = tmp_path / "data"
+    root.mkdir()
+    database = main.DiaryDatabase(root / main.DB_NAME)
+    yield root
+    database.close()
+
+
+def run_import(data_root, claims, source, task_id=1):
+    task = main.AttachmentImportTask(
+        task_id, source, data_root, data_root / main.DB_NAME, threading.Event(), claims
+    )
+    task.signals = Signals()
+    task.run()
+    assert not task.signals.failed.calls
+    [(_, draft)] = task.signals.finished.calls
+    return draft
+
+
+def test_import_copies_and_hashes_in_one_pass(tmp_path, data_root, monkeypatch):
+    payload = bytes(range(256)) * 5000
+    source = tmp_path / "photo.bin"
+    source.write_bytes(payload)
+    opened = []
+    original_open = main.Path.open
+
+    def counting_open(path, *args, **kwargs):
+        if path == source:
+            opened.append(path)
+        return original_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(main.Path, "open", counting_open)
+    claims = main.AttachmentImportClaims()
+    draft = run_import(data_root, claims, source)
+    claims.close()
+
+    digest = hashlib.sha256(payload).hexdigest()
+    assert draft.content_hash == digest
+    assert main.Path(draft.file_path).read_bytes() == payload
+    assert main.Path(draft.file_path) == (data_root / main.content_addressed_path(digest, ".bin")).resolve()
+    assert len(opened) == 1
+    assert not list(data_root.rglob("*.part"))
+
+
+def test_import_of_a_known_blob_drops_the_copy_and_reuses_the_lookup(tmp_path, data_root):
+    payload = b"same bytes" * 1000
+    digest = hashlib.sha256(payload).hexdigest()
+    existing = data_root / main.ATTACHMENTS_DIR / "kept.bin"
+    existing.parent.mkdir(parents=True)
+    existing.write_bytes(payload)
+    db = main.DiaryDatabase(data_root / main.DB_NAME)
+    entry_id = db.save_entry(None, "2024-01-01", "t", "<p>x</p>", "x")
+    db.add_attachment(entry_id, "kept.bin", f"{main.ATTACHMENTS_DIR}/kept.bin", 0, digest)
+    db.close()
+
+    claims = main.AttachmentImportClaims()
+    drafts = []
+    for task_id, name in enumerate(["a.bin", "b.bin"], start=1):
+        source = tmp_path / name
+        source.write_bytes(payload)
+        drafts.append(run_import(data_root, claims, source, task_id))
+        if task_id == 1:
+            lookup_db = claims._lookup_db
+    assert claims._lookup_db is lookup_db
+    claims.close()
+
+    assert [main.Path(draft.file_path) for draft in drafts] == [existing.resolve()] * 2
+    assert sorted(path.name for path in (data_root / main.ATTACHMENTS_DIR).rglob("*") if path.is_file()) == [
+        "kept.bin"
+    ]
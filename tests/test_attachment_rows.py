@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def page(tmp_path):
+    # Just the state cached_attachment_rows touches, without building the widget tree.
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    for index in range(20):
+        entry_id = db.save_entry(None, "2024-08-01", str(index), "<p>x</p>", "x")
+        db.add_attachments(entry_id, [main.AttachmentDraft(f"{index}.txt", f"attachments/{index}.txt", 0)])
+    queries = []
+    list_attachments = db.list_attachments
+
+    def counted_list_attachments(entry_id, order="newest"):
+        queries.append(entry_id)
+        return list_attachments(entry_id, order)
+
+    fake = SimpleNamespace(
+        db=SimpleNamespace(list_attachments=counted_list_attachments),
+        attachment_sort_order="newest",
+        _attachment_row_cache={},
+        data_root=tmp_path,
+        attachments_dir=tmp_path / main.ATTACHMENTS_DIR,
+        queries=queries,
+    )
+    fake.resolve_attachment_path = lambda stored: main.DiaryPage.resolve_attachment_path(fake, stored)
+    fake.cached_attachment_rows = lambda entry_id: main.DiaryPage.cached_attachment_rows(fake, entry_id)
+    fake.invalidate_attachment_rows = lambda ids=None: main.DiaryPage.invalidate_attachment_rows(fake, ids)
+    yield fake
+    db.close()
+
+
+def test_switching_between_entries_reads_each_once(page, tmp_path):
+    for _ in range(3):
+        first = page.cached_attachment_rows(1)
+        page.cached_attachment_rows(2)
+    assert page.queries == [1, 2]
+    [(row, resolved_path, tooltip)] = first
+    assert row["file_name"] == "0.txt"
+    assert resolved_path == str((tmp_path / main.ATTACHMENTS_DIR / "0.txt").resolve())
+    assert tooltip
+
+
+def test_sort_order_and_invalidation_are_per_entry(page):
+    page.cached_attachment_rows(1)
+    page.cached_attachment_rows(2)
+    page.attachment_sort_order = "name"
+    page.cached_attachment_rows(1)
+    assert page.queries == [1, 2, 1]
+
+    page.invalidate_attachment_rows([1])
+    page.attachment_sort_order = "newest"
+    page.cached_attachment_rows(1)
+    page.cached_attachment_rows(2)
+    assert page.queries == [1, 2, 1, 1]
+
+    page.invalidate_attachment_rows()
+    page.cached_attachment_rows(2)
+    assert page.queries[-1] == 2 and len(page.queries) == 5
+
+
+def test_cache_keeps_only_the_most_recent_entries(page):
+    limit = main.ATTACHMENT_ROW_CACHE_ENTRIES
+    for entry_id in range(1, limit + 2):
+        page.cached_attachment_rows(entry_id)
+    assert len(page._attachment_row_cache) == limit
+    # Entry 1 was the least recently used and was dropped; entry 2 is still cached.
+    page.cached_attachment_rows(2)
+    page.cached_attachment_rows(1)
+    assert page.queries[limit + 1 :] == [1]
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    yield database
+    database.close()
+
+
+def draft(name):
+    return main.AttachmentDraft(name, f"attachments/{name}", 0, name * 64)
+
+
+def blob_refs(db):
+    return {
+        str(row["sha256"])[0]: int(row["ref_count"])
+        for row in db.conn.execute("SELECT sha256, ref_count FROM attachment_blobs")
+    }
+
+
+def test_bulk_delete_keeps_blob_ref_counts(db):
+    first, second, third = (
+        db.save_entry(None, f"2024-05-0{day}", f"e{day}", "<p>x</p>", "x") for day in (1, 2, 3)
+    )
+    db.add_attachments(first, [draft("a"), draft("b")])
+    db.add_attachments(second, [draft("a"), draft("a"), draft("c")])
+    db.add_attachments(third, [draft("a"), draft("c")])
+    assert blob_refs(db) == {"a": 4, "b": 1, "c": 2}
+
+    deletion = db.delete_entries([first, second, 999])
+
+    assert sorted(deletion.deleted_entry_ids) == sorted([first, second])
+    assert sorted(deletion.attachment_paths) == ["attachments/a", "attachments/b", "attachments/c"]
+    assert deletion.unreferenced_paths == ["attachments/b"]
+    assert blob_refs(db) == {"a": 1, "c": 1}
+    assert db.conn.execute("SELECT COUNT(*) FROM attachments").fetchone()[0] == 2
+    assert db.conn.execute("SELECT COUNT(*) FROM entry_bodies").fetchone()[0] == 1
+
+
+def test_bulk_delete_of_everything_leaves_no_blobs(db):
+    ids = [db.save_entry(None, "2024-05-01", str(index), "<p>x</p>", "x") for index in range(5)]
+    for entry_id in ids:
+        db.add_attachments(entry_id, [draft("a")])
+
+    deletion = db.delete_entries(ids)
+
+    assert deletion.unreferenced_paths == ["attachments/a"]
+    assert blob_refs(db) == {}
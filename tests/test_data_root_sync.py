@@ -0,0 +1,118 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def sync(tmp_path):
+    source = tmp_path / "legacy" / "attachments"
+    for index in range(30):
+        folder = source / f"{index % 3:02d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"file{index}.bin").write_bytes(bytes([index]) * (index + 1))
+    data_root = tmp_path / "data"
+    data_root.mkdir()
+    return main.DataRootSync(source, data_root / "attachments", data_root)
+
+
+def copied_files(root):
+    return {path.relative_to(root).as_posix(): path.read_bytes() for path in root.rglob("*") if path.is_file()}
+
+
+def test_interrupted_sync_resumes_from_the_journal(sync):
+    files = sync._build_manifest()
+    # Simulate a run that stopped after a third of the files.
+    done = sorted(files)[:10]
+    with sync.journal_path.open("w", encoding="utf-8") as journal:
+        for relative in done:
+            assert sync._copy_file((relative, files[relative])) == relative
+            journal.write(relative + "\n")
+    first_copied = {relative: (sync.target_dir / relative).stat().st_mtime_ns for relative in done}
+
+    sync.start()
+    assert sync.wait(10)
+    assert sync.done_path.exists()
+    assert copied_files(sync.target_dir) == copied_files(sync.source_dir)
+    assert {relative: (sync.target_dir / relative).stat().st_mtime_ns for relative in done} == first_copied
+    assert not list(sync.target_dir.rglob("*.part"))
+
+
+def test_finished_sync_only_checks_the_done_marker(sync):
+    sync.start()
+    assert sync.wait(10)
+    (sync.source_dir / "00" / "late.bin").write_bytes(b"late")
+
+    again = main.DataRootSync(sync.source_dir, sync.target_dir, sync.data_root)
+    again.start()
+    assert again.is_finished()
+    assert not (sync.target_dir / "00" / "late.bin").exists()
+
+
+def test_sources_removed_after_the_manifest_do_not_block_completion(sync):
+    files = sync._build_manifest()
+    removed = sorted(files)[0]
+    (sync.source_dir / removed).unlink()
+
+    sync.start()
+    assert sync.wait(10)
+    assert sync.done_path.exists()
+    assert not (sync.target_dir / removed).exists()
+    assert len(copied_files(sync.target_dir)) == len(files) - 1
+
+
+def test_existing_data_root_files_are_never_overwritten(sync):
+    kept = sync.target_dir / "01" / "file1.bin"
+    kept.parent.mkdir(parents=True)
+    kept.write_bytes(b"edited in the data root")
+
+    sync.start()
+    assert sync.wait(10)
+    assert kept.read_bytes() == b"edited in the data root"
+
+
+def test_migrations_read_uncopied_files_from_the_legacy_root(sync, monkeypatch):
+    # Opening an old database must not wait for the sync; here the sync has not even started.
+    monkeypatch.setattr(main, "DATA_ROOT_SYNC", sync)
+    conn = main.sqlite3.connect(sync.data_root / main.DB_NAME)
+    conn.executescript(
+        """
+        CREATE TABLE entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_date TEXT NOT NULL,
+            title TEXT NOT NULL,
+            content_html TEXT NOT NULL,
+            content_text TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        CREATE TABLE attachments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_id INTEGER NOT NULL,
+            file_name TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            is_image INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        );
+        INSERT INTO entries VALUES (1, '2024-01-01', 't', '<p>x</p>', 'x', '2024-01-01T00:00:00');
+        INSERT INTO attachments VALUES (1, 1, 'file4.bin', 'attachments/01/file4.bin', 0, '2024-01-01T00:00:00');
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    db = main.DiaryDatabase(sync.data_root / main.DB_NAME)
+    try:
+        row = db.conn.execute("SELECT file_path, content_hash FROM attachments").fetchone()
+        assert row["content_hash"] == main.hash_file(sync.source_dir / "01" / "file4.bin")
+        assert (sync.data_root / row["file_path"]).read_bytes() == bytes([4]) * 5
+    finally:
+        db.close()
+
+    sync.start()
+    assert sync.wait(10)
+    assert sync.done_path.exists()
+    # The migrated file already lives in the blob store, so the old name is not copied again.
+    assert not (sync.target_dir / "01" / "file4.bin").exists()
+    assert (sync.target_dir / "01" / "file7.bin").exists()
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    for index in range(30):
+        database.save_entry(None, f"2024-02-{index % 28 + 1:02d}", f"t{index}", "<p>long</p>" * 50, "long " * 50)
+    yield database
+    database.close()
+
+
+def list_query_plans(db, call):
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        db.conn.set_trace_callback(None)
+    [sql] = [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+    return [str(row[-1]) for row in db.conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def test_entries_rows_hold_no_bodies(db):
+    assert db._table_columns("entries") >= {"id", "entry_date", "title", "updated_at"}
+    assert not db._table_columns("entries") & {"content_html", "content_text"}
+    entry = db.get_entry(1)
+    assert entry["content_text"] == "long " * 50
+    assert db.conn.execute("SELECT COUNT(*) FROM entry_bodies").fetchone()[0] == 30
+
+
+@pytest.mark.parametrize("with_cursor", [False, True])
+def test_list_pages_read_only_the_covering_index(db, with_cursor):
+    cursor = db.list_entries_page("", limit=10)[1] if with_cursor else None
+    plan = list_query_plans(db, lambda: db.list_entries_page("", cursor, limit=10))
+    assert any("COVERING INDEX idx_entries_list_covering" in detail for detail in plan), plan
+    assert not any("TEMP B-TREE" in detail for detail in plan), plan
+
+
+def test_deleting_an_entry_removes_its_body(db):
+    db.delete_entries([1, 2])
+    assert db.get_entry(1) is None
+    assert db.conn.execute("SELECT COUNT(*) FROM entry_bodies").fetchone()[0] == 28
@@ -0,0 +1,87 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    yield database
+    database.close()
+
+
+def add_entries(db, count):
+    return [
+        db.save_entry(None, f"2024-01-{index % 28 + 1:02d}", f"entry {index}", "<p>x</p>", f"body {index}")
+        for index in range(count)
+    ]
+
+
+def expected_ids(db, search_text=""):
+    return [int(row["id"]) for row in db.list_entries(search_text)]
+
+
+def all_pages(db, search_text="", limit=7):
+    ids, cursor = [], None
+    while True:
+        rows, cursor = db.list_entries_page(search_text, cursor, limit=limit)
+        ids.extend(int(row["id"]) for row in rows)
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("count", [0, 1, 6, 7, 8, 14, 15])
+def test_keyset_pages_cover_every_entry_once_at_page_boundaries(db, count):
+    add_entries(db, count)
+    assert all_pages(db) == expected_ids(db)
+
+
+def test_keyset_pages_keep_ties_on_the_same_date_in_order(db):
+    for index in range(20):
+        db.save_entry(None, "2024-02-02", f"same day {index}", "<p>x</p>", "x")
+    db.conn.execute("UPDATE entries SET updated_at = '2024-02-02T08:00:00'")
+    assert all_pages(db, limit=3) == expected_ids(db)
+    assert all_pages(db, "same", limit=3) == expected_ids(db, "same")
+
+
+def test_saved_entry_moves_in_place_without_fetching_more_pages(db, monkeypatch):
+    ids = add_entries(db, 12)
+    list_page = db.list_entries_page
+    monkeypatch.setattr(
+        db, "list_entries_page", lambda text="", cursor=None: list_page(text, cursor, limit=5)
+    )
+    model = main.EntryListModel(db)
+    model.reset("")
+    loaded = [model.entry_id_at(row) for row in range(len(model._rows))]
+    assert len(loaded) == 5
+
+    fetches = []
+    monkeypatch.setattr(model, "fetchMore", lambda *args: fetches.append(args))
+
+    # Moving a loaded entry to the newest date puts it first.
+    moved = loaded[3]
+    db.save_entry(moved, "2030-01-01", "moved", "<p>x</p>", "x")
+    model.refresh_entry(moved)
+    assert model.entry_id_at(0) == moved
+    assert len(model._rows) == 5
+
+    # An entry moved past the loaded window leaves it and comes back with the next page.
+    db.save_entry(moved, "1999-01-01", "moved back", "<p>x</p>", "x")
+    model.refresh_entry(moved)
+    assert moved not in [model.entry_id_at(row) for row in range(len(model._rows))]
+
+    # A new entry inside the window is inserted where a full reload would put it.
+    new_id = db.save_entry(None, "2024-01-28", "new", "<p>x</p>", "x")
+    model.refresh_entry(new_id)
+    assert fetches == []
+
+    # The loaded window is exactly what a fresh reload would show, and the next keyset
+    # page picks up where it ends.
+    loaded = [model.entry_id_at(row) for row in range(len(model._rows))]
+    remaining, _cursor = list_page("", model._cursor)
+    assert loaded + [int(row["id"]) for row in remaining] == expected_ids(db)
+    assert new_id in loaded
+    assert sorted(expected_ids(db)) == sorted(ids + [new_id])
@@ -0,0 +1,135 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    yield database
+    database.close()
+
+
+def recomputed_stats(db):
+    # What entry_stats and writing_streaks should hold, computed from the base tables.
+    rows = db.conn.execute(
+        """
+        SELECT
+            e.entry_date,
+            length(COALESCE(b.content_text, '')) AS chars,
+            (SELECT COUNT(*) FROM attachments AS a WHERE a.entry_id = e.id) AS attachments
+        FROM entries AS e
+        LEFT JOIN entry_bodies AS b ON b.entry_id = e.id
+        """
+    ).fetchall()
+    stats = {}
+    for row in rows:
+        entry_date = row["entry_date"]
+        for key in (("total", ""), ("year", entry_date[:4]), ("month", entry_date[:7]), ("day", entry_date)):
+            counts = stats.setdefault(key, [0, 0, 0])
+            counts[0] += 1
+            counts[1] += row["chars"]
+            counts[2] += row["attachments"]
+    runs = []
+    for day in sorted({date.fromisoformat(row["entry_date"]).toordinal() for row in rows}):
+        if runs and runs[-1][1] == day - 1:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    # julianday() of a date is its proleptic ordinal plus this offset.
+    return stats, sorted((start + 1721424, end + 1721424) for start, end in runs)
+
+
+def stored_stats(db):
+    stats = {
+        (row["kind"], row["period"]): [row["entry_count"], row["char_count"], row["attachment_count"]]
+        for row in db.conn.execute(
+            """
+            SELECT * FROM entry_stats
+            WHERE entry_count != 0 OR char_count != 0 OR attachment_count != 0
+            """
+        )
+    }
+    streaks = db.conn.execute("SELECT start_day, end_day, length FROM writing_streaks").fetchall()
+    assert all(row["length"] == row["end_day"] - row["start_day"] + 1 for row in streaks)
+    return stats, sorted((row["start_day"], row["end_day"]) for row in streaks)
+
+
+def test_triggers_match_recomputed_stats_through_random_edits(db):
+    rng = random.Random(20240101)
+    first_day = date(2024, 1, 1)
+    entry_ids = []
+    for step in range(400):
+        action = rng.random()
+        entry_date = (first_day + timedelta(days=rng.randint(0, 45))).isoformat()
+        if action < 0.45 or not entry_ids:
+            with db.transaction():
+                entry_id = db.save_entry(None, entry_date, "t", "<p>x</p>", "字" * rng.randint(0, 30))
+                db.add_attachments(
+                    entry_id,
+                    [
+                        main.AttachmentDraft("a.txt", f"attachments/{rng.randint(0, 5)}.txt", 0)
+                        for _ in range(rng.randint(0, 2))
+                    ],
+                )
+            entry_ids.append(entry_id)
+        elif action < 0.7:
+            entry_id = rng.choice(entry_ids)
+            db.save_entry(entry_id, entry_date, "t", "<p>y</p>", "y" * rng.randint(0, 20))
+        elif action < 0.8:
+            attachments = db.list_attachments(rng.choice(entry_ids))
+            if attachments:
+                db.delete_attachment(int(attachments[0]["id"]))
+        else:
+            doomed = rng.sample(entry_ids, min(len(entry_ids), rng.randint(1, 3)))
+            db.delete_entries(doomed)
+            entry_ids = [entry_id for entry_id in entry_ids if entry_id not in doomed]
+        if step % 25 == 0:
+            assert stored_stats(db) == recomputed_stats(db), step
+    assert stored_stats(db) == recomputed_stats(db)
+
+
+def test_streaks_split_and_merge_when_days_change(db):
+    ids = {
+        day: db.save_entry(None, f"2024-05-{day:02d}", "t", "<p>x</p>", "x")
+        for day in (1, 2, 3, 5, 6)
+    }
+    assert db.writing_streaks(date(2024, 5, 6)) == (2, 3)
+
+    db.save_entry(None, "2024-05-04", "t", "<p>x</p>", "x")
+    assert db.writing_streaks(date(2024, 5, 6)) == (6, 6)
+
+    db.delete_entries([ids[2]])
+    assert db.writing_streaks(date(2024, 5, 6)) == (4, 4)
+    assert db.writing_streaks(date(2024, 5, 8)) == (0, 4)
+
+    summary = db.get_stats_summary(date(2024, 5, 6))
+    assert summary.total_entries == 5
+    assert summary.month_entries == 5
+    assert summary.day_entries["2024-05-04"] == 1
+    assert "2024-05-02" not in summary.day_entries
+
+
+def test_storage_usage_counts_each_deduplicated_blob_once(db):
+    first = db.save_entry(None, "2024-01-01", "a", "<p>a</p>", "a")
+    second = db.save_entry(None, "2024-01-02", "b", "<p>b</p>", "b")
+    photo = main.AttachmentDraft("p.jpg", "attachments/ab/photo.jpg", 1, "ab" * 32)
+    note = main.AttachmentDraft("n.txt", "attachments/legacy.txt", 0)
+    db.add_attachments(first, [photo, note])
+    db.add_attachments(second, [photo, photo])
+    catalog = [
+        (int(row["id"]), main.AttachmentMetadata(1000, 0.0, "image/jpeg"))
+        for entry_id in (first, second)
+        for row in db.list_attachments(entry_id)
+        if row["file_name"] == "p.jpg"
+    ]
+    db.update_attachment_catalog(catalog)
+
+    usage = {row["category"]: (row["file_count"], row["byte_size"]) for row in db.attachment_storage_usage()}
+    assert usage == {"image": (1, 1000), "unknown": (1, 0)}
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def fonts(tmp_path, monkeypatch):
+    font_dir = tmp_path / "fonts"
+    font_dir.mkdir()
+    resolutions = []
+
+    def resolve():
+        resolutions.append(len(resolutions))
+        return main.FontResolution(ui_families=[f"Family {len(resolutions)}", "Segoe UI"], editor_family="Editor")
+
+    monkeypatch.setattr(main, "DATA_ROOT", tmp_path)
+    monkeypatch.setattr(main, "QT_VERSION_STR", "5.15.2")
+    monkeypatch.setattr(main, "font_directories", lambda: [font_dir])
+    monkeypatch.setattr(main, "_resolve_fonts_from_database", resolve)
+    monkeypatch.setattr(main, "_font_resolution", None)
+    return font_dir, resolutions
+
+
+def new_process(monkeypatch):
+    monkeypatch.setattr(main, "_font_resolution", None)
+    return main.get_font_resolution()
+
+
+def test_cache_is_reused_until_the_font_set_changes(fonts, monkeypatch):
+    font_dir, resolutions = fonts
+    first = main.get_font_resolution()
+    assert main.get_font_resolution() is first
+    assert (main.DATA_ROOT / main.FONT_CACHE_NAME).exists()
+
+    assert new_process(monkeypatch) == first
+    assert len(resolutions) == 1
+
+    # Installing a font touches its directory.
+    (font_dir / "new-font").mkdir()
+    os.utime(font_dir, ns=(0, font_dir.stat().st_mtime_ns + 1_000_000_000))
+    assert new_process(monkeypatch).ui_families == ["Family 2", "Segoe UI"]
+    assert new_process(monkeypatch).ui_families == ["Family 2", "Segoe UI"]
+    assert len(resolutions) == 2
+
+    # So does touching a font in a subdirectory.
+    os.utime(font_dir / "new-font", ns=(0, 1))
+    new_process(monkeypatch)
+    assert len(resolutions) == 3
+
+
+def test_qt_upgrade_and_damaged_cache_resolve_again(fonts, monkeypatch):
+    _font_dir, resolutions = fonts
+    main.get_font_resolution()
+    monkeypatch.setattr(main, "QT_VERSION_STR", "5.15.11")
+    new_process(monkeypatch)
+    assert len(resolutions) == 2
+
+    (main.DATA_ROOT / main.FONT_CACHE_NAME).write_text("{not json", encoding="utf-8")
+    assert new_process(monkeypatch).editor_family == "Editor"
+    assert len(resolutions) == 3
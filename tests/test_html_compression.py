@@ -0,0 +1,51 @@
+import zlib
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+QT_HTML = (
+    '<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.0//EN" "http://www.w3.org/TR/REC-html40/strict.dtd">\n'
+    '<html><head><meta name="qrichtext" content="1" /><style type="text/css">\n'
+    "p, li { white-space: pre-wrap; }\n"
+    "</style></head><body style=\" font-family:'Microsoft YaHei UI'; font-size:10pt;\">\n"
+    '<p style=" margin-top:0px; margin-bottom:0px; margin-left:0px; margin-right:0px; '
+    '-qt-block-indent:0; text-indent:0px;">今天去公园看花 🌸 &amp; 写日记</p></body></html>'
+)
+
+
+@pytest.mark.parametrize("html", [QT_HTML, "<p>x</p>", "纯文本 with ascii", ""])
+def test_round_trip(html):
+    stored = main.encode_entry_html(html)
+    if html:
+        assert isinstance(stored, bytes) and stored.startswith(main.COMPRESSED_HTML_HEADER)
+    assert main.decode_entry_html(stored) == html
+
+
+def test_dictionary_shrinks_qt_boilerplate():
+    with_dictionary = main.encode_entry_html(QT_HTML)
+    without_dictionary = zlib.compress(QT_HTML.encode("utf-8"), 6)
+    assert len(with_dictionary) < len(without_dictionary)
+    # The stream cannot be inflated without the same dictionary.
+    with pytest.raises(zlib.error):
+        zlib.decompress(with_dictionary[len(main.COMPRESSED_HTML_HEADER) :])
+
+
+def test_plain_and_compressed_rows_coexist(tmp_path):
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    try:
+        db.compress_html = False
+        plain_id = db.save_entry(None, "2024-01-01", "plain", QT_HTML, "plain")
+        db.compress_html = True
+        compressed_id = db.save_entry(None, "2024-01-02", "zip", QT_HTML, "zip")
+        stored = dict(db.conn.execute("SELECT entry_id, content_html FROM entry_bodies").fetchall())
+        assert isinstance(stored[plain_id], str)
+        assert isinstance(stored[compressed_id], bytes)
+        assert db.get_entry(plain_id)["content_html"] == QT_HTML
+        assert db.get_entry(compressed_id)["content_html"] == QT_HTML
+        assert main.decode_entry_html(None) == ""
+    finally:
+        db.close()
@@ -0,0 +1,39 @@
+from array import array
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+# Shade n encodes its own lightness so the mapping can be read back from the result.
+SHADES = list(range(511))
+
+
+def test_lightness_picks_the_shade_and_alpha_is_kept():
+    pixels = [
+        0xFF000000,  # opaque black: lightness 0
+        0x80FFFFFF,  # half-transparent white: lightness 510
+        0xFF102030,  # max 0x30 + min 0x10
+        0xFF301020,  # same channels in another order
+    ]
+    assert list(main.recolor_argb_pixels(pixels, SHADES)) == [
+        0xFF000000,
+        0x80000000 | 510,
+        0xFF000000 | 0x40,
+        0xFF000000 | 0x40,
+    ]
+
+
+def test_transparent_pixels_are_untouched():
+    pixels = [0x00FFFFFF, 0x00123456, 0x01123456]
+    assert list(main.recolor_argb_pixels(pixels, SHADES)) == [0x00FFFFFF, 0x00123456, 0x01000000 | 0x68]
+
+
+def test_repeated_colours_map_the_same_way():
+    pixels = array("I", [0xFF336699, 0xFF000000] * 1000)
+    result = main.recolor_argb_pixels(memoryview(pixels.tobytes()).cast("I"), SHADES)
+    assert isinstance(result, array) and result.typecode == "I"
+    assert len(result) == len(pixels)
+    assert set(result) == {0xFF000000 | (0x99 + 0x33), 0xFF000000}
@@ -0,0 +1,155 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+def create_legacy_database(data_root):
+    # The schema every release before user_version migrations shipped with.
+    conn = sqlite3.connect(data_root / main.DB_NAME)
+    conn.executescript(
+        """
+        CREATE TABLE entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_date TEXT NOT NULL,
+            title TEXT NOT NULL,
+            content_html TEXT NOT NULL,
+            content_text TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        CREATE TABLE attachments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entry_id INTEGER NOT NULL,
+            file_name TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            is_image INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(entry_id) REFERENCES entries(id) ON DELETE CASCADE
+        );
+        CREATE TABLE app_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        """
+    )
+    conn.executemany(
+        "INSERT INTO entries(entry_date, title, content_html, content_text, updated_at) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2024-03-01", "春游", "<p>去公园看花</p>", "去公园看花", "2024-03-01T20:00:00"),
+            ("2024-03-02", "读书", "<p>读完一本小说</p>", "读完一本小说", "2024-03-02T21:00:00"),
+        ],
+    )
+    attachments_dir = data_root / main.ATTACHMENTS_DIR
+    attachments_dir.mkdir()
+    (attachments_dir / "a.txt").write_bytes(b"same bytes")
+    (attachments_dir / "b.txt").write_bytes(b"same bytes")
+    (attachments_dir / "c.txt").write_bytes(b"other bytes")
+    conn.executemany(
+        "INSERT INTO attachments(entry_id, file_name, file_path, is_image, created_at) VALUES (?, ?, ?, 0, ?)",
+        [
+            (1, "a.txt", str(attachments_dir / "a.txt"), "2024-03-01T20:00:00"),
+            (2, "b.txt", "b.txt", "2024-03-02T21:00:00"),
+            (2, "c.txt", "attachments/c.txt", "2024-03-02T21:00:00"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_database_migrates_to_latest_version(tmp_path):
+    create_legacy_database(tmp_path)
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    try:
+        latest = max(version for version, _migrate in db._schema_migrations())
+        assert db.schema_version == latest
+
+        entry = db.get_entry(1)
+        assert entry["title"] == "春游"
+        assert entry["content_html"] == "<p>去公园看花</p>"
+        assert entry["content_text"] == "去公园看花"
+
+        rows, _cursor = db.list_entries_page("一本小说")
+        assert [int(row["id"]) for row in rows] == [2]
+
+        summary = db.get_stats_summary(main.date(2024, 3, 2))
+        assert summary.total_entries == 2
+        assert summary.total_attachments == 3
+        assert summary.current_streak == 2
+
+        attachments = {
+            str(row["file_name"]): row
+            for row in db.conn.execute("SELECT file_name, file_path, content_hash FROM attachments")
+        }
+        assert attachments["a.txt"]["content_hash"] == attachments["b.txt"]["content_hash"]
+        assert attachments["a.txt"]["file_path"] == attachments["b.txt"]["file_path"]
+        assert attachments["c.txt"]["content_hash"] != attachments["a.txt"]["content_hash"]
+        for row in attachments.values():
+            assert (tmp_path / row["file_path"]).read_bytes() in (b"same bytes", b"other bytes")
+
+        blobs = {
+            str(row["sha256"]): int(row["ref_count"])
+            for row in db.conn.execute("SELECT sha256, ref_count FROM attachment_blobs")
+        }
+        assert blobs == {
+            attachments["a.txt"]["content_hash"]: 2,
+            attachments["c.txt"]["content_hash"]: 1,
+        }
+    finally:
+        db.close()
+
+
+def test_migrated_database_reopens_without_changes(tmp_path):
+    create_legacy_database(tmp_path)
+    main.DiaryDatabase(tmp_path / main.DB_NAME).close()
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    try:
+        assert db.schema_version == max(version for version, _migrate in db._schema_migrations())
+        assert db.conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        assert db.conn.execute("SELECT COUNT(*) FROM entry_bodies").fetchone()[0] == 2
+    finally:
+        db.close()
+
+
+def test_reopening_a_current_database_runs_no_schema_changes(tmp_path, monkeypatch):
+    main.DiaryDatabase(tmp_path / main.DB_NAME).close()
+    statements = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(main.sqlite3, "connect", traced_connect)
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    try:
+        assert db.entry_date_columns_enabled and db.full_text_search_enabled
+    finally:
+        db.close()
+    ddl = [sql for sql in statements if sql.lstrip().upper().startswith(("CREATE", "ALTER", "DROP", "INSERT"))]
+    assert ddl == []
+
+
+def test_unsupported_optional_schema_is_skipped_but_versioned(tmp_path, monkeypatch):
+    def migrate_without_fts5(self):
+        self._apply_optional_schema(
+            [
+                "CREATE TABLE partial_fts_marker (id INTEGER)",
+                "CREATE VIRTUAL TABLE entries_fts USING no_such_module(title)",
+            ]
+        )
+
+    monkeypatch.setattr(main.DiaryDatabase, "_migrate_search_index", migrate_without_fts5)
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    try:
+        assert db.schema_version == max(version for version, _migrate in db._schema_migrations())
+        assert not db.full_text_search_enabled
+        assert not db._has_table("partial_fts_marker")
+        db.save_entry(None, "2024-01-01", "标题", "<p>内容很长</p>", "内容很长")
+        assert [int(row["id"]) for row in db.list_entries("内容很")] == [1]
+    finally:
+        db.close()
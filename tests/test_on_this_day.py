@@ -0,0 +1,58 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+DATES = [
+    "2022-12-29",
+    "2022-12-30",
+    "2023-01-02",
+    "2023-12-30",
+    "2024-01-02",
+    "2024-01-05",
+    "2024-01-06",
+    "2024-12-30",
+    "2025-01-01",
+    "2025-01-02",
+    "2020-02-29",
+    "2023-02-28",
+]
+
+
+@pytest.fixture(params=[True, False], ids=["generated-columns", "strftime"])
+def db(request, tmp_path):
+    database = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    for entry_date in DATES:
+        database.save_entry(None, entry_date, entry_date, "<p>x</p>", "x")
+    assert database.entry_date_columns_enabled
+    database.entry_date_columns_enabled = request.param
+    yield database
+    database.close()
+
+
+def memory_dates(db, today, window_days):
+    return [str(row["entry_date"]) for row in db.get_on_this_day_memories(today, window_days)]
+
+
+def test_same_day_takes_only_earlier_years(db):
+    assert memory_dates(db, date(2025, 1, 2), 0) == ["2024-01-02", "2023-01-02"]
+
+
+def test_window_across_new_year_leaves_out_recent_days(db):
+    # Dec 30 and Jan 1 are inside the ±3 day window but only days ago, not memories.
+    assert memory_dates(db, date(2025, 1, 2), 3) == [
+        "2024-01-05",
+        "2024-01-02",
+        "2023-12-30",
+        "2023-01-02",
+        "2022-12-30",
+    ]
+
+
+def test_leap_day(db):
+    assert memory_dates(db, date(2024, 2, 29), 0) == ["2020-02-29"]
+    assert memory_dates(db, date(2025, 2, 28), 0) == ["2023-02-28"]
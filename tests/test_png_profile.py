@@ -0,0 +1,58 @@
+import struct
+import zlib
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(chunk_type + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+HEADER = png_chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0))
+PROFILE = png_chunk(b"iCCP", b"icc\x00\x00" + zlib.compress(b"profile"))
+PIXELS = png_chunk(b"IDAT", zlib.compress(b"\x00\x7f"))
+END = png_chunk(b"IEND", b"")
+
+
+def test_iccp_chunks_are_removed_and_everything_else_kept():
+    original = main.PNG_SIGNATURE + HEADER + PROFILE + PIXELS + PROFILE + END
+    assert main.strip_problematic_png_profile(original) == main.PNG_SIGNATURE + HEADER + PIXELS + END
+
+
+def test_clean_and_foreign_data_are_left_alone():
+    clean = main.PNG_SIGNATURE + HEADER + PIXELS + END
+    assert main.png_spans_without_profile(clean) is None
+    assert main.strip_problematic_png_profile(clean) is clean
+    assert main.png_spans_without_profile(b"GIF89a" + PROFILE) is None
+    # A chunk that claims to run past the end of the file is not trusted.
+    truncated = main.PNG_SIGNATURE + HEADER + PROFILE[:-6]
+    assert main.strip_problematic_png_profile(truncated) is truncated
+
+
+def test_mapped_read_matches_in_memory_strip(tmp_path):
+    path = tmp_path / "profiled.png"
+    path.write_bytes(main.PNG_SIGNATURE + HEADER + PROFILE + PIXELS + END)
+    assert main.read_sanitized_png(path) == main.strip_problematic_png_profile(path.read_bytes())
+
+    clean = tmp_path / "clean.png"
+    clean.write_bytes(main.PNG_SIGNATURE + HEADER + PIXELS + END)
+    assert main.read_sanitized_png(clean) is None
+    empty = tmp_path / "empty.png"
+    empty.write_bytes(b"")
+    assert main.read_sanitized_png(empty) is None
+
+
+def test_cache_is_keyed_by_file_state(tmp_path):
+    cache = main.SanitizedPngCache()
+    path = tmp_path / "image.png"
+    path.write_bytes(main.PNG_SIGNATURE + HEADER + PROFILE + PIXELS + END)
+    assert cache.load(path) == main.PNG_SIGNATURE + HEADER + PIXELS + END
+
+    path.write_bytes(main.PNG_SIGNATURE + HEADER + PIXELS + PIXELS + END)
+    assert cache.load(path) is None
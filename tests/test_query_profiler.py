@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def traced_db(tmp_path, monkeypatch):
+    profiler = main.QueryProfiler()
+    monkeypatch.setattr(main, "QUERY_PROFILER", profiler)
+    database = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    yield database, profiler
+    database.close()
+
+
+def test_methods_and_statements_are_timed_with_row_counts(traced_db):
+    db, profiler = traced_db
+    for index in range(3):
+        db.save_entry(None, f"2024-07-0{index + 1}", f"t{index}", "<p>x</p>", "x")
+    rows, _cursor = db.list_entries_page("")
+    assert len(rows) == 3
+
+    assert profiler.methods["save_entry"].calls == 3
+    assert profiler.methods["list_entries_page"].calls == 1
+    assert profiler.methods["list_entries_page"].rows == 3
+    assert "transaction" not in profiler.methods and "_commit" not in profiler.methods
+    page_statements = [
+        stats for sql, stats in profiler.statements.items() if "LIMIT ?" in sql and "FROM entries" in sql
+    ]
+    assert [stats.rows for stats in page_statements] == [3]
+
+
+def test_full_scans_are_flagged_once_per_statement(traced_db):
+    db, profiler = traced_db
+    for _ in range(2):
+        db.conn.execute("SELECT value FROM app_meta WHERE value = ?", ("x",)).fetchall()
+    stats = profiler.statements["SELECT value FROM app_meta WHERE value = ?"]
+    assert stats.calls == 2
+    assert [detail.split()[:2] for detail in stats.full_scans] == [["SCAN", "app_meta"]]
+
+    report = profiler.report()
+    assert "DiaryDatabase methods" in report and "SQL statements" in report
+    assert "! full scan: SCAN app_meta" in report
+
+
+def test_percentiles_and_result_counts():
+    stats = main.QueryStats()
+    for elapsed in [5.0, 1.0, 3.0, 2.0, 4.0]:
+        stats.record(elapsed, 1)
+    assert (stats.calls, stats.rows, stats.max_ms) == (5, 5, 5.0)
+    assert stats.percentile(0.5) == 3.0
+    assert stats.percentile(0.95) == 5.0
+    assert main.count_result_rows(([1, 2], None)) == 2
+    assert main.count_result_rows(True) == 0
+    assert main.count_result_rows(None) == 0
@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+ENTRIES = [
+    ("2024-03-01", "春游", "去公园看花，樱花开得正好"),
+    ("2024-03-02", "读书", "读完一本小说，结局很意外"),
+    ("2024-03-02", "晚饭", "和朋友吃火锅，聊起那本小说"),
+    ("2024-04-10", "Weekly Review", "Finished the SQLite migration; FTS works"),
+    ("2024-04-11", "引号", 'He said "hello world" twice'),
+    ("2023-12-31", "跨年", "一年结束了，写个总结"),
+]
+
+QUERIES = ["小说", "本小说", "樱花开", "sqlite", "FTS works", '"hello', "2024-03", "03-02", "总结", "不存在的词"]
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    for entry_date, title, text in ENTRIES:
+        database.save_entry(None, entry_date, title, f"<p>{text}</p>", text)
+    yield database
+    database.close()
+
+
+def matched_ids(db, query, full_text):
+    db.full_text_search_enabled = full_text
+    try:
+        return {int(row["id"]) for row in db.list_entries(query)}
+    finally:
+        db.full_text_search_enabled = True
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_full_text_search_matches_like_search(db, query):
+    assert db.full_text_search_enabled
+    assert matched_ids(db, query, full_text=True) == matched_ids(db, query, full_text=False)
+
+
+def test_short_queries_fall_back_to_like(db):
+    query = "小说"
+    assert len(query) < main.FULL_TEXT_MIN_QUERY_LENGTH
+    assert not db.is_ranked_search(query)
+    rows = db.list_entries(query)
+    assert {int(row["id"]) for row in rows} == {2, 3}
+    assert all(row["snippet"] is None for row in rows)
+    assert db.is_ranked_search("本小说")
+    assert [row["snippet"] is not None for row in db.list_entries("本小说")] == [True, True]
+
+
+def test_index_follows_title_body_and_delete_changes(db):
+    db.save_entry(2, "2024-03-02", "读书笔记", "<p>换了一本散文</p>", "换了一本散文")
+    db.delete_entry(3)
+    for query in ["本小说", "读书笔记", "本散文", "火锅聊"]:
+        assert matched_ids(db, query, full_text=True) == matched_ids(db, query, full_text=False)
+    assert matched_ids(db, "本小说", full_text=True) == set()
+    assert matched_ids(db, "读书笔记", full_text=True) == {2}
@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def emit(self, *args):
+        self.calls.append(args)
+
+
+@pytest.fixture
+def worker(tmp_path):
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    for index in range(3):
+        db.save_entry(None, f"2024-06-0{index + 1}", f"title {index}", "<p>x</p>", f"body {index}")
+    db.close()
+    search_worker = main.EntrySearchWorker(tmp_path / main.DB_NAME)
+    search_worker.results_ready = Recorder()
+    search_worker.search_failed = Recorder()
+    yield search_worker
+    search_worker.close()
+
+
+def test_only_the_latest_request_runs(worker):
+    worker.supersede(1)
+    worker.supersede(2)
+    worker.search(1, "title")
+    assert worker.results_ready.calls == []
+
+    worker.search(2, "title 1")
+    [(generation, text, rows, cursor)] = worker.results_ready.calls
+    assert (generation, text, cursor) == (2, "title 1", None)
+    assert [row["title"] for row in rows] == ["title 1"]
+    assert worker._db.read_only
+
+
+def test_results_superseded_while_running_are_dropped(worker, monkeypatch):
+    worker.supersede(1)
+    worker.search(1, "")
+    list_page = worker._db.list_entries_page
+
+    def superseded_mid_query(*args, **kwargs):
+        worker.supersede(2)
+        return list_page(*args, **kwargs)
+
+    monkeypatch.setattr(worker._db, "list_entries_page", superseded_mid_query)
+    worker.search(1, "")
+    assert [call[0] for call in worker.results_ready.calls] == [1]
+
+
+def test_supersede_interrupts_a_running_older_query(worker):
+    worker.supersede(1)
+    worker.search(1, "")
+    interrupted = []
+    worker._db.interrupt = lambda: interrupted.append(True)
+
+    worker._running_generation = 1
+    worker.supersede(1)
+    assert interrupted == []
+    worker.supersede(2)
+    assert interrupted == [True]
+
+
+def test_errors_are_reported_with_the_generation(worker, monkeypatch):
+    worker.supersede(1)
+    worker.search(1, "")
+
+    def fail(*_args, **_kwargs):
+        raise main.sqlite3.OperationalError("interrupted")
+
+    monkeypatch.setattr(worker._db, "list_entries_page", fail)
+    worker.supersede(2)
+    worker.search(2, "x")
+    assert worker.search_failed.calls == [(2, "interrupted")]
+    assert worker._running_generation is None
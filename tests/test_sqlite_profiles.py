@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+SYNCHRONOUS_LEVELS = {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3}
+
+
+@pytest.fixture(autouse=True)
+def no_profile_env(monkeypatch):
+    monkeypatch.delenv(main.DB_PROFILE_ENV_VAR, raising=False)
+
+
+def pragma(db, name):
+    return db.conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def assert_applied(db, profile):
+    assert db.profile is profile
+    assert str(pragma(db, "journal_mode")).upper() == profile.journal_mode
+    assert pragma(db, "synchronous") == SYNCHRONOUS_LEVELS[profile.synchronous]
+    assert pragma(db, "cache_size") == -profile.cache_size_kib
+    assert pragma(db, "busy_timeout") == profile.busy_timeout_ms
+
+
+@pytest.mark.parametrize("name", sorted(main.SQLITE_PROFILES))
+def test_saved_profile_is_applied_on_reopen(tmp_path, name):
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    assert db.profile is main.SQLITE_PROFILES[main.DEFAULT_SQLITE_PROFILE]
+    db.set_profile(f" {name.upper()} ")
+    assert_applied(db, main.SQLITE_PROFILES[name])
+    db.close()
+
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    try:
+        assert_applied(db, main.SQLITE_PROFILES[name])
+    finally:
+        db.close()
+
+
+def test_argument_then_environment_then_saved_profile(tmp_path, monkeypatch):
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    db.set_profile("safe")
+    db.close()
+
+    monkeypatch.setenv(main.DB_PROFILE_ENV_VAR, "fast")
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    assert db.profile.name == "fast"
+    db.close()
+
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME, profile_name="balanced")
+    assert db.profile.name == "balanced"
+    db.close()
+
+    monkeypatch.setenv(main.DB_PROFILE_ENV_VAR, "no-such-profile")
+    reader = main.DiaryDatabase(tmp_path / main.DB_NAME, read_only=True)
+    try:
+        assert reader.profile.name == "safe"
+        assert pragma(reader, "cache_size") == -main.SQLITE_PROFILES["safe"].cache_size_kib
+    finally:
+        reader.close()
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    db = main.DiaryDatabase(tmp_path / main.DB_NAME)
+    try:
+        with pytest.raises(ValueError):
+            db.set_profile("turbo")
+        assert db.get_meta(main.DB_PROFILE_META_KEY) is None
+    finally:
+        db.close()
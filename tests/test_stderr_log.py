@@ -0,0 +1,64 @@
+import os
+import random
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+def split_in_chunks(data: bytes, sizes):
+    splitter = main.LineSplitter()
+    lines = []
+    start = 0
+    for size in sizes:
+        lines.extend(splitter.feed(data[start : start + size]))
+        start += size
+    lines.extend(splitter.feed(data[start:]))
+    return lines, splitter.flush()
+
+
+def test_lines_do_not_depend_on_chunk_boundaries():
+    data = b"first\nsecond line\n\n" + b"x" * 5000 + b"\nno newline at the end"
+    expected = [b"first\n", b"second line\n", b"\n", b"x" * 5000 + b"\n"]
+    rng = random.Random(7)
+    for _ in range(50):
+        sizes = [rng.randint(0, 64) for _ in range(rng.randint(1, 200))]
+        assert split_in_chunks(data, sizes) == (expected, b"no newline at the end")
+    assert split_in_chunks(data, [1] * len(data)) == (expected, b"no newline at the end")
+
+
+def test_flush_resets_the_splitter():
+    splitter = main.LineSplitter()
+    assert splitter.feed(b"partial") == []
+    assert splitter.flush() == b"partial"
+    assert splitter.feed(b"next\n") == [b"next\n"]
+    assert splitter.flush() == b""
+
+
+def test_suppressed_lines_match_the_filter():
+    assert main.SUPPRESSED_STDERR_PATTERN.search(b"libpng warning: iCCP: known incorrect sRGB profile\n")
+    assert main.SUPPRESSED_STDERR_PATTERN.search(b"something unrelated\n") is None
+
+
+def test_log_ring_keeps_recent_lines_and_rotates_the_file(tmp_path):
+    read_fd, write_fd = os.pipe()
+    try:
+        log = main.StderrLog(write_fd, ring_lines=3)
+        log.write(b"before the data root\n")
+        assert os.read(read_fd, 100) == b"before the data root\n"
+
+        log_path = tmp_path / "logs" / "xfy_diary.log"
+        log.open_log_file(log_path)
+        log._log_file.max_bytes = 32
+        for index in range(6):
+            log.write(f"line {index:02d} written\n".encode())
+        assert log.recent_lines() == ["line 03 written", "line 04 written", "line 05 written"]
+        assert log_path.read_bytes().endswith(b"line 05 written\n")
+        assert log_path.with_name("xfy_diary.log.1").exists()
+        assert all(path.stat().st_size <= 32 for path in log_path.parent.iterdir())
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("qfluentwidgets")
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def sources(tmp_path):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    paths = []
+    for index in range(11):
+        path = folder / f"{index}.jpg"
+        path.write_bytes(bytes([index]))
+        paths.append(path)
+    return paths
+
+
+def cache_thumbnail(cache, source, age):
+    # Stands in for a decoded thumbnail: 100 bytes, last used `age` seconds ago.
+    thumbnail = cache.thumbnail_path(source)
+    thumbnail.parent.mkdir(parents=True, exist_ok=True)
+    thumbnail.write_bytes(b"t" * 100)
+    used_at = 1_700_000_000 - age
+    os.utime(thumbnail, (used_at, used_at))
+    return thumbnail
+
+
+def test_eviction_drops_least_recently_used_down_to_ninety_percent(tmp_path, sources):
+    cache = main.ThumbnailCache(tmp_path / "thumbs", budget_bytes=1000)
+    thumbnails = [cache_thumbnail(cache, source, age=100 - index) for index, source in enumerate(sources[:10])]
+    cache._account(0)
+    assert all(thumbnail.exists() for thumbnail in thumbnails)
+
+    # Using the oldest thumbnail makes it the most recent one.
+    assert cache.lookup(sources[0]) == thumbnails[0]
+    newest = cache_thumbnail(cache, sources[10], age=0)
+    os.utime(newest)
+    cache._account(100)
+
+    kept = sorted(path.name for path in (tmp_path / "thumbs").glob("*/*.png"))
+    assert kept == sorted(path.name for path in [thumbnails[0], *thumbnails[3:], newest])
+    assert cache._total_bytes == 900
+
+
+def test_thumbnail_key_changes_with_the_source(tmp_path, sources):
+    cache = main.ThumbnailCache(tmp_path / "thumbs")
+    before = cache.thumbnail_path(sources[0])
+    sources[0].write_bytes(b"edited and longer")
+    assert cache.thumbnail_path(sources[0]) != before
+    assert main.ThumbnailCache(tmp_path / "thumbs", edge=64).thumbnail_path(sources[0]) != cache.thumbnail_path(
+        sources[0]
+    )
+    assert cache.lookup(tmp_path / "missing.jpg") is None